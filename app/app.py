@@ -3,24 +3,108 @@
 import streamlit as st
 import pandas as pd
 from src import eda_section, model_section
+from src.data_cache import sample_dataset
+from src.eda_stats import compute_dataset_stats
+from src.metrics_store import store_version
+from src.reference_profile import load_reference_profile
+from src.model_registry import PROFILE_FILE, bundle_file, current_version, list_versions
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
 
 # --- Configuración ---
 st.set_page_config(layout="wide")
 
+# --- Caché ---
+# Los datos y agregados se guardan por identidad de archivo (ruta, mtime, tamaño) y parámetros de muestreo:
+# cambiar un selector no vuelve a leer el dataset, y un archivo modificado invalida sus entradas.
+# La muestra, los agregados y las figuras se guardan como recursos compartidos (sin copiarlos ni
+# deserializarlos en cada rerun; la app no los modifica). La muestra se pasa a las funciones cacheadas
+# como `_df` (no se hashea): la clave es `dataset_key`.
+CACHE_MAX_ENTRIES = int(os.getenv("DASHBOARD_CACHE_ENTRIES", 32))
+
+
+def file_key(path):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+@st.cache_resource(max_entries=2, show_spinner="Cargando dataset...")
+def load_sample(dataset_key):
+    (path, _, _), sample_size, random_state = dataset_key
+    return sample_dataset(path, sample_size, random_state)
+
+
+@st.cache_resource(max_entries=2, show_spinner="Cargando dataset...")
+def load_uploaded_sample(dataset_key, _uploaded_file):
+    _, _, sample_size, random_state = dataset_key
+    return pd.read_csv(_uploaded_file).sample(n=sample_size, random_state=random_state)
+
+
+@st.cache_resource(max_entries=2, show_spinner="Calculando estadísticas del dataset completo...")
+def load_full_stats(key):
+    return compute_dataset_stats(key[0])
+
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES)
+def cached_eda(dataset_key, _df, name, *args):
+    return getattr(eda_section, name)(_df, *args)
+
+
+@st.cache_resource(max_entries=2)
+def cached_nunique(dataset_key, _df):
+    return _df.nunique()
+
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES)
+def cached_file(key, loader_name, _loader):
+    # `_loader` no se hashea: `loader_name` distingue dos cargadores distintos del mismo archivo
+    return _loader(key[0])
+
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES)
+def load_monitoring_view(store_key, days):
+    # `store_key` cambia con cada inserción en la base de métricas; el período se resuelve con una
+    # consulta por rango de fechas sobre el índice, relativa al último registro
+    start_date = None
+    if days is not None:
+        start_date = pd.Timestamp(model_section.load_latest_metrics()["date"]) - pd.Timedelta(days=days)
+    monitor_df = model_section.load_monitoring_data(start_date=start_date)
+    return monitor_df, model_section.plot_model_performance(monitor_df), model_section.plot_drift(monitor_df)
+
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES)
+def load_latency_view(store_key, job):
+    # Misma clave que el monitoreo: cambia cuando una tarea registra sus tiempos
+    timings = model_section.load_stage_timings(job)
+    return timings, model_section.plot_pipeline_latency(timings, job) if not timings.empty else None
+
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES)
+def load_registry_view(registry_key):
+    # `registry_key` cambia al publicar o promover una versión: el dashboard pasa a la nueva sin reiniciar
+    return model_section.load_registry_versions()
+
+
 # --- Cargar datos dinámicamente ---
 st.sidebar.header("📁 Cargar Dataset")
 uploaded_file = st.sidebar.file_uploader("Sube un archivo CSV", type=["csv"])
 
 if uploaded_file:
-    df = pd.read_csv(uploaded_file).sample(n=200_000, random_state=42)
+    dataset_key = ("upload", uploaded_file.file_id, 200_000, 42)
+    df = load_uploaded_sample(dataset_key, uploaded_file)
+    stats_key, stats = dataset_key, df
     st.sidebar.success("✅ Dataset cargado correctamente.")
 else:
     st.sidebar.info("📌 Usando dataset por defecto.")
-    df = pd.read_csv(os.getenv("DEFAULT_DATA_PATH")).sample(n=int(os.getenv("SAMPLE_SIZE")), random_state=int(os.getenv("RANDOM_STATE")))
+    data_path = os.getenv("DEFAULT_DATA_PATH")
+    dataset_key = (file_key(data_path), int(os.getenv("SAMPLE_SIZE")), int(os.getenv("RANDOM_STATE")))
+    df = load_sample(dataset_key)
+    # Conteos, nulos y correlaciones se calculan sobre el archivo completo, en una pasada por bloques
+    stats_key = file_key(data_path)
+    stats = load_full_stats(stats_key)
+
+if st.sidebar.button("🔄 Limpiar caché"):
+    st.cache_resource.clear()
+    st.rerun()
 
 # --- Tabs ---
 tabs = st.tabs(["📊 EDA", "🧠 Modelo y Monitoreo"])
@@ -30,7 +114,7 @@ with tabs[0]:
     st.title("📊 Exploración de Transacciones Bancarias")
     
     # Información general
-    info = eda_section.basic_info(df)
+    info = cached_eda(stats_key, stats, "basic_info")
     st.write("Dimensiones:", info["shape"])
     st.write("Tipos de datos:")
     st.dataframe(info["dtypes"])
@@ -43,8 +127,9 @@ with tabs[0]:
     target_var = st.sidebar.selectbox("Selecciona la variable objetivo", df.columns.tolist(), index=df.columns.get_loc(default_target))
 
     # Mostrar distribución si el target es binario
-    if df[target_var].nunique() <= 2:
-        dist = eda_section.fraud_distribution(df, target_var)
+    nunique = cached_nunique(dataset_key, df)
+    if nunique[target_var] <= 2:
+        dist = cached_eda(stats_key, stats, "fraud_distribution", target_var)
         if dist is not None:
             st.plotly_chart(eda_section.plot_fraud_pie(dist))
     else:
@@ -56,7 +141,7 @@ with tabs[0]:
     if cat_vars:
         cat_var = st.selectbox("Variable categórica", cat_vars)
         color_by = st.selectbox("¿Colorear por variable?", [None, target_var] + cat_vars)
-        st.plotly_chart(eda_section.plot_categorical_bar(df, cat_var, color_by))
+        st.plotly_chart(cached_eda(dataset_key, df, "plot_categorical_bar", cat_var, color_by))
     else:
         st.warning("No se encontraron variables categóricas.")
 
@@ -66,23 +151,23 @@ with tabs[0]:
     if num_vars:
         num_var = st.selectbox("Variable numérica", num_vars, key="dist")
         hue = st.selectbox("¿Separar por categoría?", [None, target_var] + cat_vars, key="hue_dist")
-        st.plotly_chart(eda_section.plot_numeric_distribution(df, num_var, hue))
+        st.plotly_chart(cached_eda(dataset_key, df, "plot_numeric_distribution", num_var, hue))
     else:
         st.warning("No se encontraron variables numéricas.")
 
     st.markdown("---")
     st.subheader("📦 Boxplot por categoría")
     box_y = st.selectbox("Variable numérica", num_vars, key="box_y")
-    box_x_candidates = [v for v in cat_vars if df[v].nunique() < 20]
+    box_x_candidates = [v for v in cat_vars if nunique[v] < 20]
     if box_x_candidates:
         box_x = st.selectbox("Categoría (con pocos valores)", box_x_candidates, key="box_x")
-        st.plotly_chart(eda_section.plot_box_by_category(df, box_y, box_x))
+        st.plotly_chart(cached_eda(dataset_key, df, "plot_box_by_category", box_y, box_x))
     else:
         st.warning("No hay variables categóricas con pocos valores.")
 
     st.markdown("---")
     st.subheader("🔗 Matriz de Correlación Numérica")
-    st.plotly_chart(eda_section.plot_corr_heatmap(df))
+    st.plotly_chart(cached_eda(stats_key, stats, "plot_corr_heatmap"))
 
 # --- Tab 2: Modelo y Monitoreo ---
 with tabs[1]:
@@ -96,9 +181,21 @@ with tabs[1]:
         if warning:
             st.warning(warning)
 
-    monitor_df = model_section.load_monitoring_data(os.getenv("MONITORING_METRICS"))
-    st.plotly_chart(model_section.plot_model_performance(monitor_df))
-    st.plotly_chart(model_section.plot_drift(monitor_df))
+    periods = {"Todo el historial": None, "Últimos 30 días": 30, "Últimos 90 días": 90}
+    period = st.selectbox("Período", list(periods))
+    monitor_df, performance_fig, drift_fig = load_monitoring_view(store_version(), periods[period])
+    st.plotly_chart(performance_fig)
+    st.plotly_chart(drift_fig)
+
+    st.subheader("⏱️ Latencia del Pipeline")
+    job = st.selectbox("Tarea", ["cron_daily_predict", "cron_daily_evaluate", "cron_weekly_train_model"])
+    timings, latency_fig = load_latency_view(store_version(), job)
+    if latency_fig is None:
+        st.info("Aún no hay tiempos registrados para esta tarea: se registran en cada ejecución.")
+    else:
+        st.plotly_chart(latency_fig)
+        last_run = timings[timings["date"] == timings["date"].max()]
+        st.dataframe(last_run[["stage", "calls", "rows", "wall_s", "cpu_s", "peak_rss_mib"]], hide_index=True)
 
     st.markdown("""
     **ℹ️ ¿Qué significa el Drift Score?**
@@ -123,5 +220,31 @@ with tabs[1]:
     - Reentrenamiento: `{'✅ Sí' if latest['retrain'] else '❌ No'}`
     """)
 
+    st.subheader("🗂️ Registro de Modelos")
+    model_version = current_version()
+    if model_version is None:
+        st.info("Aún no hay versiones publicadas: se publican al reentrenar el modelo.")
+    else:
+        st.markdown(f"- Versión vigente: `{model_version}`")
+        st.dataframe(load_registry_view((model_version, tuple(list_versions()))), hide_index=True)
+
+    st.subheader("🧾 Perfil de Referencia del Entrenamiento")
+    # El de la versión vigente del registro; sin registro, el del último entrenamiento
+    profile_path = bundle_file(PROFILE_FILE) or os.getenv("REFERENCE_PROFILE_PATH")
+    if os.path.exists(profile_path):
+        profile = cached_file(file_key(profile_path), "reference_profile", load_reference_profile)
+        fraud_rate = profile.get("class_balance", {}).get("1", 0.0)
+        st.markdown(f"""
+        - Versión: `{profile['version']}`  
+        - Filas de entrenamiento: `{profile['n_rows']:,}`  
+        - Tasa de fraude: `{fraud_rate:.4%}`
+        """)
+        st.dataframe(model_section.reference_profile_summary(profile))
+        ref_col = st.selectbox("Variable de referencia", list(profile["columns"]))
+        st.plotly_chart(model_section.plot_reference_histogram(profile, ref_col))
+    else:
+        st.info("Aún no hay un perfil de referencia: se genera al reentrenar el modelo.")
+
     st.subheader("📊 SHAP - Importancia Global de Variables")
-    st.plotly_chart(model_section.load_shap_bar_plot(os.getenv("SHAP_GLOBAL")))
\ No newline at end of file
+    shap_path = os.getenv("SHAP_GLOBAL")
+    st.plotly_chart(cached_file(file_key(shap_path), "shap_bar_plot", model_section.load_shap_bar_plot))
\ No newline at end of file
@@ -0,0 +1,89 @@
+# benchmarks/features.py
+
+import sys
+import json
+import argparse
+import pandas as pd
+
+DEFAULT_ROWS = [1_000_000, 6_000_000]
+
+
+def engineer_features_reference(df):
+    """
+    Versión anterior de `engineer_features` (copia completa, columnas float64/int64 y `pd.get_dummies`).
+
+    Se conserva solo como punto de comparación del benchmark.
+
+    Parameters:
+        df (pd.DataFrame): Dataset original.
+
+    Returns:
+        pd.DataFrame: Dataset enriquecido.
+    """
+    df = df.copy()
+    df['balance_diff_orig'] = df['oldbalanceOrg'] - df['newbalanceOrig']
+    df['balance_diff_dest'] = df['newbalanceDest'] - df['oldbalanceDest']
+    df['error_balance_orig'] = ((df['oldbalanceOrg'] == 0) & (df['newbalanceOrig'] == 0)).astype(int)
+    df['error_balance_dest'] = ((df['oldbalanceDest'] == 0) & (df['newbalanceDest'] == 0)).astype(int)
+    df['amount_to_balance_ratio'] = df['amount'] / (df['oldbalanceOrg'] + 1)
+    return pd.get_dummies(df, columns=['type'], prefix='type')
+
+
+def run_features_benchmark(rows=DEFAULT_ROWS, seed=0):
+    """
+    Mide tiempo de reloj y memoria de `engineer_features` frente a la versión anterior.
+
+    Ambas versiones reciben el mismo DataFrame, con los tipos que devuelve el caché columnar, y cada una
+    se mide en un proceso hijo (ver `benchmarks.run.run_stage_isolated`). La memoria es el aumento del
+    pico de RSS durante la llamada (`peak_delta_mib`), que incluye el DataFrame devuelto y las copias
+    intermedias.
+
+    Parameters:
+        rows (list): Tamaños del dataset sintético.
+        seed (int): Semilla del generador.
+
+    Returns:
+        dict: Por tamaño, las mediciones de 'anterior' y 'actual'.
+    """
+    from benchmarks.run import run_stage_isolated
+    from benchmarks.synthetic import transactions_frame
+    from src.data_preprocessing import engineer_features, TRANSACTION_TYPES
+
+    results = {}
+    for n_rows in rows:
+        df = transactions_frame(n_rows, seed)
+        stages = {}
+        run_stage_isolated(stages, f"anterior_{n_rows}", lambda: engineer_features_reference(df), n_rows)
+        run_stage_isolated(stages, f"actual_{n_rows}",
+                  lambda: engineer_features(df, type_categories=TRANSACTION_TYPES), n_rows)
+        results[n_rows] = {"anterior": stages[f"anterior_{n_rows}"], "actual": stages[f"actual_{n_rows}"]}
+        del df
+    return results
+
+
+def _mib(result):
+    # Fuera de Linux no hay aumento de memoria por etapa
+    return "-" if result["peak_delta_mib"] is None else f"{result['peak_delta_mib']:.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de engineer_features frente a la versión anterior.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="Tamaños a medir.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados.")
+    args = parser.parse_args()
+
+    results = run_features_benchmark(args.rows, args.seed)
+    print(f"\n{'filas':>10} {'anterior (s)':>13} {'actual (s)':>11} {'anterior (MiB)':>15} {'actual (MiB)':>13}")
+    for n_rows, result in results.items():
+        before, after = result["anterior"], result["actual"]
+        print(f"{n_rows:>10} {before['wall_s']:13.3f} {after['wall_s']:11.3f} "
+              f"{_mib(before):>15} {_mib(after):>13}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# benchmarks/forest_batch.py
+
+import sys
+import json
+import time
+import argparse
+
+DEFAULT_BATCH_SIZES = [1, 100, 10_000, 1_000_000]
+
+# Backends medidos: el modelo de scikit-learn, `FlatForest` tal como lo usa la inferencia (delega los
+# lotes grandes en scikit-learn) y `FlatForest` sin modelo original (todo en NumPy, como en el registro)
+BACKENDS = ("sklearn", "flat", "flat_numpy")
+
+
+def time_call(fn, min_seconds=0.5, max_repeat=1000):
+    """
+    Mide el tiempo por llamada de `fn` repitiéndola hasta acumular `min_seconds`.
+
+    Parameters:
+        fn (callable): Función sin argumentos.
+        min_seconds (float): Tiempo mínimo acumulado.
+        max_repeat (int): Máximo de repeticiones.
+
+    Returns:
+        float: Menor tiempo de una llamada, en segundos.
+    """
+    times = []
+    while not times or (sum(times) < min_seconds and len(times) < max_repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run_forest_batch_benchmark(batch_sizes=DEFAULT_BATCH_SIZES, train_rows=200_000, negative_rate=1.0, seed=0):
+    """
+    Mide el tiempo de `predict_proba` por tamaño de lote con cada backend de inferencia.
+
+    Se entrena un modelo con `train_model` sobre `train_rows` transacciones sintéticas y se puntúan
+    lotes de otras transacciones ya preprocesadas. También se verifica que los tres backends den las
+    mismas probabilidades.
+
+    Parameters:
+        batch_sizes (list): Filas por lote.
+        train_rows (int): Filas de entrenamiento.
+        negative_rate (float): Fracción de negativos al entrenar (ver `train_model`).
+        seed (int): Semilla del generador.
+
+    Returns:
+        dict: Por tamaño de lote y backend, 'seconds' (por llamada) y 'rows_per_s'; y 'identical'.
+    """
+    import numpy as np
+    from benchmarks.synthetic import transactions_frame
+    from src.data_preprocessing import FraudPreprocessor
+    from src.forest_engine import FlatForest
+    from src.model_training import train_model
+
+    preprocessor = FraudPreprocessor()
+    train = preprocessor.fit_transform(transactions_frame(train_rows, seed))
+    model = train_model(train[preprocessor.feature_names_], train["isFraud"], negative_rate=negative_rate)[0]
+    del train
+    scored = preprocessor.transform(transactions_frame(max(batch_sizes), seed + 1))
+    X = np.ascontiguousarray(scored[preprocessor.feature_names_].to_numpy(dtype=np.float32))
+    del scored
+
+    flat = FlatForest.from_sklearn(model)
+    flat_numpy = FlatForest.from_sklearn(model)
+    flat_numpy.estimator = None
+    backends = {"sklearn": model, "flat": flat, "flat_numpy": flat_numpy}
+
+    results = {}
+    for batch_size in batch_sizes:
+        batch = X[:batch_size]
+        results[batch_size] = {}
+        outputs = []
+        for name in BACKENDS:
+            predict = backends[name].predict_proba
+            seconds = time_call(lambda: predict(batch))
+            outputs.append(predict(batch))
+            results[batch_size][name] = {"seconds": seconds, "rows_per_s": batch_size / seconds}
+            print(f"{batch_size:>9} {name:<11} {seconds * 1000:12.3f} ms  {batch_size / seconds:14,.0f} filas/s", flush=True)
+        results[batch_size]["identical"] = all(np.array_equal(outputs[0], other) for other in outputs[1:])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inferencia por tamaño de lote: scikit-learn frente a FlatForest.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--train-rows", type=int, default=200_000)
+    parser.add_argument("--negative-rate", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados.")
+    args = parser.parse_args()
+
+    results = run_forest_batch_benchmark(args.batch_sizes, args.train_rows, args.negative_rate, args.seed)
+    print(f"\n{'lote':>9} " + " ".join(f"{name + ' (ms)':>16}" for name in BACKENDS) + "  idénticos")
+    for batch_size, result in results.items():
+        print(f"{batch_size:>9} " + " ".join(f"{result[name]['seconds'] * 1000:16.3f}" for name in BACKENDS)
+              + f"  {'sí' if result['identical'] else 'NO'}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0 if all(result["identical"] for result in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
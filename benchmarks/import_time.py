@@ -0,0 +1,118 @@
+# benchmarks/import_time.py
+
+import os
+import sys
+import argparse
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+# Módulo de las tareas cron (`cron_daily_predict`, etc.)
+DEFAULT_MODULE = "src.utils"
+
+# Presupuesto de importación de DEFAULT_MODULE, en segundos. Hoy lo dominan pandas y sklearn.base
+# (~1.2 s en la máquina de referencia); volver a importar shap al cargar el módulo suma más de 1 s.
+DEFAULT_BUDGET_S = 1.8
+
+# Dependencias que solo se usan para explicar o graficar: las tareas cron no deben cargarlas al importar
+LAZY_MODULES = ("shap", "matplotlib", "plotly", "IPython", "numba", "PIL")
+
+
+def measure_import(module, python=sys.executable):
+    """
+    Importa un módulo en un intérprete nuevo con `python -X importtime` y devuelve su costo.
+
+    Parameters:
+        module (str): Módulo a importar (por ejemplo 'src.utils').
+        python (str): Intérprete a usar. Por defecto el actual.
+
+    Returns:
+        tuple:
+            - seconds (float): Tiempo acumulado de importar `module` (incluye sus dependencias).
+            - modules (dict): Tiempo acumulado en segundos por cada módulo importado.
+            - direct (dict): Tiempo acumulado en segundos de las importaciones directas de `module`.
+
+    Raises:
+        RuntimeError: Si la importación falla.
+    """
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {module}:\n{proc.stderr}")
+
+    # Formato: "import time: <propio us> | <acumulado us> | <espacios por nivel><módulo>"; cada
+    # módulo se informa al terminar, después de los que importa
+    seconds, modules, direct, pending = None, {}, {}, {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        name = name.strip()
+        cumulative = int(cumulative) / 1e6
+        modules[name] = cumulative
+        if depth == 1:
+            pending[name] = cumulative
+        elif depth == 0:
+            if name == module:
+                seconds, direct = cumulative, pending
+            pending = {}
+    return seconds, modules, direct
+
+
+def check_import_budget(module=DEFAULT_MODULE, budget_s=DEFAULT_BUDGET_S, repeat=5, lazy_modules=LAZY_MODULES):
+    """
+    Verifica que importar `module` no supere el presupuesto ni cargue dependencias diferidas.
+
+    Se toma la importación más rápida de `repeat` intérpretes nuevos (la primera suele pagar la
+    lectura de disco). Además de la medición, se falla si alguno de `lazy_modules` aparece entre los
+    módulos importados, lo que no depende de la velocidad de la máquina.
+
+    Parameters:
+        module (str): Módulo a importar.
+        budget_s (float): Tiempo máximo permitido, en segundos.
+        repeat (int): Intérpretes nuevos a medir.
+        lazy_modules (tuple): Paquetes que no deben importarse al cargar `module`.
+
+    Returns:
+        list: Mensajes de error (vacía si se cumple el presupuesto).
+    """
+    runs = [measure_import(module) for _ in range(repeat)]
+    seconds, modules, direct = min(runs, key=lambda run: run[0])
+
+    print(f"{module}: {seconds:.3f} s (presupuesto {budget_s:.3f} s, mejor de {repeat})")
+    print("\nImportaciones directas más costosas:")
+    for name, cumulative in sorted(direct.items(), key=lambda item: item[1], reverse=True)[:10]:
+        print(f"  {name:<36} {cumulative:7.3f} s")
+
+    errors = []
+    if seconds > budget_s:
+        errors.append(f"importar {module} tarda {seconds:.3f} s (presupuesto {budget_s:.3f} s)")
+    loaded = sorted(name for name in modules if name in lazy_modules)
+    if loaded:
+        errors.append(f"importar {module} carga {', '.join(loaded)}; deben importarse al usarse")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Presupuesto de tiempo de importación de las tareas cron.")
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="Módulo a importar.")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_S, help="Tiempo máximo, en segundos.")
+    parser.add_argument("--repeat", type=int, default=5, help="Intérpretes nuevos; se toma el más rápido.")
+    args = parser.parse_args()
+
+    errors = check_import_budget(args.module, args.budget, args.repeat)
+    if errors:
+        print("\nFuera de presupuesto:")
+        for message in errors:
+            print(f"  - {message}")
+        return 1
+    print("\nDentro del presupuesto.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# benchmarks/incremental_training.py
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+from datetime import datetime
+
+MODES = ("incremental", "full")
+
+
+def _window_bounds(n_windows, initial_fraction, n_steps):
+    # Último step del entrenamiento inicial y de cada ventana; la última ventana solo se usa para evaluar
+    first = int(n_steps * initial_fraction)
+    size = (n_steps - first) / (n_windows + 1)
+    return [first + round(size * i) for i in range(n_windows + 2)]
+
+
+def run_incremental_training_benchmark(rows=1_000_000, n_windows=4, initial_fraction=0.5, seed=0):
+    """
+    Compara el reentrenamiento incremental con el completo a lo largo de varias ventanas de `step`.
+
+    Se entrena un modelo inicial (completo) con los primeros steps y luego, ventana por ventana, se
+    agregan al CSV las transacciones nuevas y se ejecuta `cron_weekly_train_model` en cada modo, cada
+    uno con su propia carpeta de trabajo (modelo, manifiesto, registro y estado por cuenta). La tarea
+    completa se mide en un proceso hijo (ver `benchmarks.run.run_stage_isolated`): incluye carga,
+    preprocesamiento, entrenamiento, perfil de referencia, publicación y SHAP. La AUC se calcula sobre
+    la ventana siguiente, que ninguno de los dos modelos vio, con el estado por cuenta al final de la
+    ventana entrenada.
+
+    Parameters:
+        rows (int): Filas del dataset sintético (steps 1 a 743).
+        n_windows (int): Ventanas de reentrenamiento.
+        initial_fraction (float): Fracción de los steps usada en el entrenamiento inicial.
+        seed (int): Semilla del generador.
+
+    Returns:
+        dict: Por modo, una lista por ventana con 'through_step', 'rows' (filas nuevas), la medición
+            de la tarea ('wall_s', 'cpu_s', 'peak_delta_mib'...), el tiempo de cada etapa ('stages'),
+            'trees' y 'auc'.
+    """
+    import joblib
+    import pandas as pd
+    from benchmarks.run import REPO_DIR, _configure_environment, run_stage_isolated
+    from benchmarks.synthetic import N_STEPS, generate_transactions
+
+    sys.path.insert(0, REPO_DIR)
+
+    data = pd.concat(generate_transactions(rows, seed), ignore_index=True)
+    bounds = _window_bounds(n_windows, initial_fraction, N_STEPS)
+    previous_cwd = os.getcwd()
+    root = tempfile.mkdtemp(prefix="fraud-incremental-")
+    results = {mode: [] for mode in MODES}
+    try:
+        for mode in MODES:
+            workdir = os.path.join(root, mode)
+            paths = _configure_environment(workdir)
+            # Rutas relativas del .env (estado por cuenta, advertencia) dentro de la carpeta de trabajo
+            os.chdir(workdir)
+
+            from src import utils
+            from src.metrics_engine import classification_metrics
+            from src.metrics_store import append_metrics, query_stage_timings
+
+            # La tarea termina leyendo la última métrica de monitoreo
+            append_metrics({"date": datetime.now(), "auc": 1.0, "drift_score": 0.0, "retrain_triggered": 0})
+            for i, through_step in enumerate(bounds[:-1]):
+                data[data["step"] <= through_step].to_csv(paths["FRAUD_DATASET"], index=False)
+                new_rows = int(((data["step"] > (bounds[i - 1] if i else 0)) & (data["step"] <= through_step)).sum())
+                stages = {}
+                name = f"{mode}_{through_step}"
+                run_stage_isolated(stages, name, lambda: utils.cron_weekly_train_model(mode if i else "full"), new_rows)
+                if i == 0:
+                    continue
+
+                model = joblib.load(paths["MODEL_PATH"])
+                preprocessor = joblib.load(paths["PREPROCESSOR_PATH"])
+                velocity = utils.load_velocity_store(preprocessor, paths["FRAUD_DATASET"], through_step)
+                test = data[(data["step"] > through_step) & (data["step"] <= bounds[i + 1])]
+                test = preprocessor.transform(test.reset_index(drop=True), velocity=velocity)
+                auc = classification_metrics(test["isFraud"], model.predict_proba(test[preprocessor.feature_names_])[:, 1])["auc"]
+                # Tiempo por etapa de la tarea, tal como lo registró `profile_run`
+                timings = query_stage_timings(job="cron_weekly_train_model")
+                timings = timings[timings["date"] == timings["date"].max()]
+                results[mode].append(dict(
+                    stages[name], through_step=through_step, trees=len(model.estimators_), auc=auc,
+                    stages=dict(zip(timings["stage"], timings["wall_s"].round(3))),
+                ))
+                print(f"{mode:<12} hasta step {through_step:>4}: AUC {auc:.4f}, {len(model.estimators_)} árboles", flush=True)
+            os.chdir(previous_cwd)
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reentrenamiento incremental frente a completo: tiempo y AUC.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--windows", type=int, default=4, help="Ventanas de reentrenamiento.")
+    parser.add_argument("--initial-fraction", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados.")
+    args = parser.parse_args()
+
+    results = run_incremental_training_benchmark(args.rows, args.windows, args.initial_fraction, args.seed)
+    print(f"\n{'hasta step':>10} {'filas nuevas':>13} "
+          + " ".join(f"{mode + ' (s)':>16} {'entrenar (s)':>12} {'AUC':>7}" for mode in MODES))
+    for incremental, full in zip(*(results[mode] for mode in MODES)):
+        print(f"{incremental['through_step']:>10} {incremental['rows']:>13} " + " ".join(
+            f"{result['wall_s']:16.3f} {result['stages'].get('train', float('nan')):12.3f} {result['auc']:7.4f}"
+            for result in (incremental, full)
+        ))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# benchmarks/outliers.py
+
+import sys
+import json
+import argparse
+import pandas as pd
+from benchmarks.run import OUTLIER_COLS
+
+DEFAULT_ROWS = [6_000_000]
+
+
+def remove_outliers_iqr_reference(df, cols, target='isFraud'):
+    """
+    Versión anterior de `remove_outliers_iqr` (un filtro por columna sobre copias y `concat` + `sample`).
+
+    Se conserva solo como punto de comparación del benchmark y de las pruebas.
+
+    Parameters:
+        df (pd.DataFrame): Conjunto de datos original.
+        cols (list): Columnas numéricas a filtrar.
+        target (str): Nombre de la variable objetivo binaria.
+
+    Returns:
+        pd.DataFrame: Dataset sin outliers en la clase legítima y con todos los fraudes.
+    """
+    df_fraud = df[df[target] == 1]
+    df_legit = df[df[target] == 0]
+
+    for col in cols:
+        Q1 = df_legit[col].quantile(0.25)
+        Q3 = df_legit[col].quantile(0.75)
+        IQR = Q3 - Q1
+        lower = Q1 - 1.5 * IQR
+        upper = Q3 + 1.5 * IQR
+        df_legit = df_legit[(df_legit[col] >= lower) & (df_legit[col] <= upper)]
+
+    return pd.concat([df_legit, df_fraud], axis=0).sample(frac=1, random_state=42)
+
+
+def _summarize(result):
+    # Filas conservadas y huella del índice (mismas filas en el mismo orden)
+    import hashlib
+    import numpy as np
+
+    index = np.ascontiguousarray(result.index.to_numpy(dtype=np.int64))
+    return {"rows_out": len(result), "index_digest": hashlib.blake2b(index.tobytes(), digest_size=16).hexdigest()}
+
+
+def run_outliers_benchmark(rows=DEFAULT_ROWS, seed=0):
+    """
+    Mide tiempo de reloj y memoria de `remove_outliers_iqr` frente a la versión anterior.
+
+    Se miden la versión anterior, la actual con `sequential=True` (misma semántica que la anterior) y
+    la actual por defecto (cuartiles de todas las columnas sobre las legítimas en una pasada), cada una
+    en un proceso hijo (ver `benchmarks.run.run_stage_isolated`) y sobre el mismo DataFrame con los
+    tipos del caché columnar.
+
+    Parameters:
+        rows (list): Tamaños del dataset sintético.
+        seed (int): Semilla del generador.
+
+    Returns:
+        dict: Por tamaño, las mediciones de 'anterior', 'secuencial' y 'actual' (con 'rows_out' e
+            'index_digest'), e 'identical' (si 'secuencial' devolvió las mismas filas que 'anterior').
+    """
+    from benchmarks.run import run_stage_isolated
+    from benchmarks.synthetic import transactions_frame
+    from src.outlier_detection import remove_outliers_iqr
+
+    variants = {
+        "anterior": lambda df: remove_outliers_iqr_reference(df, OUTLIER_COLS),
+        "secuencial": lambda df: remove_outliers_iqr(df, OUTLIER_COLS, sequential=True),
+        "actual": lambda df: remove_outliers_iqr(df, OUTLIER_COLS),
+    }
+    results = {}
+    for n_rows in rows:
+        df = transactions_frame(n_rows, seed)
+        stages = {}
+        for name, fn in variants.items():
+            run_stage_isolated(stages, f"{name}_{n_rows}", lambda: fn(df), n_rows, summarize=_summarize)
+        results[n_rows] = {name: stages[f"{name}_{n_rows}"] for name in variants}
+        results[n_rows]["identical"] = results[n_rows]["secuencial"]["index_digest"] == results[n_rows]["anterior"]["index_digest"]
+        del df
+    return results
+
+
+def _mib(result):
+    # Fuera de Linux no hay aumento de memoria por etapa
+    return "-" if result["peak_delta_mib"] is None else f"{result['peak_delta_mib']:.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de remove_outliers_iqr frente a la versión anterior.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="Tamaños a medir.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados.")
+    args = parser.parse_args()
+
+    results = run_outliers_benchmark(args.rows, args.seed)
+    print(f"\n{'filas':>10} {'variante':<11} {'tiempo (s)':>11} {'memoria (MiB)':>14} {'filas salida':>13}")
+    for n_rows, result in results.items():
+        for name in ("anterior", "secuencial", "actual"):
+            print(f"{n_rows:>10} {name:<11} {result[name]['wall_s']:11.3f} {_mib(result[name]):>14} "
+                  f"{result[name]['rows_out']:>13}")
+        print(f"{'':>10} secuencial idéntica a la anterior: {'sí' if result['identical'] else 'NO'}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0 if all(result["identical"] for result in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
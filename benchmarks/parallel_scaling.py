@@ -0,0 +1,110 @@
+# benchmarks/parallel_scaling.py
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+
+PREFERS = ("threads", "processes")
+
+
+def default_worker_counts():
+    """
+    Cantidades de trabajadores a medir: potencias de 2 hasta los núcleos disponibles, más ese total.
+
+    Returns:
+        list: Cantidades de trabajadores, de menor a mayor.
+    """
+    cpus = os.cpu_count() or 1
+    counts = {1, cpus}
+    n = 2
+    while n < cpus:
+        counts.add(n)
+        n *= 2
+    return sorted(counts)
+
+
+def run_parallel_scaling_benchmark(rows=2_000_000, worker_counts=None, train_rows=200_000, seed=0):
+    """
+    Mide la aceleración de `predict_proba_parallel` según la cantidad de trabajadores.
+
+    Se entrena un modelo sobre `train_rows` transacciones sintéticas, se guarda sin comprimir (el modo
+    'processes' lo carga desde el archivo) y se puntúan `rows` transacciones con cada cantidad de
+    trabajadores, con hilos y con procesos. La aceleración es relativa a un trabajador. Con procesos,
+    la primera llamada de cada cantidad carga el modelo en los trabajadores: se mide la mejor de dos.
+
+    Parameters:
+        rows (int): Filas a puntuar.
+        worker_counts (list, optional): Cantidades de trabajadores. Por defecto `default_worker_counts()`.
+        train_rows (int): Filas de entrenamiento.
+        seed (int): Semilla del generador.
+
+    Returns:
+        dict: Por modo ('threads', 'processes') y cantidad de trabajadores, 'seconds' y 'speedup';
+            además 'cpu_count' e 'identical' (si todas las corridas dieron las mismas probabilidades).
+    """
+    import time
+    import joblib
+    import numpy as np
+    from benchmarks.synthetic import transactions_frame
+    from src.data_preprocessing import FraudPreprocessor
+    from src.model_training import train_model
+    from src.scoring import predict_proba_parallel
+
+    worker_counts = worker_counts or default_worker_counts()
+    preprocessor = FraudPreprocessor()
+    train = preprocessor.fit_transform(transactions_frame(train_rows, seed))
+    model = train_model(train[preprocessor.feature_names_], train["isFraud"])[0]
+    del train
+    X = preprocessor.transform(transactions_frame(rows, seed + 1))[preprocessor.feature_names_]
+
+    workdir = tempfile.mkdtemp(prefix="fraud-scaling-")
+    model_path = os.path.join(workdir, "model.joblib")
+    joblib.dump(model, model_path)
+    expected = model.predict_proba(X)[:, 1]
+    results = {"cpu_count": os.cpu_count(), "identical": True}
+    try:
+        for prefer in PREFERS:
+            results[prefer] = {}
+            for n_jobs in worker_counts:
+                times = []
+                for _ in range(2):
+                    start = time.perf_counter()
+                    proba = predict_proba_parallel(model, X, n_jobs=n_jobs, prefer=prefer, model_path=model_path)
+                    times.append(time.perf_counter() - start)
+                results["identical"] &= bool(np.array_equal(proba, expected))
+                seconds = min(times)
+                base = results[prefer][worker_counts[0]]["seconds"] if results[prefer] else seconds
+                results[prefer][n_jobs] = {"seconds": seconds, "speedup": base / seconds}
+                print(f"{prefer:<10} {n_jobs:>4} trabajadores {seconds:9.3f} s  x{base / seconds:5.2f}", flush=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aceleración de la puntuación en paralelo según la cantidad de trabajadores.")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Filas a puntuar.")
+    parser.add_argument("--workers", type=int, nargs="+", help="Cantidades de trabajadores (por defecto 1, 2, 4... hasta los núcleos).")
+    parser.add_argument("--train-rows", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados.")
+    args = parser.parse_args()
+
+    results = run_parallel_scaling_benchmark(args.rows, args.workers, args.train_rows, args.seed)
+    print(f"\nNúcleos disponibles: {results['cpu_count']}")
+    print(f"{'trabajadores':>12} " + " ".join(f"{prefer + ' (s)':>15} {'x':>6}" for prefer in PREFERS))
+    for n_jobs in results[PREFERS[0]]:
+        print(f"{n_jobs:>12} " + " ".join(
+            f"{results[prefer][n_jobs]['seconds']:15.3f} {results[prefer][n_jobs]['speedup']:6.2f}" for prefer in PREFERS
+        ))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0 if results["identical"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+# benchmarks/predictions_format.py
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+
+FORMATS = ("csv", "parquet")
+
+
+def _scored_frame(n_rows, seed):
+    # Transacciones preprocesadas con probabilidades en float64 (sin entrenar: solo importa el formato)
+    import numpy as np
+    from benchmarks.synthetic import transactions_frame
+    from src.data_preprocessing import FraudPreprocessor
+
+    df = FraudPreprocessor().fit_transform(transactions_frame(n_rows, seed))
+    rng = np.random.default_rng(seed)
+    df["pred_proba"] = rng.random(len(df))
+    df["pred_label"] = (df["pred_proba"] >= 0.5).astype("int8")
+    return df
+
+
+def write_csv(df, path, chunksize):
+    """
+    Escribe las predicciones como antes: CSV con todas las columnas, bloque a bloque.
+
+    Parameters:
+        df (pd.DataFrame): Transacciones preprocesadas y puntuadas.
+        path (str): Archivo de salida.
+        chunksize (int): Filas por bloque.
+    """
+    for i, start in enumerate(range(0, len(df), chunksize)):
+        df.iloc[start:start + chunksize].to_csv(path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+
+
+def write_parquet(df, path, chunksize):
+    """
+    Escribe las predicciones como `cron_daily_predict`: PREDICTION_COLUMNS con PREDICTION_DTYPES,
+    un row group por bloque y compresión zstd.
+
+    Parameters:
+        df (pd.DataFrame): Transacciones preprocesadas y puntuadas.
+        path (str): Archivo de salida.
+        chunksize (int): Filas por bloque.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from src.utils import PREDICTION_COLUMNS, PREDICTION_DTYPES
+
+    writer = None
+    try:
+        for start in range(0, len(df), chunksize):
+            output = df.iloc[start:start + chunksize][PREDICTION_COLUMNS].astype(PREDICTION_DTYPES)
+            table = pa.Table.from_pandas(output, schema=writer.schema if writer else None, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema.remove_metadata(), compression="zstd")
+            writer.write_table(table.replace_schema_metadata(None))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def run_predictions_format_benchmark(rows=2_000_000, chunksize=500_000, seed=0):
+    """
+    Compara el archivo de predicciones en CSV (formato anterior) y en Parquet (formato actual).
+
+    Para cada formato se mide la escritura, la lectura completa y la lectura que hace
+    `cron_daily_evaluate` (etiqueta, probabilidad y variables monitoreadas), cada una en un proceso hijo
+    (ver `benchmarks.run.run_stage_isolated`), y el tamaño en disco. También se verifica si `pred_proba`
+    vuelve idéntico tras escribir y leer.
+
+    Parameters:
+        rows (int): Filas del archivo de predicciones.
+        chunksize (int): Filas por bloque al escribir.
+        seed (int): Semilla del generador.
+
+    Returns:
+        dict: Por formato, las etapas 'write', 'read' y 'read_evaluate', 'size_mib' y 'exact_proba'.
+    """
+    import numpy as np
+    import pandas as pd
+    from benchmarks.run import run_stage_isolated
+    from src.data_preprocessing import NUM_COLS
+
+    df = _scored_frame(rows, seed)
+    evaluate_cols = ["isFraud", "pred_proba"] + NUM_COLS
+    readers = {
+        "csv": (lambda path, columns=None: pd.read_csv(path, usecols=columns)),
+        "parquet": (lambda path, columns=None: pd.read_parquet(path, columns=columns)),
+    }
+    writers = {"csv": write_csv, "parquet": write_parquet}
+
+    workdir = tempfile.mkdtemp(prefix="fraud-predictions-")
+    results = {}
+    try:
+        for fmt in FORMATS:
+            path = os.path.join(workdir, f"predictions.{fmt}")
+            read = readers[fmt]
+            stages = {}
+            run_stage_isolated(stages, "write", lambda: writers[fmt](df, path, chunksize), rows)
+            run_stage_isolated(stages, "read", lambda: read(path), rows)
+            run_stage_isolated(stages, "read_evaluate", lambda: read(path, evaluate_cols), rows)
+            proba = read(path, ["pred_proba"])["pred_proba"].to_numpy()
+            results[fmt] = dict(
+                stages, size_mib=round(os.path.getsize(path) / 2**20, 1),
+                exact_proba=bool(np.array_equal(proba, df["pred_proba"].to_numpy())),
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivo de predicciones: CSV frente a Parquet.")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--chunksize", type=int, default=500_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados.")
+    args = parser.parse_args()
+
+    results = run_predictions_format_benchmark(args.rows, args.chunksize, args.seed)
+    print(f"\n{'formato':<8} {'escritura (s)':>14} {'lectura (s)':>12} {'lectura eval. (s)':>18} "
+          f"{'tamaño (MiB)':>13}  proba exacta")
+    for fmt, result in results.items():
+        print(f"{fmt:<8} {result['write']['wall_s']:14.3f} {result['read']['wall_s']:12.3f} "
+              f"{result['read_evaluate']['wall_s']:18.3f} {result['size_mib']:13.1f}  "
+              f"{'sí' if result['exact_proba'] else 'no'}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,376 @@
+# benchmarks/run.py
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results.json")
+
+RESULTS_FORMAT_VERSION = 1
+
+# Diferencias por debajo de estos mínimos se consideran ruido al comparar con la línea base
+_MIN_TIME_DELTA_S = 0.1
+_MIN_MEMORY_DELTA_MIB = 16.0
+
+OUTLIER_COLS = ['amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest']
+
+
+def run_stage(results, name, fn, rows=None):
+    """
+    Ejecuta una etapa y registra tiempo de reloj, tiempo de CPU y memoria máxima.
+
+    La medición es la de `src.profiling.stage` (forzada, aunque PROFILE_MODE sea 'off'), de modo que
+    las etapas que las tareas cron miden por dentro no alteran el pico de la etapa completa. La memoria se registra como el máximo de RSS del
+    proceso durante la etapa (`peak_rss_mib`) y su aumento respecto del RSS al comenzar
+    (`peak_delta_mib`). Fuera de Linux solo se dispone del máximo de toda la vida del proceso y el
+    aumento queda en None.
+
+    Parameters:
+        results (dict): Diccionario de etapas donde se agrega el resultado.
+        name (str): Nombre de la etapa.
+        fn (callable): Función sin argumentos a medir.
+        rows (int, optional): Filas procesadas por la etapa.
+
+    Returns:
+        object: Lo que devuelva `fn`.
+    """
+    from src.profiling import stage
+
+    with stage(name, rows, force=True) as record:
+        value = fn()
+    wall, cpu, peak = record.wall_s, record.cpu_s, record.peak_rss_mib
+
+    delta = None
+    if peak is None:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    elif record.start_rss_mib is not None:
+        delta = round(peak - record.start_rss_mib, 1)
+    results[name] = {
+        "wall_s": round(wall, 4),
+        "cpu_s": round(cpu, 4),
+        "peak_rss_mib": round(peak, 1),
+        "peak_delta_mib": delta,
+        "rows": rows,
+    }
+    print(f"{name:<24} {wall:9.3f} s  cpu {cpu:9.3f} s  peak {peak:8.1f} MiB", flush=True)
+    return value
+
+
+def _release_free_memory():
+    # Devuelve al sistema la memoria libre del heap de glibc, para que la etapa no la reutilice sin subir el RSS
+    try:
+        import ctypes
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def run_stage_isolated(results, name, fn, rows=None, summarize=None):
+    """
+    Igual que `run_stage`, pero ejecuta la etapa en un proceso hijo (fork) que parte del estado actual.
+
+    Sirve para comparar variantes de una misma etapa: la memoria que liberó una variante y el proceso
+    conserva no oculta el pico de la siguiente. Lo que devuelve `fn` se descarta, salvo lo que extraiga
+    `summarize`. Sin `fork` (fuera de Linux/macOS) la etapa se mide en el propio proceso.
+
+    Parameters:
+        results (dict): Diccionario de etapas donde se agrega el resultado.
+        name (str): Nombre de la etapa.
+        fn (callable): Función sin argumentos a medir.
+        rows (int, optional): Filas procesadas por la etapa.
+        summarize (callable, optional): Recibe lo que devolvió `fn`, fuera de la medición, y devuelve un
+            diccionario serializable que se agrega al resultado de la etapa (por ejemplo, la AUC).
+
+    Raises:
+        RuntimeError: Si el proceso hijo termina sin informar la medición.
+    """
+    import multiprocessing
+
+    def measure(stages):
+        value = run_stage(stages, name, fn, rows)
+        if summarize is not None:
+            stages[name].update(summarize(value))
+
+    if "fork" not in multiprocessing.get_all_start_methods():
+        measure(results)
+        return
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+
+    def target():
+        _release_free_memory()
+        stages = {}
+        measure(stages)
+        sender.send(stages[name])
+
+    process = context.Process(target=target)
+    process.start()
+    sender.close()
+    try:
+        results[name] = receiver.recv()
+    except EOFError:
+        raise RuntimeError(f"La etapa {name} terminó sin resultados (código {process.exitcode}).") from None
+    finally:
+        process.join()
+
+
+def _configure_environment(workdir):
+    # Rutas de trabajo aisladas; se fijan antes de importar `src` (load_dotenv no pisa variables ya definidas)
+    paths = {
+        "FRAUD_DATASET": os.path.join(workdir, "data", "transactions.csv"),
+        "DATA_CACHE_DIR": os.path.join(workdir, "data", "cache"),
+        "MODEL_PATH": os.path.join(workdir, "models", "rf_model.pkl"),
+        "PREPROCESSOR_PATH": os.path.join(workdir, "models", "preprocessor.pkl"),
+        "REFERENCE_PROFILE_PATH": os.path.join(workdir, "models", "reference_profile.json"),
+        "MODEL_MANIFEST_PATH": os.path.join(workdir, "models", "model_manifest.json"),
+        "MODEL_REGISTRY_DIR": os.path.join(workdir, "models", "registry"),
+        "MONITORING_DB": os.path.join(workdir, "data", "monitoring.db"),
+        "MONITORING_METRICS": "",
+        "SHAP_GLOBAL": os.path.join(workdir, "data", "shap_global_importance.csv"),
+        "WARNING_FILE": os.path.join(workdir, "data", "retrain_warning.txt"),
+    }
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    os.makedirs(os.path.join(workdir, "models"), exist_ok=True)
+    os.environ.update(paths)
+    return paths
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(n_rows, seed=0, workdir=None):
+    """
+    Ejecuta el pipeline completo sobre un dataset sintético y mide cada etapa.
+
+    Etapas: generación del CSV, caché columnar y carga, `engineer_features`, `impute_missing_values`,
+    `remove_outliers_iqr`, ajuste del preprocesamiento, `train_model`, perfil de referencia,
+    `check_drift`, `cron_daily_predict` y `cron_daily_evaluate`. Todo se escribe en `workdir`
+    (datos, modelo, predicciones y base de métricas), sin tocar los archivos del proyecto ni la red.
+    Además se registran comprobaciones de paridad de las rutas optimizadas.
+
+    Parameters:
+        n_rows (int): Filas del dataset sintético.
+        seed (int): Semilla del generador.
+        workdir (str, optional): Carpeta de trabajo. Por defecto una carpeta temporal que se borra al final.
+
+    Returns:
+        dict: Resultados serializables en JSON ('meta', 'stages', 'checks').
+    """
+    own_workdir = workdir is None
+    workdir = os.path.abspath(workdir or tempfile.mkdtemp(prefix="fraud-bench-"))
+    paths = _configure_environment(workdir)
+    sys.path.insert(0, REPO_DIR)
+    previous_cwd = os.getcwd()
+    # Las tareas cron escriben las predicciones en rutas relativas (data/...)
+    os.chdir(workdir)
+
+    try:
+        import joblib
+        import numpy as np
+        from sklearn.metrics import roc_auc_score
+        from benchmarks.synthetic import write_transactions_csv
+        from src import utils
+        from src.data_cache import load_dataset
+        from src.data_preprocessing import (
+            FraudPreprocessor, engineer_features, impute_missing_values, NUM_COLS, TRANSACTION_TYPES,
+        )
+        from src.forest_engine import FlatForest
+        from src.metrics_engine import classification_metrics
+        from src.metrics_store import latest_metrics
+        from src.model_training import train_model
+        from src.monitoring import check_drift
+        from src.outlier_detection import remove_outliers_iqr
+        from src.reference_profile import build_reference_profile, save_reference_profile
+
+        stages, checks = {}, {}
+        csv_path = paths["FRAUD_DATASET"]
+        run_stage(stages, "generate", lambda: write_transactions_csv(csv_path, n_rows, seed, missing_rate=0.001), n_rows)
+        raw = run_stage(stages, "load_dataset", lambda: load_dataset(csv_path), n_rows)
+
+        features = run_stage(
+            stages, "engineer_features", lambda: engineer_features(raw, type_categories=TRANSACTION_TYPES), n_rows
+        )
+        imputed = run_stage(stages, "impute_missing_values", lambda: impute_missing_values(features, NUM_COLS), n_rows)
+        filtered = run_stage(stages, "remove_outliers_iqr", lambda: remove_outliers_iqr(imputed, OUTLIER_COLS), n_rows)
+        stages["remove_outliers_iqr"]["rows_out"] = len(filtered)
+        del features, imputed, filtered
+
+        preprocessor = FraudPreprocessor()
+        df = run_stage(stages, "fit_preprocessor", lambda: preprocessor.fit_transform(raw), n_rows)
+        joblib.dump(preprocessor, paths["PREPROCESSOR_PATH"])
+        del raw
+
+        X, y = df[preprocessor.feature_names_], df["isFraud"]
+        negative_rate = float(os.getenv("TRAIN_NEGATIVE_RATE", 1.0))
+        model, X_train, X_test, y_train, y_test = run_stage(
+            stages, "train_model", lambda: train_model(X, y, negative_rate=negative_rate), n_rows
+        )
+        joblib.dump(model, paths["MODEL_PATH"])
+        proba = model.predict_proba(X_test)[:, 1]
+        stages["train_model"].update(
+            train_rows=len(X_train), negative_rate=negative_rate,
+            test_auc=classification_metrics(y_test, proba)["auc"],
+        )
+
+        profile = run_stage(stages, "build_reference_profile", lambda: build_reference_profile(df, NUM_COLS, missing=preprocessor.missing_counts_), n_rows)
+        save_reference_profile(profile, paths["REFERENCE_PROFILE_PATH"])
+
+        middle = int(df["step"].median())
+        run_stage(stages, "check_drift",
+                  lambda: check_drift(df[df["step"] > middle], df[df["step"] <= middle], NUM_COLS), n_rows)
+        del df, X, y, X_train
+
+        run_stage(stages, "cron_daily_predict", utils.cron_daily_predict, n_rows)
+        run_stage(stages, "cron_daily_evaluate", utils.cron_daily_evaluate, n_rows)
+        stages["cron_daily_evaluate"]["auc"] = float(latest_metrics()["auc"])
+
+        # Paridad de las rutas optimizadas con las de referencia
+        checks["metrics_engine_auc_matches_sklearn"] = bool(
+            np.isclose(stages["train_model"]["test_auc"], roc_auc_score(y_test, proba), rtol=0, atol=1e-12)
+        )
+        sample = X_test.iloc[:200]
+        checks["flat_backend_matches_sklearn"] = bool(
+            np.array_equal(FlatForest.from_sklearn(model).predict_proba(sample), model.predict_proba(sample))
+        )
+    finally:
+        os.chdir(previous_cwd)
+        if own_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "format_version": RESULTS_FORMAT_VERSION,
+        "meta": {
+            "rows": n_rows,
+            "seed": seed,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "stages": stages,
+        "checks": checks,
+    }
+
+
+def best_of(runs):
+    """
+    Combina varias corridas quedándose, por etapa, con la de menor tiempo de reloj y la menor memoria.
+
+    Parameters:
+        runs (list): Resultados de `run_benchmarks` con las mismas etapas.
+
+    Returns:
+        dict: Resultados combinados; una comprobación pasa solo si pasó en todas las corridas.
+    """
+    results = dict(runs[0], meta=dict(runs[0]["meta"], repeat=len(runs)))
+    results["stages"] = {}
+    for name in runs[0]["stages"]:
+        stages = [run["stages"][name] for run in runs]
+        best = dict(min(stages, key=lambda stage: stage["wall_s"]))
+        # La memoria depende de lo que el proceso ya liberó en corridas anteriores: se toma su mínimo aparte
+        best["peak_rss_mib"] = min(stage["peak_rss_mib"] for stage in stages)
+        deltas = [stage["peak_delta_mib"] for stage in stages if stage["peak_delta_mib"] is not None]
+        best["peak_delta_mib"] = min(deltas) if deltas else None
+        results["stages"][name] = best
+    results["checks"] = {name: all(run["checks"][name] for run in runs) for name in runs[0]["checks"]}
+    return results
+
+
+def compare_results(results, baseline, tolerance=0.2):
+    """
+    Compara resultados con una línea base guardada.
+
+    Una etapa es una regresión si su tiempo de reloj o su aumento de memoria superan los de la línea
+    base en más de `tolerance` (fracción) y además en más de 0.1 s / 16 MiB, para no marcar ruido
+    en etapas muy cortas. Una comprobación de paridad que falla también se informa.
+
+    Parameters:
+        results (dict): Resultados de `run_benchmarks`.
+        baseline (dict): Resultados guardados con los que comparar.
+        tolerance (float): Aumento relativo permitido.
+
+    Returns:
+        list: Mensajes de regresión (vacía si no hay).
+    """
+    regressions = []
+    if results["meta"]["rows"] != baseline["meta"]["rows"]:
+        print(f"Aviso: la línea base usa {baseline['meta']['rows']} filas y esta corrida {results['meta']['rows']}; "
+              "los tiempos no son comparables.")
+    print(f"\n{'etapa':<24} {'base (s)':>10} {'actual (s)':>11} {'ratio':>7}")
+    for name, current in results["stages"].items():
+        base = baseline["stages"].get(name)
+        if base is None:
+            continue
+        ratio = current["wall_s"] / base["wall_s"] if base["wall_s"] else float("inf")
+        print(f"{name:<24} {base['wall_s']:10.3f} {current['wall_s']:11.3f} {ratio:7.2f}")
+        if (current["wall_s"] > base["wall_s"] * (1 + tolerance)
+                and current["wall_s"] - base["wall_s"] > _MIN_TIME_DELTA_S):
+            regressions.append(f"{name}: tiempo {base['wall_s']:.3f} s -> {current['wall_s']:.3f} s")
+        if current.get("peak_delta_mib") is not None and base.get("peak_delta_mib") is not None:
+            if (current["peak_delta_mib"] > base["peak_delta_mib"] * (1 + tolerance)
+                    and current["peak_delta_mib"] - base["peak_delta_mib"] > _MIN_MEMORY_DELTA_MIB):
+                regressions.append(
+                    f"{name}: memoria {base['peak_delta_mib']:.1f} MiB -> {current['peak_delta_mib']:.1f} MiB"
+                )
+    for name, passed in results["checks"].items():
+        if not passed:
+            regressions.append(f"comprobación fallida: {name}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de punta a punta del pipeline de fraude.")
+    parser.add_argument("--rows", type=int, default=200_000, help="Filas del dataset sintético (100k a 10M).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="Corridas; por etapa se toma la más rápida.")
+    parser.add_argument("--workdir", help="Carpeta de trabajo (por defecto, temporal).")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Archivo JSON de resultados.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Línea base con la que comparar.")
+    parser.add_argument("--save-baseline", action="store_true", help="Guarda los resultados como línea base.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Aumento relativo permitido (0.2 = 20%%).")
+    args = parser.parse_args()
+
+    results = best_of([run_benchmarks(args.rows, args.seed, args.workdir) for _ in range(args.repeat)])
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResultados guardados en {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Línea base guardada en {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No hay línea base para comparar (usar --save-baseline).")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare_results(results, json.load(f), args.tolerance)
+    if regressions:
+        print("\nRegresiones:")
+        for message in regressions:
+            print(f"  - {message}")
+        return 1
+    print("\nSin regresiones respecto de la línea base.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
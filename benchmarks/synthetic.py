@@ -0,0 +1,159 @@
+# benchmarks/synthetic.py
+
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+# Proporciones de tipos de transacción del dataset PaySim original
+TYPE_PROBS = {
+    'CASH_IN': 0.22,
+    'CASH_OUT': 0.352,
+    'DEBIT': 0.0065,
+    'PAYMENT': 0.3385,
+    'TRANSFER': 0.083,
+}
+
+# Monto típico (mediana, log-normal) por tipo
+_AMOUNT_MEDIAN = {'CASH_IN': 140_000, 'CASH_OUT': 150_000, 'DEBIT': 3_000, 'PAYMENT': 9_500, 'TRANSFER': 490_000}
+
+N_STEPS = 743
+
+COLUMNS = [
+    'step', 'type', 'amount', 'nameOrig', 'oldbalanceOrg', 'newbalanceOrig',
+    'nameDest', 'oldbalanceDest', 'newbalanceDest', 'isFraud', 'isFlaggedFraud',
+]
+
+_CHUNK_ROWS = 1_000_000
+
+
+def _names(prefix, ids):
+    return np.char.add(prefix, ids.astype(str)).astype(object)
+
+
+def _chunk(rng, step, fraud_rate, missing_rate, n_accounts):
+    n = len(step)
+    types = np.array(list(TYPE_PROBS))
+    type_idx = rng.choice(len(types), size=n, p=list(TYPE_PROBS.values()))
+    tx_type = types[type_idx]
+    medians = np.array([_AMOUNT_MEDIAN[t] for t in types])[type_idx]
+    amount = np.round(medians * rng.lognormal(0.0, 1.0, n), 2)
+
+    old_orig = np.round(np.where(rng.random(n) < 0.33, 0.0, rng.lognormal(10.5, 2.0, n)), 2)
+    outgoing = tx_type != 'CASH_IN'
+    new_orig = np.where(outgoing, np.maximum(old_orig - amount, 0.0), old_orig + amount)
+    old_dest = np.round(np.where(rng.random(n) < 0.42, 0.0, rng.lognormal(12.5, 2.0, n)), 2)
+    to_merchant = tx_type == 'PAYMENT'
+    new_dest = np.where(to_merchant, 0.0, np.where(outgoing, old_dest + amount, np.maximum(old_dest - amount, 0.0)))
+    old_dest = np.where(to_merchant, 0.0, old_dest)
+
+    # Fraude solo en TRANSFER / CASH_OUT; el defraudador suele vaciar la cuenta de origen
+    eligible = (tx_type == 'TRANSFER') | (tx_type == 'CASH_OUT')
+    fraud = eligible & (rng.random(n) < fraud_rate / (TYPE_PROBS['TRANSFER'] + TYPE_PROBS['CASH_OUT']))
+    emptied = fraud & (rng.random(n) < 0.9)
+    amount = np.where(emptied & (old_orig > 0), old_orig, amount)
+    new_orig = np.where(emptied, 0.0, new_orig)
+    new_dest = np.where(fraud & (rng.random(n) < 0.5), old_dest, new_dest)
+
+    df = pd.DataFrame({
+        'step': step,
+        'type': tx_type,
+        'amount': amount,
+        'nameOrig': _names('C', rng.integers(0, n_accounts, n)),
+        'oldbalanceOrg': old_orig,
+        'newbalanceOrig': np.round(new_orig, 2),
+        'nameDest': np.where(to_merchant, _names('M', rng.integers(0, n_accounts, n)),
+                             _names('C', rng.integers(0, n_accounts, n))),
+        'oldbalanceDest': old_dest,
+        'newbalanceDest': np.round(new_dest, 2),
+        'isFraud': fraud.astype(np.int8),
+        'isFlaggedFraud': (fraud & (tx_type == 'TRANSFER') & (amount > 200_000)).astype(np.int8),
+    }, columns=COLUMNS)
+
+    if missing_rate:
+        for col in ['oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest']:
+            df.loc[rng.random(n) < missing_rate, col] = np.nan
+    return df
+
+
+def generate_transactions(n_rows, seed=0, fraud_rate=0.0013, missing_rate=0.0):
+    """
+    Genera transacciones sintéticas con el esquema de FRAUD_DATASET (PaySim), por bloques.
+
+    Las filas vienen ordenadas por `step` (1 a 743, una hora por step). Tipos y montos siguen
+    las proporciones de PaySim; el fraude aparece solo en TRANSFER y CASH_OUT y en general vacía la
+    cuenta de origen, de modo que un modelo entrenado sobre estos datos tiene señal para aprender.
+    Con la misma semilla y cantidad de filas el resultado es siempre el mismo.
+
+    Parameters:
+        n_rows (int): Número de transacciones.
+        seed (int): Semilla.
+        fraud_rate (float): Proporción de fraudes (PaySim: ~0.13%).
+        missing_rate (float): Proporción de saldos nulos por columna (PaySim no tiene nulos).
+
+    Yields:
+        pd.DataFrame: Bloques de hasta 1.000.000 de filas.
+    """
+    rng = np.random.default_rng(seed)
+    steps = np.sort(rng.integers(1, N_STEPS + 1, n_rows)).astype(np.int32)
+    n_accounts = max(n_rows // 2, 1)
+    for start in range(0, n_rows, _CHUNK_ROWS):
+        yield _chunk(rng, steps[start:start + _CHUNK_ROWS], fraud_rate, missing_rate, n_accounts)
+
+
+def transactions_frame(n_rows, seed=0, fraud_rate=0.0013, missing_rate=0.0):
+    """
+    Genera transacciones sintéticas en un único DataFrame con los tipos que devuelve `load_dataset`.
+
+    Sirve a los benchmarks de una función aislada, sin pasar por el CSV ni el caché columnar: saldos
+    y monto en float32 y 'type' como categoría (ver `src.data_cache.COMPACT_DTYPES`).
+
+    Parameters:
+        n_rows (int): Número de transacciones.
+        seed (int): Semilla.
+        fraud_rate (float): Proporción de fraudes.
+        missing_rate (float): Proporción de saldos nulos por columna.
+
+    Returns:
+        pd.DataFrame: Transacciones ordenadas por `step`.
+    """
+    df = pd.concat(generate_transactions(n_rows, seed, fraud_rate, missing_rate), ignore_index=True)
+    float_cols = ['amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest']
+    return df.astype({**{col: np.float32 for col in float_cols}, 'type': 'category'})
+
+
+def write_transactions_csv(path, n_rows, seed=0, fraud_rate=0.0013, missing_rate=0.0):
+    """
+    Escribe un CSV sintético con el esquema de FRAUD_DATASET (ver `generate_transactions`).
+
+    Parameters:
+        path (str): Ruta del CSV destino.
+        n_rows (int): Número de transacciones.
+        seed (int): Semilla.
+        fraud_rate (float): Proporción de fraudes.
+        missing_rate (float): Proporción de saldos nulos por columna.
+
+    Returns:
+        str: Ruta escrita.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    for i, chunk in enumerate(generate_transactions(n_rows, seed, fraud_rate, missing_rate)):
+        chunk.to_csv(tmp_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un dataset sintético con el esquema de PaySim.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fraud-rate", type=float, default=0.0013)
+    parser.add_argument("--missing-rate", type=float, default=0.0)
+    parser.add_argument("--out", default="data/synthetic_fraud.csv")
+    args = parser.parse_args()
+    write_transactions_csv(args.out, args.rows, args.seed, args.fraud_rate, args.missing_rate)
+
+
+if __name__ == "__main__":
+    main()
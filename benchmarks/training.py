@@ -0,0 +1,116 @@
+# benchmarks/training.py
+
+import sys
+import json
+import argparse
+
+DEFAULT_NEGATIVE_RATES = [1.0, 0.1, 0.05, 0.02]
+
+
+def train_model_reference(X, y):
+    """
+    Versión anterior de `train_model` (partición del DataFrame en float64, un solo núcleo, sin submuestreo).
+
+    Se conserva solo como punto de comparación del benchmark.
+
+    Parameters:
+        X (pd.DataFrame): Variables predictoras.
+        y (pd.Series): Variable objetivo binaria.
+
+    Returns:
+        tuple: (model, X_train, X_test, y_train, y_test), como `train_model`.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, stratify=y, random_state=42)
+    model = RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42)
+    model.fit(X_train, y_train)
+    return model, X_train, X_test, y_train, y_test
+
+
+def _summarize(trained):
+    # AUC y probabilidad media en la partición de prueba (que no se submuestrea) y huella de las probabilidades
+    import hashlib
+    import numpy as np
+    from src.metrics_engine import classification_metrics
+
+    model, _, X_test, _, y_test = trained
+    proba = np.ascontiguousarray(model.predict_proba(X_test)[:, 1])
+    return {
+        "auc": classification_metrics(y_test, proba)["auc"],
+        "mean_proba": float(proba.mean()),
+        "test_fraud_rate": float(y_test.mean()),
+        "proba_digest": hashlib.blake2b(proba.tobytes(), digest_size=16).hexdigest(),
+    }
+
+
+def run_training_benchmark(rows=1_000_000, negative_rates=DEFAULT_NEGATIVE_RATES, n_jobs=None, seed=0):
+    """
+    Mide tiempo, memoria y AUC de `train_model` por fracción de negativos frente a la versión anterior.
+
+    Todas las variantes entrenan sobre el mismo dataset sintético preprocesado y con la misma partición
+    de prueba; cada una se mide en un proceso hijo (ver `benchmarks.run.run_stage_isolated`). La
+    memoria es el aumento del pico de RSS durante el entrenamiento (`peak_delta_mib`). Con
+    `negative_rate` 1 el modelo debe ser idéntico al anterior (mismas probabilidades de prueba).
+
+    Parameters:
+        rows (int): Filas del dataset sintético.
+        negative_rates (list): Fracciones de negativos a medir.
+        n_jobs (int, optional): Núcleos para entrenar. Por defecto TRAIN_N_JOBS.
+        seed (int): Semilla del generador.
+
+    Returns:
+        dict: Por variante ('anterior' y 'rate_<fracción>'), la medición, 'auc', 'mean_proba',
+            'test_fraud_rate' y 'proba_digest'.
+    """
+    from benchmarks.run import run_stage_isolated
+    from benchmarks.synthetic import transactions_frame
+    from src.data_preprocessing import FraudPreprocessor
+    from src.model_training import train_model
+
+    preprocessor = FraudPreprocessor()
+    df = preprocessor.fit_transform(transactions_frame(rows, seed))
+    X, y = df[preprocessor.feature_names_], df["isFraud"]
+
+    results = {}
+    run_stage_isolated(results, "anterior", lambda: train_model_reference(X, y), rows, summarize=_summarize)
+    for rate in negative_rates:
+        run_stage_isolated(results, f"rate_{rate:g}", lambda: train_model(X, y, n_jobs=n_jobs, negative_rate=rate),
+                           rows, summarize=_summarize)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrenamiento por fracción de negativos frente a la versión anterior.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--negative-rates", type=float, nargs="+", default=DEFAULT_NEGATIVE_RATES)
+    parser.add_argument("--n-jobs", type=int, help="Núcleos para entrenar (por defecto TRAIN_N_JOBS).")
+    parser.add_argument("--auc-tolerance", type=float, default=0.01,
+                        help="Caída máxima de AUC admitida respecto de la versión anterior.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados.")
+    args = parser.parse_args()
+
+    results = run_training_benchmark(args.rows, args.negative_rates, args.n_jobs, args.seed)
+    reference = results["anterior"]
+    ok = True
+    print(f"\n{'variante':<10} {'tiempo (s)':>11} {'pico (MiB)':>11} {'AUC':>8} {'ΔAUC':>8} {'p media':>9}")
+    for name, result in results.items():
+        delta = result["auc"] - reference["auc"]
+        within = delta >= -args.auc_tolerance
+        if name == "rate_1":
+            within &= result["proba_digest"] == reference["proba_digest"]
+        ok &= within
+        peak = "-" if result["peak_delta_mib"] is None else f"{result['peak_delta_mib']:.1f}"
+        print(f"{name:<10} {result['wall_s']:11.3f} {peak:>11} {result['auc']:8.4f} {delta:+8.4f} "
+              f"{result['mean_proba']:9.5f}{'' if within else '  FUERA DE TOLERANCIA'}")
+    print(f"Tasa de fraude de la partición de prueba: {reference['test_fraud_rate']:.5f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
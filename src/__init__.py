@@ -0,0 +1,6 @@
+# src/__init__.py
+
+from dotenv import load_dotenv
+
+# La configuración (.env) se lee una sola vez, al importar el paquete; los módulos la consultan con os.getenv
+load_dotenv()
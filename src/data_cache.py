@@ -0,0 +1,204 @@
+# src/data_cache.py
+
+import os
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Tipos compactos para las columnas conocidas del dataset PaySim. Las columnas que no
+# aparecen aquí conservan el tipo inferido por pandas.
+COMPACT_DTYPES = {
+    'step': 'Int32',
+    'type': 'category',
+    'amount': 'float32',
+    'oldbalanceOrg': 'float32',
+    'newbalanceOrig': 'float32',
+    'oldbalanceDest': 'float32',
+    'newbalanceDest': 'float32',
+    'isFraud': 'Int8',
+    'isFlaggedFraud': 'Int8',
+}
+
+CACHE_FORMAT_VERSION = "1"
+
+_CONVERT_CHUNKSIZE = 1_000_000
+
+
+def get_cache_path(csv_path, cache_dir=None):
+    """
+    Devuelve la ruta del archivo de caché (Arrow IPC / Feather v2) asociado a un CSV.
+
+    Parameters:
+        csv_path (str): Ruta al CSV de origen.
+        cache_dir (str, optional): Carpeta de caché. Por defecto DATA_CACHE_DIR o 'data/cache'.
+
+    Returns:
+        str: Ruta del archivo `.arrow` en la carpeta de caché.
+    """
+    cache_dir = cache_dir or os.getenv("DATA_CACHE_DIR", "data/cache")
+    source = os.path.abspath(csv_path)
+    digest = hashlib.sha1(source.encode("utf-8")).hexdigest()[:10]
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(cache_dir, f"{stem}-{digest}.arrow")
+
+
+def _source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {
+        b"source_mtime_ns": str(stat.st_mtime_ns).encode(),
+        b"source_size": str(stat.st_size).encode(),
+        b"cache_format": CACHE_FORMAT_VERSION.encode(),
+    }
+
+
+def _is_fresh(cache_path, csv_path):
+    if not os.path.exists(cache_path):
+        return False
+    try:
+        with pa.memory_map(cache_path) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return False
+    signature = _source_signature(csv_path)
+    return all(metadata.get(key) == value for key, value in signature.items())
+
+
+def build_cache(csv_path, cache_path):
+    """
+    Convierte un CSV en un archivo Arrow IPC con tipos compactos.
+
+    El CSV se lee por bloques; 'type' se guarda como categoría (diccionario), los saldos como
+    float32 y los indicadores como int8. La firma del CSV (mtime y tamaño) se guarda en los
+    metadatos del esquema para detectar cuándo el caché queda obsoleto. El archivo se escribe
+    sin compresión para poder leerlo mediante memory-mapping.
+
+    Parameters:
+        csv_path (str): Ruta al CSV de origen.
+        cache_path (str): Ruta del archivo de caché a generar.
+    """
+    header = pd.read_csv(csv_path, nrows=0).columns
+    dtypes = {col: dtype for col, dtype in COMPACT_DTYPES.items() if col in header}
+
+    # Sin metadatos de pandas: al leer, los enteros sin nulos vuelven como int8/int32 de NumPy
+    # en lugar de tipos nullable de pandas.
+    tables = [
+        pa.Table.from_pandas(chunk, preserve_index=False).replace_schema_metadata(None)
+        for chunk in pd.read_csv(csv_path, dtype=dtypes, chunksize=_CONVERT_CHUNKSIZE)
+    ]
+    table = pa.concat_tables(tables).unify_dictionaries()
+    table = table.replace_schema_metadata(_source_signature(csv_path))
+
+    # Temporal propio en la misma carpeta: dos procesos que reconstruyen el caché a la vez (la tarea
+    # cron y el dashboard) no escriben el mismo archivo, y cada uno lo reemplaza completo
+    cache_dir = os.path.dirname(cache_path) or "."
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=f".{os.path.basename(cache_path)}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        os.chmod(tmp_path, 0o644)  # mkstemp lo crea solo legible por el dueño
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=_CONVERT_CHUNKSIZE)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def open_dataset(csv_path, columns=None, cache_dir=None):
+    """
+    Abre un CSV a través del caché columnar como tabla Arrow memory-mapped.
+
+    Si el caché no existe o el CSV cambió desde que se generó, se reconstruye.
+
+    Parameters:
+        csv_path (str): Ruta al CSV de origen.
+        columns (list, optional): Columnas a proyectar. Si es None se devuelven todas.
+        cache_dir (str, optional): Carpeta de caché.
+
+    Returns:
+        pyarrow.Table: Tabla respaldada por el archivo mapeado en memoria.
+    """
+    cache_path = get_cache_path(csv_path, cache_dir)
+    if not _is_fresh(cache_path, csv_path):
+        build_cache(csv_path, cache_path)
+    table = pa.ipc.open_file(pa.memory_map(cache_path)).read_all()
+    if columns is not None:
+        table = table.select(columns)
+    return table
+
+
+def _to_pandas(table):
+    return table.to_pandas(split_blocks=True)
+
+
+def load_dataset(csv_path, columns=None, cache_dir=None, filter=None):
+    """
+    Carga un dataset desde el caché columnar, generándolo si es necesario.
+
+    Parameters:
+        csv_path (str): Ruta al CSV de origen.
+        columns (list, optional): Columnas a cargar. Solo se leen del disco las solicitadas.
+        cache_dir (str, optional): Carpeta de caché.
+        filter (pyarrow.compute.Expression, optional): Filtro de filas aplicado sobre la tabla Arrow,
+            antes de convertir a pandas (por ejemplo `pc.field('step') > 500`).
+
+    Returns:
+        pd.DataFrame: Dataset con tipos compactos.
+    """
+    table = open_dataset(csv_path, columns, cache_dir)
+    if filter is not None:
+        table = table.filter(filter)
+    return _to_pandas(table)
+
+
+def iter_dataset_chunks(csv_path, chunksize, columns=None, cache_dir=None):
+    """
+    Recorre un dataset del caché columnar en bloques de tamaño fijo.
+
+    Solo el bloque en curso se convierte a pandas; el resto permanece en el archivo mapeado.
+
+    Parameters:
+        csv_path (str): Ruta al CSV de origen.
+        chunksize (int): Filas por bloque.
+        columns (list, optional): Columnas a cargar.
+        cache_dir (str, optional): Carpeta de caché.
+
+    Yields:
+        pd.DataFrame: Bloque del dataset con tipos compactos.
+    """
+    table = open_dataset(csv_path, columns, cache_dir)
+    for offset in range(0, table.num_rows, chunksize):
+        yield _to_pandas(table.slice(offset, chunksize))
+
+
+def sample_dataset(csv_path, n, random_state=None, columns=None, cache_dir=None):
+    """
+    Toma una muestra aleatoria de filas del caché columnar sin convertir el dataset completo.
+
+    Solo las filas elegidas se leen del archivo mapeado y se convierten a pandas. Devuelve las mismas
+    filas, en el mismo orden y con las mismas etiquetas de índice que
+    `load_dataset(csv_path).sample(n=n, random_state=random_state)`.
+
+    Parameters:
+        csv_path (str): Ruta al CSV de origen.
+        n (int): Número de filas de la muestra.
+        random_state (int, optional): Semilla.
+        columns (list, optional): Columnas a cargar.
+        cache_dir (str, optional): Carpeta de caché.
+
+    Returns:
+        pd.DataFrame: Muestra con tipos compactos.
+
+    Raises:
+        ValueError: Si `n` supera el número de filas.
+    """
+    table = open_dataset(csv_path, columns, cache_dir)
+    if n > table.num_rows:
+        raise ValueError(f"La muestra ({n} filas) no puede ser mayor que el dataset ({table.num_rows} filas).")
+    indices = np.random.RandomState(random_state).choice(table.num_rows, size=n, replace=False)
+    df = _to_pandas(table.take(indices))
+    df.index = indices
+    return df
@@ -1,10 +1,29 @@
 # src/data_preprocessing.py
 
+import numpy as np
 import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.impute import SimpleImputer
 import joblib
+from src.velocity_store import AccountVelocityStore
+from src.profiling import profiled, stage
 
-def engineer_features(df):
+# Categorías conocidas de la columna 'type' (PaySim). Fijarlas garantiza el mismo
+# layout one-hot aunque un bloque de datos no contenga todos los tipos.
+TRANSACTION_TYPES = ['CASH_IN', 'CASH_OUT', 'DEBIT', 'PAYMENT', 'TRANSFER']
+
+# Columnas numéricas (originales y derivadas) que se imputan.
+NUM_COLS = [
+    'step', 'amount', 'oldbalanceOrg', 'newbalanceOrig',
+    'oldbalanceDest', 'newbalanceDest',
+    'balance_diff_orig', 'balance_diff_dest', 'amount_to_balance_ratio'
+]
+
+# Columnas que no se usan como variables predictoras.
+NON_FEATURE_COLS = ['nameOrig', 'nameDest', 'isFlaggedFraud', 'isFraud']
+
+@profiled(rows_arg='df')
+def engineer_features(df, type_categories=None, inplace=False, velocity=None):
     """
     Realiza ingeniería de características sobre el dataset original.
 
@@ -13,29 +32,59 @@ def engineer_features(df):
         - Indicadores de errores o inconsistencias en saldos (como saldos 0 antes y después).
         - Ratio entre monto y saldo original.
         - Codificación one-hot del tipo de transacción.
+        - Opcionalmente, actividad reciente de las cuentas de origen y destino (`VELOCITY_FEATURES`).
+
+    Las variables se calculan directamente sobre los buffers NumPy de las columnas, sin copiar el
+    DataFrame completo (por defecto solo se copia la estructura de columnas con `copy(deep=False)`).
+    Las diferencias y el ratio se calculan en float64 y se guardan en float32, el mismo redondeo que
+    aplica scikit-learn al entrenar y predecir; indicadores y one-hot se guardan en uint8.
 
     Parameters:
         df (pd.DataFrame): Dataset original con columnas financieras y de tipo de transacción.
+        type_categories (list, optional): Categorías fijas para el one-hot de 'type'. Si se indican,
+            siempre se generan las mismas columnas 'type_*' en el mismo orden (necesario al procesar
+            por bloques). Si es None, se usan las categorías presentes en `df`.
+        inplace (bool, optional): Si es True, agrega las columnas y elimina 'type' sobre el propio `df`.
+        velocity (AccountVelocityStore, optional): Estado por cuenta. Si se indica, se agregan las variables
+            de `VELOCITY_FEATURES` y las transacciones de `df` se incorporan al estado, de modo que el
+            siguiente bloque (con steps iguales o posteriores) continúa donde terminó este.
 
     Returns:
         pd.DataFrame: Dataset enriquecido con nuevas columnas.
     """
-    df = df.copy()
+    if not inplace:
+        df = df.copy(deep=False)
+
+    old_orig = df['oldbalanceOrg'].to_numpy()
+    new_orig = df['newbalanceOrig'].to_numpy()
+    old_dest = df['oldbalanceDest'].to_numpy()
+    new_dest = df['newbalanceDest'].to_numpy()
 
     # 1. Diferencias de saldo
-    df['balance_diff_orig'] = df['oldbalanceOrg'] - df['newbalanceOrig']
-    df['balance_diff_dest'] = df['newbalanceDest'] - df['oldbalanceDest']
+    df['balance_diff_orig'] = np.subtract(old_orig, new_orig, dtype=np.float64).astype(np.float32)
+    df['balance_diff_dest'] = np.subtract(new_dest, old_dest, dtype=np.float64).astype(np.float32)
 
     # 2. Errores o casos atípicos
     # Marcamos transacciones donde el saldo inicial y final son 0
-    df['error_balance_orig'] = ((df['oldbalanceOrg'] == 0) & (df['newbalanceOrig'] == 0)).astype(int)
-    df['error_balance_dest'] = ((df['oldbalanceDest'] == 0) & (df['newbalanceDest'] == 0)).astype(int)
+    df['error_balance_orig'] = ((old_orig == 0) & (new_orig == 0)).view(np.uint8)
+    df['error_balance_dest'] = ((old_dest == 0) & (new_dest == 0)).view(np.uint8)
 
     # 3. Ratio monto / saldo
-    df['amount_to_balance_ratio'] = df['amount'] / (df['oldbalanceOrg'] + 1)
+    ratio = np.add(old_orig, 1, dtype=np.float64)
+    np.divide(df['amount'].to_numpy(), ratio, out=ratio)
+    df['amount_to_balance_ratio'] = ratio.astype(np.float32)
 
-    # 4. One-hot encoding del tipo de transacción
-    df = pd.get_dummies(df, columns=['type'], prefix='type')
+    # 4. One-hot encoding del tipo de transacción, a partir de los códigos de categoría
+    types = pd.Categorical(df.pop('type'), categories=type_categories)
+    for code, category in enumerate(types.categories):
+        df[f'type_{category}'] = (types.codes == code).view(np.uint8)
+
+    # 5. Conteos y montos recientes por cuenta, actualizados de forma incremental
+    if velocity is not None:
+        with stage('velocity', rows=len(df)):
+            features = velocity.update(df['step'], df['nameOrig'], df['nameDest'], df['amount'])
+        for name, values in features.items():
+            df[name] = values
 
     return df
 
@@ -57,4 +106,123 @@ def impute_missing_values(X, num_cols, strategy='median', save_path=None):
     X[num_cols] = imputer.fit_transform(X[num_cols])
     if save_path:
         joblib.dump(imputer, save_path)
-    return X
\ No newline at end of file
+    return X
+
+
+class FraudPreprocessor(BaseEstimator, TransformerMixin):
+    """
+    Preprocesamiento completo ajustado una sola vez en entrenamiento y reutilizado en inferencia.
+
+    Encadena `engineer_features` con un layout one-hot fijo para 'type' y un `SimpleImputer`
+    ajustado sobre los datos de entrenamiento. En inferencia solo se llama a `transform`, por lo
+    que no se recalculan medianas y el orden de columnas coincide siempre con el del entrenamiento.
+
+    Con `velocity_window`, se agregan además las variables por cuenta de `VELOCITY_FEATURES` sobre los
+    últimos `velocity_window` steps. Su estado (`AccountVelocityStore`) no forma parte del ajuste:
+    `fit`, `transform` y `fit_transform` reciben el estado a continuar en `velocity` y, si no se indica,
+    parten de uno vacío (ver `new_velocity_store`). Para procesar un dataset por bloques hay que
+    pasar el mismo estado a cada bloque.
+
+    Parameters:
+        num_cols (list): Columnas numéricas a imputar.
+        type_categories (list): Categorías fijas de la columna 'type'.
+        strategy (str): Estrategia de imputación ('mean', 'median', etc.).
+        velocity_window (int, optional): Steps que cubren las variables por cuenta. Si es None no se agregan.
+
+    Attributes:
+        imputer_ (SimpleImputer): Imputador ajustado sobre `num_cols`.
+        missing_counts_ (dict): Valores faltantes por columna de `num_cols` en los datos de ajuste,
+            antes de imputar (para el perfil de referencia).
+        feature_names_ (list): Columnas predictoras, en el orden esperado por el modelo.
+    """
+
+    def __init__(self, num_cols=NUM_COLS, type_categories=TRANSACTION_TYPES, strategy='median',
+                 velocity_window=None):
+        self.num_cols = num_cols
+        self.type_categories = type_categories
+        self.strategy = strategy
+        self.velocity_window = velocity_window
+
+    def new_velocity_store(self):
+        """
+        Crea un estado vacío para las variables por cuenta.
+
+        Returns:
+            AccountVelocityStore or None: None si el preprocesamiento no usa variables por cuenta.
+        """
+        # Los preprocesamientos guardados antes de esta opción no tienen el atributo
+        window = getattr(self, 'velocity_window', None)
+        return AccountVelocityStore(window) if window else None
+
+    def _velocity(self, velocity):
+        if not getattr(self, 'velocity_window', None):
+            return None
+        return velocity if velocity is not None else self.new_velocity_store()
+
+    def fit(self, df, y=None, velocity=None):
+        """
+        Ajusta el imputador y fija el layout de columnas a partir del dataset original.
+
+        Parameters:
+            df (pd.DataFrame): Dataset original (sin ingeniería de características).
+            y: Ignorado, presente por compatibilidad con scikit-learn.
+            velocity (AccountVelocityStore, optional): Estado por cuenta a continuar.
+
+        Returns:
+            FraudPreprocessor: La propia instancia ajustada.
+        """
+        self._fit(self._engineer(df, velocity))
+        return self
+
+    def transform(self, df, velocity=None, return_missing=False):
+        """
+        Aplica la ingeniería de características y la imputación ya ajustada.
+
+        Parameters:
+            df (pd.DataFrame): Dataset original (sin ingeniería de características).
+            velocity (AccountVelocityStore, optional): Estado por cuenta a continuar.
+            return_missing (bool): Si es True, devuelve además los valores faltantes por columna de
+                `num_cols` antes de imputar (como `missing_counts_`, pero de `df`).
+
+        Returns:
+            pd.DataFrame: Dataset enriquecido e imputado. Conserva las columnas no predictoras
+            (nombres, target); usar `feature_names_` para seleccionar la matriz del modelo.
+            Con `return_missing`, la tupla (dataset, faltantes por columna).
+        """
+        df = self._engineer(df, velocity)
+        if not return_missing:
+            return self._transform(df)
+        missing = self._count_missing(df)
+        return self._transform(df), missing
+
+    def fit_transform(self, df, y=None, velocity=None):
+        """
+        Ajusta y transforma en una sola pasada de ingeniería de características.
+
+        Parameters:
+            df (pd.DataFrame): Dataset original (sin ingeniería de características).
+            y: Ignorado, presente por compatibilidad con scikit-learn.
+            velocity (AccountVelocityStore, optional): Estado por cuenta a continuar.
+
+        Returns:
+            pd.DataFrame: Dataset enriquecido e imputado.
+        """
+        df = self._engineer(df, velocity)
+        self._fit(df)
+        return self._transform(df)
+
+    def _engineer(self, df, velocity):
+        return engineer_features(df, type_categories=self.type_categories, velocity=self._velocity(velocity))
+
+    def _fit(self, df):
+        self.imputer_ = SimpleImputer(strategy=self.strategy).fit(df[self.num_cols])
+        self.missing_counts_ = self._count_missing(df)
+        self.feature_names_ = [c for c in df.columns if c not in NON_FEATURE_COLS]
+
+    def _count_missing(self, df):
+        return {col: int(count) for col, count in df[self.num_cols].isna().sum().items()}
+
+    def _transform(self, df):
+        with stage('impute', rows=len(df)):
+            df[self.num_cols] = self.imputer_.transform(df[self.num_cols])
+        return df
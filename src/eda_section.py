@@ -1,16 +1,23 @@
+import numpy as np
+import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from src.eda_stats import DatasetStats
 
 def basic_info(df):
     """
     Devuelve información básica del DataFrame, incluyendo su forma, tipos de datos y cantidad de valores nulos por columna.
 
     Args:
-        df (pd.DataFrame): DataFrame a analizar.
+        df (pd.DataFrame or DatasetStats): DataFrame a analizar, o estadísticas del archivo completo
+            (ver `src.eda_stats.compute_dataset_stats`).
 
     Returns:
         dict: Diccionario con las claves 'shape', 'dtypes' y 'missing'.
     """
+    if isinstance(df, DatasetStats):
+        return {"shape": df.shape, "dtypes": df.dtypes, "missing": df.missing}
     info = {
         "shape": df.shape,
         "dtypes": df.dtypes,
@@ -23,12 +30,16 @@ def fraud_distribution(df, target_var):
     Calcula la distribución porcentual de la variable objetivo (fraude/no fraude).
 
     Args:
-        df (pd.DataFrame): DataFrame a analizar.
+        df (pd.DataFrame or DatasetStats): DataFrame a analizar, o estadísticas del archivo completo.
         target_var (str): Nombre de la columna objetivo.
 
     Returns:
-        pd.Series or None: Serie con el porcentaje de cada clase o None si la columna no existe.
+        pd.Series or None: Serie con el porcentaje de cada clase o None si la columna no existe
+        (o, con `DatasetStats`, si tiene demasiados valores distintos).
     """
+    if isinstance(df, DatasetStats):
+        dist = df.counts(target_var, normalize=True)
+        return None if dist is None else dist * 100
     if target_var in df.columns:
         return df[target_var].value_counts(normalize=True) * 100
     return None
@@ -49,42 +60,161 @@ def plot_fraud_pie(dist):
         title="Porcentaje de Fraude"
     )
 
-def plot_categorical_bar(df, cat_var, color_by=None):
+def _top_categories(series, max_categories=30, other_label="Otros"):
+    """
+    Limita una serie categórica a sus categorías más frecuentes y agrupa el resto en `other_label`.
+
+    Args:
+        series (pd.Series): Serie categórica.
+        max_categories (int): Número máximo de categorías que se conservan.
+        other_label (str): Etiqueta para las categorías agrupadas.
+
+    Returns:
+        pd.Series: Serie de texto con a lo sumo `max_categories + 1` valores distintos.
+    """
+    series = series.astype(str)
+    top = series.value_counts().index[:max_categories]
+    return series.where(series.isin(top), other_label)
+
+def _box_stats(values, max_outliers=200, random_state=0):
+    """
+    Calcula las estadísticas de un boxplot (método lineal de Plotly) y una muestra acotada de outliers.
+
+    Args:
+        values (array-like): Valores numéricos (se ignoran los NaN).
+        max_outliers (int): Máximo de outliers que se devuelven; siempre incluye el mínimo y el máximo.
+        random_state (int): Semilla para muestrear los outliers.
+
+    Returns:
+        dict or None: Claves 'q1', 'median', 'q3', 'lowerfence', 'upperfence', 'outliers' y 'n_outliers',
+        o None si no hay valores.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return None
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = (values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)
+    outliers = values[~inside]
+    n_outliers = outliers.size
+    if n_outliers > max_outliers:
+        rng = np.random.default_rng(random_state)
+        sample = rng.choice(outliers, size=max_outliers - 2, replace=False)
+        outliers = np.concatenate([[outliers.min(), outliers.max()], sample])
+    return {
+        "q1": q1, "median": median, "q3": q3,
+        "lowerfence": values[inside].min(), "upperfence": values[inside].max(),
+        "outliers": outliers, "n_outliers": n_outliers,
+    }
+
+def _box_traces(stats, name, color, horizontal=False, **kwargs):
+    """
+    Construye las trazas de Plotly de un boxplot precalculado: la caja y sus outliers muestreados.
+
+    Args:
+        stats (dict): Resultado de `_box_stats`.
+        name (str): Nombre del grupo.
+        color (str): Color de la caja y los puntos.
+        horizontal (bool): Si es True, la caja se dibuja en horizontal.
+        **kwargs: Argumentos adicionales para ambas trazas (por ejemplo `showlegend`).
+
+    Returns:
+        list: Trazas `go.Box` y `go.Scatter`.
+    """
+    position = {"y" if horizontal else "x": [name]}
+    box = go.Box(
+        q1=[stats["q1"]], median=[stats["median"]], q3=[stats["q3"]],
+        lowerfence=[stats["lowerfence"]], upperfence=[stats["upperfence"]],
+        name=str(name), marker_color=color, orientation="h" if horizontal else "v",
+        legendgroup=str(name), **position, **kwargs
+    )
+    points = stats["outliers"]
+    coords = {"x": points, "y": [name] * len(points)} if horizontal else {"x": [name] * len(points), "y": points}
+    scatter = go.Scatter(
+        mode="markers", marker=dict(color=color, size=4), name=str(name),
+        legendgroup=str(name), showlegend=False, hoverinfo="x" if horizontal else "y", **coords
+    )
+    return [box, scatter]
+
+def plot_categorical_bar(df, cat_var, color_by=None, max_categories=30):
     """
     Genera un histograma de barras para una variable categórica, opcionalmente coloreado por otra variable.
 
+    Los conteos se calculan antes de graficar, por lo que la figura solo contiene una barra por categoría
+    (a lo sumo `max_categories`, el resto se agrupa en "Otros").
+
     Args:
         df (pd.DataFrame): DataFrame a analizar.
         cat_var (str): Nombre de la variable categórica.
         color_by (str, opcional): Variable para colorear las barras.
+        max_categories (int, opcional): Máximo de categorías que se muestran.
 
     Returns:
         plotly.graph_objs._figure.Figure: Figura de Plotly.
     """
-    fig = px.histogram(df, x=cat_var, color=color_by, barmode="group")
+    keys = {cat_var: _top_categories(df[cat_var], max_categories)}
+    if color_by is not None and color_by != cat_var:
+        keys[color_by] = _top_categories(df[color_by], max_categories)
+    counts = pd.DataFrame(keys).value_counts(sort=False).rename("count").reset_index()
+    color = color_by if color_by in keys and color_by != cat_var else None
+    fig = px.bar(counts, x=cat_var, y="count", color=color, barmode="group")
     fig.update_layout(title=f"Distribución de {cat_var}")
     return fig
 
-def plot_numeric_distribution(df, num_var, hue=None):
+def plot_numeric_distribution(df, num_var, hue=None, bins=50, max_categories=10):
     """
     Genera un histograma y boxplot para una variable numérica, opcionalmente segmentado por una variable categórica.
 
+    Los intervalos, conteos y estadísticas de las cajas (cuartiles, bigotes y una muestra acotada de outliers)
+    se calculan con NumPy, así que el tamaño de la figura no depende del número de filas.
+
     Args:
         df (pd.DataFrame): DataFrame a analizar.
         num_var (str): Nombre de la variable numérica.
         hue (str, opcional): Variable para segmentar el color.
+        bins (int, opcional): Número de intervalos del histograma.
+        max_categories (int, opcional): Máximo de grupos de `hue` (el resto se agrupa en "Otros").
 
     Returns:
         plotly.graph_objs._figure.Figure: Figura de Plotly.
     """
-    fig = px.histogram(df, x=num_var, color=hue, marginal="box", barmode="overlay")
-    fig.update_layout(title=f"Distribución de {num_var}")
+    values = df[num_var].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    edges = np.histogram_bin_edges(values[valid], bins=bins) if valid.any() else np.array([0.0, 1.0])
+    centers, widths = (edges[:-1] + edges[1:]) / 2, np.diff(edges)
+
+    if hue is None:
+        groups = [(num_var, values)]
+    else:
+        labels = _top_categories(df[hue], max_categories).to_numpy()
+        groups = [(label, values[labels == label]) for label in pd.unique(labels)]
+
+    palette = px.colors.qualitative.Plotly
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.2, 0.8], vertical_spacing=0.02)
+    for i, (name, group) in enumerate(groups):
+        color = palette[i % len(palette)]
+        counts, _ = np.histogram(group, bins=edges)
+        fig.add_trace(go.Bar(
+            x=centers, y=counts, width=widths, name=str(name), marker_color=color,
+            opacity=0.6 if hue is not None else 1.0, legendgroup=str(name), showlegend=hue is not None
+        ), row=2, col=1)
+        stats = _box_stats(group)
+        if stats is not None:
+            for trace in _box_traces(stats, name, color, horizontal=True, showlegend=False):
+                fig.add_trace(trace, row=1, col=1)
+    fig.update_yaxes(showticklabels=False, row=1, col=1)
+    fig.update_layout(title=f"Distribución de {num_var}", barmode="overlay", bargap=0,
+                      xaxis2_title=num_var, yaxis2_title="count", legend_title_text=hue)
     return fig
 
 def plot_box_by_category(df, num_var, cat_var):
     """
     Genera un boxplot de una variable numérica segmentada por una variable categórica.
 
+    Las cajas se dibujan a partir de estadísticas precalculadas por categoría, con una muestra acotada
+    de outliers por caja.
+
     Args:
         df (pd.DataFrame): DataFrame a analizar.
         num_var (str): Variable numérica.
@@ -93,8 +223,14 @@ def plot_box_by_category(df, num_var, cat_var):
     Returns:
         plotly.graph_objs._figure.Figure: Figura de Plotly.
     """
-    fig = px.box(df, x=cat_var, y=num_var, points="outliers", color=cat_var)
-    fig.update_layout(title=f"{num_var} por {cat_var}")
+    palette = px.colors.qualitative.Plotly
+    fig = go.Figure()
+    for i, (name, group) in enumerate(df.groupby(cat_var, observed=True, sort=False)[num_var]):
+        stats = _box_stats(group.to_numpy())
+        if stats is not None:
+            fig.add_traces(_box_traces(stats, name, palette[i % len(palette)]))
+    fig.update_layout(title=f"{num_var} por {cat_var}", xaxis_title=cat_var, yaxis_title=num_var,
+                      legend_title_text=cat_var)
     return fig
 
 def plot_corr_heatmap(df):
@@ -102,12 +238,15 @@ def plot_corr_heatmap(df):
     Genera un mapa de calor (heatmap) de la matriz de correlación entre variables numéricas.
 
     Args:
-        df (pd.DataFrame): DataFrame a analizar.
+        df (pd.DataFrame or DatasetStats): DataFrame a analizar, o estadísticas del archivo completo.
 
     Returns:
         plotly.graph_objs._figure.Figure: Figura de Plotly.
     """
-    num_vars = df.select_dtypes(include="number").columns.tolist()
-    corr = df[num_vars].corr()
+    if isinstance(df, DatasetStats):
+        corr = df.corr()
+    else:
+        num_vars = df.select_dtypes(include="number").columns.tolist()
+        corr = df[num_vars].corr()
     fig = px.imshow(corr, text_auto=True, title="Matriz de Correlación Numérica")
     return fig
\ No newline at end of file
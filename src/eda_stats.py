@@ -0,0 +1,350 @@
+# src/eda_stats.py
+
+import os
+import joblib
+import numpy as np
+import pandas as pd
+from src.data_cache import get_cache_path, iter_dataset_chunks, _source_signature
+
+STATS_FORMAT_VERSION = 1
+
+_STATS_CHUNKSIZE = 500_000
+
+
+class AdaptiveHistogram:
+    """
+    Histograma de una pasada con intervalos de ancho potencia de 2 alineados en múltiplos del ancho.
+
+    Cuando los datos no caben en `max_bins` intervalos, el ancho se duplica y cada par de intervalos
+    se fusiona; como la grilla está alineada, los conteos siguen siendo exactos. Dos histogramas
+    se combinan llevándolos al mismo ancho.
+
+    Parameters:
+        max_bins (int): Número máximo de intervalos.
+    """
+
+    def __init__(self, max_bins=128):
+        self.max_bins = max_bins
+        self.width = None
+        self.index = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def update(self, values):
+        """
+        Agrega valores al histograma (se ignoran NaN e infinitos).
+
+        Parameters:
+            values (array-like): Valores numéricos.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+        if self.width is None:
+            span = values.max() - values.min()
+            scale = span / self.max_bins if span > 0 else max(abs(values[0]), 1.0)
+            self.width = 2.0 ** np.ceil(np.log2(scale))
+        index, counts = np.unique(np.floor(values / self.width).astype(np.int64), return_counts=True)
+        self._add(index, counts)
+
+    def merge(self, other):
+        """
+        Combina otro histograma en este.
+
+        Parameters:
+            other (AdaptiveHistogram): Histograma a combinar.
+        """
+        if other.width is None:
+            return
+        if self.width is None:
+            self.width = other.width
+        index, width = other.index, other.width
+        while width < self.width:
+            index, width = index // 2, width * 2
+        while self.width < width:
+            self._coarsen()
+        self._add(index, other.counts)
+
+    def _add(self, index, counts):
+        index, inverse = np.unique(np.concatenate([self.index, index]), return_inverse=True)
+        self.index = index
+        self.counts = np.bincount(inverse, weights=np.concatenate([self.counts, counts])).astype(np.int64)
+        while self.index[-1] - self.index[0] + 1 > self.max_bins:
+            self._coarsen()
+
+    def _coarsen(self):
+        self.width *= 2
+        index, inverse = np.unique(self.index // 2, return_inverse=True)
+        self.counts = np.bincount(inverse, weights=self.counts).astype(np.int64)
+        self.index = index
+
+    def to_numpy(self):
+        """
+        Devuelve el histograma denso.
+
+        Returns:
+            tuple:
+                - counts (np.ndarray): Conteo por intervalo.
+                - edges (np.ndarray): Bordes de los intervalos (`len(counts) + 1`).
+        """
+        if self.width is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        start = self.index[0]
+        counts = np.zeros(self.index[-1] - start + 1, dtype=np.int64)
+        counts[self.index - start] = self.counts
+        edges = (start + np.arange(len(counts) + 1)) * self.width
+        return counts, edges
+
+
+class _PairwiseMoments:
+    """
+    Momentos de segundo orden por pares de columnas (observaciones completas por par), combinables
+    con la fórmula de Chan et al. Reproduce `DataFrame.corr()` (Pearson, pairwise) en una pasada.
+    """
+
+    def __init__(self, n_cols):
+        shape = (n_cols, n_cols)
+        self.n = np.zeros(shape)
+        self.mean = np.zeros(shape)  # mean[i, j]: media de i donde i y j están presentes
+        self.m2 = np.zeros(shape)    # m2[i, j]: suma de cuadrados centrados de i sobre el mismo subconjunto
+        self.comoment = np.zeros(shape)
+        self.shift = None
+
+    def update(self, X):
+        valid = ~np.isnan(X)
+        M = valid.astype(np.float64)
+        if self.shift is None:
+            # Desplazamiento fijo para reducir la cancelación numérica en columnas de gran magnitud
+            count = valid.sum(axis=0)
+            self.shift = np.where(count > 0, np.where(valid, X, 0.0).sum(axis=0) / np.maximum(count, 1), 0.0)
+        Xz = np.where(valid, X - self.shift, 0.0)
+
+        n = M.T @ M
+        sums = Xz.T @ M
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, sums / n, 0.0)
+            m2 = np.where(n > 0, (Xz ** 2).T @ M - sums ** 2 / n, 0.0)
+            comoment = np.where(n > 0, Xz.T @ Xz - sums * sums.T / n, 0.0)
+        self._combine(n, mean, m2, comoment)
+
+    def merge(self, other):
+        if other.shift is None:
+            return
+        if self.shift is None:
+            self.shift = other.shift
+        # Las medias del otro acumulador se expresan con el desplazamiento propio
+        other_mean = other.mean + (other.shift - self.shift)[:, np.newaxis]
+        self._combine(other.n, other_mean, other.m2, other.comoment)
+
+    def _combine(self, n_b, mean_b, m2_b, comoment_b):
+        n = self.n + n_b
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = np.where(n > 0, self.n * n_b / n, 0.0)
+            delta = mean_b - self.mean
+            self.mean = self.mean + np.where(n > 0, delta * n_b / n, 0.0)
+        self.m2 = self.m2 + m2_b + delta ** 2 * weight
+        self.comoment = self.comoment + comoment_b + delta * delta.T * weight
+        self.n = n
+
+    def corr(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = self.comoment / np.sqrt(self.m2 * self.m2.T)
+        corr[self.n < 1] = np.nan
+        diagonal = np.diag(self.m2) > 0
+        corr[np.diag_indices_from(corr)] = np.where(diagonal, 1.0, np.nan)
+        return np.clip(corr, -1.0, 1.0)
+
+
+class DatasetStats:
+    """
+    Estadísticas descriptivas de un dataset calculadas por bloques en una sola pasada.
+
+    Acumula, para todas las columnas, el número de filas, los tipos y los nulos; para las numéricas,
+    medias, varianzas, la matriz de correlación (momentos por pares, igual que `DataFrame.corr()`)
+    e histogramas adaptativos; y conteos exactos de valores para las columnas con a lo sumo
+    `max_distinct` valores distintos. Dos acumuladores se combinan con `merge`.
+
+    Las funciones `basic_info`, `fraud_distribution` y `plot_corr_heatmap` de `src.eda_section`
+    aceptan una instancia en lugar de un DataFrame.
+
+    Parameters:
+        max_distinct (int): Máximo de valores distintos para llevar conteos exactos de una columna.
+        max_bins (int): Máximo de intervalos de cada histograma.
+    """
+
+    def __init__(self, max_distinct=1000, max_bins=128):
+        self.max_distinct = max_distinct
+        self.max_bins = max_bins
+        self.n_rows = 0
+        self.dtypes = None
+        self.missing = None
+        self.numeric_cols = None
+        self.value_counts = {}
+        self.histograms = {}
+        self.signature = None
+        self._moments = None
+
+    def update(self, df):
+        """
+        Agrega un bloque de filas.
+
+        Parameters:
+            df (pd.DataFrame): Bloque con las mismas columnas que los anteriores.
+
+        Returns:
+            DatasetStats: La propia instancia.
+        """
+        if self.dtypes is None:
+            self._init_columns(df.dtypes, df.select_dtypes(include="number").columns.tolist())
+
+        self.n_rows += len(df)
+        self.missing += df.isnull().sum()
+
+        for col, counts in self.value_counts.items():
+            if counts is not None:
+                self.value_counts[col] = self._add_counts(counts, df[col].value_counts(sort=False))
+
+        X = df[self.numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+        for i, col in enumerate(self.numeric_cols):
+            self.histograms[col].update(X[:, i])
+        self._moments.update(X)
+        return self
+
+    def merge(self, other):
+        """
+        Combina las estadísticas de otro acumulador (por ejemplo, de otra partición del archivo).
+
+        Parameters:
+            other (DatasetStats): Acumulador con las mismas columnas.
+
+        Returns:
+            DatasetStats: La propia instancia.
+        """
+        if other.dtypes is None:
+            return self
+        if self.dtypes is None:
+            self._init_columns(other.dtypes, other.numeric_cols)
+
+        self.n_rows += other.n_rows
+        self.missing += other.missing
+        for col, counts in self.value_counts.items():
+            other_counts = other.value_counts.get(col)
+            if counts is not None:
+                self.value_counts[col] = None if other_counts is None else self._add_counts(counts, other_counts)
+        for col, histogram in self.histograms.items():
+            histogram.merge(other.histograms[col])
+        self._moments.merge(other._moments)
+        return self
+
+    def _init_columns(self, dtypes, numeric_cols):
+        self.dtypes = dtypes
+        self.numeric_cols = list(numeric_cols)
+        self.missing = pd.Series(0, index=dtypes.index, dtype=np.int64)
+        self.value_counts = {col: pd.Series(dtype=np.int64) for col in dtypes.index}
+        self.histograms = {col: AdaptiveHistogram(self.max_bins) for col in self.numeric_cols}
+        self._moments = _PairwiseMoments(len(self.numeric_cols))
+
+    def _add_counts(self, counts, new_counts):
+        if len(new_counts) > self.max_distinct:
+            return None
+        counts = counts.add(new_counts, fill_value=0).astype(np.int64)
+        return counts if len(counts) <= self.max_distinct else None
+
+    @property
+    def shape(self):
+        """tuple: (filas, columnas) del dataset completo."""
+        return (self.n_rows, 0 if self.dtypes is None else len(self.dtypes))
+
+    def nunique(self, col):
+        """
+        Número de valores distintos (sin nulos) de una columna.
+
+        Parameters:
+            col (str): Columna.
+
+        Returns:
+            int or None: Conteo exacto, o None si supera `max_distinct`.
+        """
+        counts = self.value_counts.get(col)
+        return None if counts is None else int((counts > 0).sum())
+
+    def counts(self, col, normalize=False):
+        """
+        Conteo exacto de valores de una columna, como `Series.value_counts`.
+
+        Parameters:
+            col (str): Columna.
+            normalize (bool): Si es True, devuelve proporciones.
+
+        Returns:
+            pd.Series or None: Conteos ordenados de mayor a menor, o None si la columna supera `max_distinct`.
+        """
+        counts = self.value_counts.get(col)
+        if counts is None:
+            return None
+        counts = counts[counts > 0].sort_values(ascending=False)
+        counts.index.name = col
+        return counts / counts.sum() if normalize else counts
+
+    def mean(self):
+        """pd.Series: Media de cada columna numérica."""
+        moments = self._moments
+        return pd.Series(np.diag(moments.mean) + moments.shift, index=self.numeric_cols)
+
+    def var(self):
+        """pd.Series: Varianza muestral (ddof=1) de cada columna numérica."""
+        moments = self._moments
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.Series(np.diag(moments.m2) / (np.diag(moments.n) - 1), index=self.numeric_cols)
+
+    def corr(self):
+        """pd.DataFrame: Matriz de correlación de Pearson entre columnas numéricas (pairwise)."""
+        return pd.DataFrame(self._moments.corr(), index=self.numeric_cols, columns=self.numeric_cols)
+
+    def histogram(self, col):
+        """
+        Histograma exacto de una columna numérica.
+
+        Parameters:
+            col (str): Columna numérica.
+
+        Returns:
+            tuple: (counts, edges), ver `AdaptiveHistogram.to_numpy`.
+        """
+        return self.histograms[col].to_numpy()
+
+
+def compute_dataset_stats(csv_path, chunksize=None, cache_dir=None):
+    """
+    Calcula las estadísticas del dataset completo en una pasada por bloques sobre el caché columnar.
+
+    El resultado se guarda junto al caché Arrow (`<caché>.eda.pkl`) con la firma del CSV (mtime y
+    tamaño), y se reutiliza mientras el archivo no cambie.
+
+    Parameters:
+        csv_path (str): Ruta al CSV de origen.
+        chunksize (int, optional): Filas por bloque (500000 por defecto).
+        cache_dir (str, optional): Carpeta de caché. Por defecto DATA_CACHE_DIR o 'data/cache'.
+
+    Returns:
+        DatasetStats: Estadísticas del archivo completo.
+    """
+    stats_path = os.path.splitext(get_cache_path(csv_path, cache_dir))[0] + ".eda.pkl"
+    signature = dict(_source_signature(csv_path), stats_format=STATS_FORMAT_VERSION)
+    if os.path.exists(stats_path):
+        try:
+            stats = joblib.load(stats_path)
+            if stats.signature == signature:
+                return stats
+        except Exception:
+            pass
+
+    stats = DatasetStats()
+    for chunk in iter_dataset_chunks(csv_path, chunksize or _STATS_CHUNKSIZE, cache_dir=cache_dir):
+        stats.update(chunk)
+    stats.signature = signature
+
+    tmp_path = f"{stats_path}.tmp"
+    joblib.dump(stats, tmp_path)
+    os.replace(tmp_path, stats_path)
+    return stats
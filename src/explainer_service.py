@@ -0,0 +1,321 @@
+# src/explainer_service.py
+
+import os
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from src.forest_engine import prior_correction
+
+# shap (que a su vez carga numba, matplotlib e IPython) tarda más de un segundo en importarse: se
+# importa recién al construir el primer explicador, así las tareas que no explican no lo pagan
+
+def model_version(model_path):
+    """
+    Identificador de la versión de un modelo guardado (cambia cada vez que se reescribe el archivo).
+
+    Parameters:
+        model_path (str): Ruta al archivo .pkl del modelo.
+
+    Returns:
+        str: Ruta absoluta, fecha de modificación (ns) y tamaño.
+    """
+    stat = os.stat(model_path)
+    return f"{os.path.abspath(model_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+@lru_cache(maxsize=2)
+def _load_explainer(model_path, version):
+    # `version` forma parte de la clave: un modelo reescrito se vuelve a cargar
+    import shap
+
+    model = joblib.load(model_path)
+    return model, shap.TreeExplainer(model)
+
+
+def fraud_class_values(shap_values, classes):
+    """
+    Extrae los valores SHAP de la clase fraude, sea cual sea el formato que devuelva `shap`.
+
+    Parameters:
+        shap_values (list or np.ndarray): Lista por clase (versiones antiguas de shap) o arreglo
+            (n_muestras, n_variables, n_clases).
+        classes (np.ndarray): Clases del modelo.
+
+    Returns:
+        np.ndarray: Matriz (n_muestras, n_variables).
+    """
+    fraud_idx = list(classes).index(1)
+    if isinstance(shap_values, list):
+        return np.asarray(shap_values[fraud_idx])
+    shap_values = np.asarray(shap_values)
+    return shap_values[..., fraud_idx] if shap_values.ndim == 3 else shap_values
+
+
+def fraud_expected_value(expected_value, classes):
+    """
+    Extrae el valor esperado (valor base de SHAP) de la clase fraude.
+
+    Parameters:
+        expected_value (float or np.ndarray): `expected_value` del explicador (uno por clase o escalar).
+        classes (np.ndarray): Clases del modelo.
+
+    Returns:
+        float: Valor esperado de la probabilidad de fraude.
+    """
+    expected_value = np.atleast_1d(expected_value)
+    return float(expected_value[list(classes).index(1)] if len(expected_value) > 1 else expected_value[0])
+
+
+def prior_corrected_values(values, expected_value, negative_rate):
+    """
+    Lleva los valores SHAP de la clase fraude a la escala de las probabilidades que sirve el modelo.
+
+    `TreeExplainer` explica la probabilidad promedio de los árboles; un modelo entrenado con una
+    fracción `negative_rate` de los negativos sirve esa probabilidad recalibrada con `prior_correction`.
+    Como la corrección es monótona, los valores de cada fila se multiplican por su pendiente entre el
+    valor esperado y la probabilidad de la fila (la derivada si coinciden): conservan signo y orden y
+    suman la probabilidad servida menos el valor esperado recalibrado.
+
+    Parameters:
+        values (np.ndarray): Matriz (n_muestras, n_variables) de la clase fraude.
+        expected_value (float): Valor esperado de la clase fraude (ver `fraud_expected_value`).
+        negative_rate (float): Fracción de negativos usada al entrenar.
+
+    Returns:
+        tuple: (valores, valor esperado) en la escala recalibrada; sin cambios si `negative_rate` es 1.
+    """
+    if negative_rate == 1:
+        return values, expected_value
+
+    def correct(p):
+        return prior_correction(np.column_stack([1 - p, p]), [0, 1], negative_rate)[:, 1]
+
+    base = float(correct(np.array([expected_value]))[0])
+    raw = np.clip(expected_value + values.sum(axis=1), 0.0, 1.0)
+    delta = raw - expected_value
+    slope = negative_rate / (negative_rate * raw + 1 - raw) ** 2
+    moved = np.abs(delta) > 1e-12
+    slope[moved] = (correct(raw[moved]) - base) / delta[moved]
+    return values * slope[:, None], base
+
+
+class MeanAbsShapAccumulator:
+    """
+    Acumulador combinable de la importancia global (media de |SHAP| por variable).
+
+    Solo guarda la suma de |SHAP| por variable y el número de filas, de modo que la importancia
+    global se actualiza lote a lote sin conservar los valores SHAP.
+
+    Parameters:
+        feature_names (list): Nombres de las variables, en el orden de las columnas de SHAP.
+    """
+
+    def __init__(self, feature_names):
+        self.feature_names = list(feature_names)
+        self.abs_sum = np.zeros(len(self.feature_names))
+        self.n = 0
+
+    def update(self, shap_values):
+        """
+        Agrega un lote de valores SHAP.
+
+        Parameters:
+            shap_values (np.ndarray): Matriz (n_muestras, n_variables).
+
+        Returns:
+            MeanAbsShapAccumulator: La propia instancia.
+        """
+        self.abs_sum += np.abs(shap_values).sum(axis=0)
+        self.n += len(shap_values)
+        return self
+
+    def merge(self, other):
+        """
+        Combina otro acumulador con las mismas variables.
+
+        Parameters:
+            other (MeanAbsShapAccumulator): Acumulador a combinar.
+
+        Returns:
+            MeanAbsShapAccumulator: La propia instancia.
+        """
+        if other.feature_names != self.feature_names:
+            raise ValueError("Los acumuladores deben tener las mismas variables.")
+        self.abs_sum += other.abs_sum
+        self.n += other.n
+        return self
+
+    def result(self):
+        """
+        Devuelve la importancia global acumulada.
+
+        Returns:
+            pd.DataFrame: Columnas 'feature' e 'importance', de mayor a menor (formato de SHAP_GLOBAL).
+        """
+        importance = self.abs_sum / self.n if self.n else np.full(len(self.feature_names), np.nan)
+        df = pd.DataFrame({"feature": self.feature_names, "importance": importance})
+        return df.sort_values("importance", ascending=False, ignore_index=True)
+
+
+class ExplainerService:
+    """
+    Explicaciones SHAP por transacción con explicador y resultados en caché.
+
+    - El `TreeExplainer` se construye una sola vez por versión del modelo (ver `model_version`) y se
+      comparte entre instancias del mismo proceso; `refresh` lo reemplaza si el archivo cambió.
+    - Las filas se explican en lotes de `batch_size` (en paralelo con `n_jobs` hilos), de modo que la
+      memoria de cada llamada a shap queda acotada.
+    - Los valores de cada transacción se guardan en una caché LRU de `cache_size` entradas, indexada
+      por versión del modelo y hash de sus variables: volver a pedir una transacción no recorre los árboles.
+    - Cada fila explicada por primera vez actualiza la media de |SHAP| por variable
+      (`MeanAbsShapAccumulator`), con la que se regenera SHAP_GLOBAL sin guardar los valores.
+
+    Con `background`, el explicador usa perturbación intervencional sobre un resumen de
+    `background_size` filas de esos datos (muestreo con `shap.utils.sample`); sin él se usa el modo
+    `tree_path_dependent`, que no necesita datos de fondo. Los valores explican la probabilidad que
+    sirve el modelo (en uno con negativos submuestreados, la recalibrada: ver `prior_corrected_values`)
+    y suman `predict_proba` menos `expected_value`.
+
+    Parameters:
+        model_path (str, optional): Ruta del modelo. Por defecto MODEL_PATH.
+        batch_size (int, optional): Filas por lote. Por defecto EXPLAINER_BATCH_SIZE (256).
+        n_jobs (int, optional): Hilos para explicar lotes en paralelo. Por defecto EXPLAINER_N_JOBS (1).
+        cache_size (int, optional): Transacciones en la caché LRU. Por defecto EXPLAINER_CACHE_SIZE (10000).
+        background (pd.DataFrame, optional): Datos de fondo para la perturbación intervencional.
+        background_size (int): Filas del resumen de `background`.
+    """
+
+    def __init__(self, model_path=None, batch_size=None, n_jobs=None, cache_size=None,
+                 background=None, background_size=100):
+        self.model_path = model_path or os.getenv("MODEL_PATH")
+        self.batch_size = batch_size or int(os.getenv("EXPLAINER_BATCH_SIZE", 256))
+        self.n_jobs = n_jobs or int(os.getenv("EXPLAINER_N_JOBS", 1))
+        self.cache_size = cache_size if cache_size is not None else int(os.getenv("EXPLAINER_CACHE_SIZE", 10_000))
+        self.background = None
+        if background is not None:
+            import shap
+
+            self.background = shap.utils.sample(background, min(background_size, len(background)), random_state=0)
+        self._cache = OrderedDict()
+        self.version = None
+        self.refresh()
+
+    def refresh(self):
+        """
+        Vuelve a cargar el modelo y el explicador si el archivo del modelo cambió.
+
+        La caché de transacciones no se vacía (sus claves incluyen la versión: las entradas antiguas
+        se descartan por LRU); la importancia global se reinicia.
+
+        Returns:
+            bool: True si se cargó una versión nueva.
+        """
+        version = model_version(self.model_path)
+        if version == self.version:
+            return False
+        if self.background is None:
+            self.model, self.explainer = _load_explainer(self.model_path, version)
+        else:
+            import shap
+
+            self.model = joblib.load(self.model_path)
+            self.explainer = shap.TreeExplainer(
+                self.model, data=self.background, feature_perturbation="interventional"
+            )
+        self.version = version
+        self.negative_rate = getattr(self.model, "negative_rate_", 1.0)
+        self._raw_expected_value = fraud_expected_value(self.explainer.expected_value, self.model.classes_)
+        self.expected_value = prior_corrected_values(
+            np.empty((0, self.model.n_features_in_)), self._raw_expected_value, self.negative_rate
+        )[1]
+        self.feature_names = list(self.model.feature_names_in_)
+        self.importance = MeanAbsShapAccumulator(self.feature_names)
+        return True
+
+    def _explain_batch(self, X):
+        values = fraud_class_values(self.explainer.shap_values(X, check_additivity=False), self.model.classes_)
+        return prior_corrected_values(values, self._raw_expected_value, self.negative_rate)[0]
+
+    def explain(self, X):
+        """
+        Devuelve los valores SHAP de la clase fraude para cada transacción.
+
+        Parameters:
+            X (pd.DataFrame): Variables ya preprocesadas (columnas del modelo; se reordenan si hace falta).
+
+        Returns:
+            np.ndarray: Matriz (n_transacciones, n_variables), columnas en el orden de `feature_names`.
+        """
+        X = X[self.feature_names]
+        rows = np.ascontiguousarray(X.to_numpy(dtype=np.float64))
+        keys = [(self.version, hashlib.blake2b(row.tobytes(), digest_size=16).digest()) for row in rows]
+
+        result = np.empty(rows.shape)
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self._cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                self._cache.move_to_end(key)
+                result[i] = cached
+
+        if missing:
+            # Transacciones repetidas dentro del pedido se explican una sola vez
+            first = {}
+            for i in missing:
+                first.setdefault(keys[i], i)
+            unique = np.fromiter(first.values(), dtype=np.intp, count=len(first))
+            X_missing = X.iloc[unique]
+            batches = [X_missing.iloc[start:start + self.batch_size]
+                       for start in range(0, len(X_missing), self.batch_size)]
+            if self.n_jobs == 1 or len(batches) == 1:
+                values = [self._explain_batch(batch) for batch in batches]
+            else:
+                values = Parallel(n_jobs=self.n_jobs, prefer="threads")(
+                    delayed(self._explain_batch)(batch) for batch in batches
+                )
+            values = np.concatenate(values)
+            self.importance.update(values)
+
+            computed = dict(zip((keys[i] for i in unique), values))
+            for i in missing:
+                result[i] = computed[keys[i]]
+            for key, value in computed.items():
+                self._cache[key] = value
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def explain_frame(self, X):
+        """
+        Igual que `explain`, pero devuelve un DataFrame con el índice de X y una columna por variable.
+
+        Parameters:
+            X (pd.DataFrame): Variables ya preprocesadas.
+
+        Returns:
+            pd.DataFrame: Valores SHAP de la clase fraude.
+        """
+        return pd.DataFrame(self.explain(X), index=X.index, columns=self.feature_names)
+
+    def save_global_importance(self, path=None):
+        """
+        Escribe la importancia global acumulada (media de |SHAP| por variable) en SHAP_GLOBAL.
+
+        Parameters:
+            path (str, optional): Ruta del CSV. Por defecto SHAP_GLOBAL.
+
+        Returns:
+            pd.DataFrame: Importancia escrita.
+        """
+        path = path or os.getenv("SHAP_GLOBAL")
+        df = self.importance.result()
+        tmp_path = f"{path}.tmp"
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        return df
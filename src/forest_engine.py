@@ -0,0 +1,208 @@
+# src/forest_engine.py
+
+import numpy as np
+
+_LEAF = -1  # valor de children_left/children_right en las hojas de scikit-learn
+
+# Registro de nodo empaquetado (16 bytes): un único acceso por nivel trae umbral, variable e
+# hijo. Los dos hijos de cada nodo interno se numeran contiguos, así que el siguiente nodo es
+# `child + (va a la derecha)`. Las hojas apuntan a sí mismas.
+NODE_DTYPE = np.dtype([
+    ('threshold', np.float64),
+    ('feature', np.int32),
+    ('child', np.int32),
+])
+
+
+def _flatten_tree(tree, n_features, offset):
+    # Recorrido por niveles (BFS) que numera los hijos de cada nodo de forma contigua
+    levels = [np.array([0])]
+    while levels[-1].size:
+        frontier = levels[-1]
+        internal = frontier[tree.children_left[frontier] != _LEAF]
+        levels.append(np.column_stack([tree.children_left[internal], tree.children_right[internal]]).ravel())
+    order = np.concatenate(levels)
+    new_id = np.empty(tree.node_count, dtype=np.int64)
+    new_id[order] = np.arange(tree.node_count)
+
+    is_leaf = tree.children_left[order] == _LEAF
+    nodes = np.empty(tree.node_count, dtype=NODE_DTYPE)
+    # Hojas: umbral +inf sobre una columna centinela (siempre 0) -> nunca avanzan
+    nodes['threshold'] = np.where(is_leaf, np.inf, tree.threshold[order])
+    nodes['feature'] = np.where(is_leaf, n_features, tree.feature[order])
+    nodes['child'] = np.where(is_leaf, np.arange(tree.node_count), new_id[tree.children_left[order]]) + offset
+    missing_left = np.asarray(tree.missing_go_to_left, dtype=bool)[order] & ~is_leaf
+    return nodes, missing_left, tree.value[order, 0, :]
+
+
+def prior_correction(proba, classes, negative_rate):
+    """
+    Deshace el cambio de prior de un modelo entrenado con la clase negativa submuestreada.
+
+    Si los negativos se conservaron con probabilidad `negative_rate`, las odds de fraude del modelo
+    están multiplicadas por `1 / negative_rate`; se corrigen dividiendo la probabilidad de la clase 0
+    por la tasa y renormalizando. La transformación es monótona, así que no cambia el orden (AUC).
+
+    Parameters:
+        proba (np.ndarray): Matriz (n_muestras, n_clases) del bosque.
+        classes (np.ndarray): Clases del modelo.
+        negative_rate (float): Fracción de negativos usada al entrenar.
+
+    Returns:
+        np.ndarray: Probabilidades recalibradas (la misma matriz si `negative_rate` es 1).
+    """
+    if negative_rate == 1:
+        return proba
+    proba = np.array(proba, dtype=np.float64)
+    proba[:, list(classes).index(0)] /= negative_rate
+    proba /= proba.sum(axis=1, keepdims=True)
+    return proba
+
+
+class FlatForest:
+    """
+    Motor de inferencia para `RandomForestClassifier` basado en arreglos planos de nodos.
+
+    Todos los árboles se concatenan en un único arreglo de nodos (variable, umbral, hijos) y otro
+    de valores de hoja, y se recorren con operaciones vectorizadas de NumPy: en cada iteración
+    todas las filas avanzan un nivel en todos los árboles. La comparación (`x <= umbral`, NaN según
+    `missing_go_to_left`) y el orden de acumulación son los de scikit-learn, así que
+    `predict_proba` da el mismo resultado bit a bit.
+
+    El recorrido vectorizado elimina el costo fijo por llamada de scikit-learn (validación,
+    despacho de joblib, 100 llamadas a Cython), que domina en lotes pequeños. En lotes grandes
+    el bucle compilado de scikit-learn es más rápido, por lo que los lotes de más de
+    `large_batch_rows` filas se delegan en el modelo original cuando está disponible.
+
+    Usar `FlatForest.from_sklearn(model)` para construirlo; es un reemplazo directo de
+    `predict_proba`/`predict` del modelo original.
+
+    Attributes:
+        classes_ (np.ndarray): Clases del modelo original.
+        feature_names_in_ (np.ndarray or None): Nombres de variables del modelo original.
+        n_features_in_ (int): Número de variables.
+        estimator (RandomForestClassifier or None): Modelo original (para SHAP y lotes grandes). Es None
+            en los bosques del registro de modelos, que se guardan sin él (ver `publish_model_bundle`).
+        version (str or None): Versión del registro de la que proviene (ahí está el modelo original).
+        negative_rate (float): Fracción de negativos usada al entrenar (ver `prior_correction`).
+    """
+
+    def __init__(self, nodes, missing_left, value, roots, max_depth, classes, n_features,
+                 feature_names=None, estimator=None, block_size=1024, large_batch_rows=256,
+                 negative_rate=1.0):
+        self.nodes = nodes
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.n_features_in_ = int(n_features)
+        self.feature_names_in_ = feature_names
+        self.estimator = estimator
+        self.version = None
+        self.block_size = block_size
+        self.large_batch_rows = large_batch_rows
+        self.negative_rate = float(negative_rate)
+        self._has_missing_left = bool(missing_left.any())
+
+    @classmethod
+    def from_sklearn(cls, model, **kwargs):
+        """
+        Exporta un `RandomForestClassifier` entrenado a arreglos planos.
+
+        Parameters:
+            model (RandomForestClassifier): Modelo entrenado (una sola salida).
+            **kwargs: `block_size` y `large_batch_rows` (ver la clase).
+
+        Returns:
+            FlatForest: Motor de inferencia equivalente.
+        """
+        nodes, missing_left, values, roots = [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree_nodes, tree_missing, tree_values = _flatten_tree(estimator.tree_, model.n_features_in_, offset)
+            nodes.append(tree_nodes)
+            missing_left.append(tree_missing)
+            values.append(tree_values)
+            roots.append(offset)
+            offset += estimator.tree_.node_count
+
+        return cls(
+            nodes=np.concatenate(nodes),
+            missing_left=np.concatenate(missing_left),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max(e.tree_.max_depth for e in model.estimators_),
+            classes=model.classes_,
+            n_features=model.n_features_in_,
+            feature_names=getattr(model, "feature_names_in_", None),
+            estimator=model,
+            negative_rate=getattr(model, "negative_rate_", 1.0),
+            **kwargs,
+        )
+
+    def predict_proba(self, X):
+        """
+        Probabilidades por clase, equivalente a `RandomForestClassifier.predict_proba`.
+
+        Parameters:
+            X (pd.DataFrame or np.ndarray): Variables predictoras. Si es un DataFrame y el modelo
+                conoce los nombres de variables, las columnas se toman en ese orden.
+
+        Returns:
+            np.ndarray: Matriz (n_muestras, n_clases).
+        """
+        if hasattr(X, "columns") and self.feature_names_in_ is not None:
+            X = X[list(self.feature_names_in_)]
+        if self.estimator is not None and len(X) > self.large_batch_rows:
+            return self.estimator.predict_proba(X)
+
+        X = self._as_matrix(X)
+        proba = np.empty((X.shape[0], self.value.shape[1]))
+        for start in range(0, X.shape[0], self.block_size):
+            block = X[start:start + self.block_size]
+            proba[start:start + len(block)] = self._predict_block(block)
+        return prior_correction(proba, self.classes_, self.negative_rate)
+
+    def predict(self, X):
+        """
+        Clase predicha, equivalente a `RandomForestClassifier.predict`.
+
+        Parameters:
+            X (pd.DataFrame or np.ndarray): Variables predictoras.
+
+        Returns:
+            np.ndarray: Clase predicha por fila.
+        """
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def _as_matrix(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Se esperaban {self.n_features_in_} variables, se recibieron {X.shape[-1]}.")
+        return X
+
+    def _predict_block(self, X):
+        n_samples, n_features = X.shape
+        # Columna centinela (0) para las hojas: su umbral +inf las deja siempre en su lugar
+        padded = np.zeros((n_samples, n_features + 1), dtype=np.float32)
+        padded[:, :n_features] = X
+        flat_X = padded.ravel()
+        row_offset = np.arange(n_samples, dtype=np.intp) * (n_features + 1)
+
+        current = np.repeat(self.roots[:, np.newaxis], n_samples, axis=1)
+        for _ in range(self.max_depth):
+            node = self.nodes[current]
+            x = flat_X[row_offset + node['feature']]
+            go_right = ~(x <= node['threshold'])
+            if self._has_missing_left:
+                go_right &= ~(np.isnan(x) & self.missing_left[current])
+            current = node['child'] + go_right
+
+        # Mismo orden de acumulación que scikit-learn: árbol por árbol y luego división
+        leaf_values = self.value[current]
+        proba = np.zeros((n_samples, self.value.shape[1]))
+        for tree_values in leaf_values:
+            proba += tree_values
+        proba /= len(self.roots)
+        return proba
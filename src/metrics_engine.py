@@ -0,0 +1,178 @@
+# src/metrics_engine.py
+
+import numpy as np
+from src.scoring import get_decision_threshold
+
+
+def _metrics_from_counts(tps, fps, n_pos, n_neg, predicted_at_threshold):
+    """
+    Calcula las métricas a partir de los conteos acumulados de positivos y negativos por umbral.
+
+    Parameters:
+        tps (np.ndarray): Verdaderos positivos acumulados, de mayor a menor puntaje (un valor por umbral distinto).
+        fps (np.ndarray): Falsos positivos acumulados, alineados con `tps`.
+        n_pos (int): Total de positivos.
+        n_neg (int): Total de negativos.
+        predicted_at_threshold (int): Cantidad de umbrales distintos con puntaje mayor al de decisión.
+
+    Returns:
+        dict: Métricas y curvas.
+    """
+    tps = np.concatenate([[0], tps]).astype(np.float64)
+    fps = np.concatenate([[0], fps]).astype(np.float64)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        tpr = tps / n_pos if n_pos else np.full_like(tps, np.nan)
+        fpr = fps / n_neg if n_neg else np.full_like(fps, np.nan)
+        precision_curve = np.where(tps + fps > 0, tps / (tps + fps), 1.0)
+    auc = float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2)) if n_pos and n_neg else float("nan")
+    # Average precision (como `average_precision_score`): suma de precisiones ponderadas por el salto de recall
+    pr_auc = float(np.sum(np.diff(tpr) * precision_curve[1:])) if n_pos else float("nan")
+
+    tp = tps[predicted_at_threshold]
+    fp = fps[predicted_at_threshold]
+    fn = n_pos - tp
+    precision = tp / (tp + fp) if tp + fp > 0 else 0.0
+    recall = tp / n_pos if n_pos else 0.0
+    f1 = 2 * tp / (2 * tp + fp + fn) if tp + fp + fn > 0 else 0.0
+    return {
+        "auc": auc,
+        "pr_auc": pr_auc,
+        "precision": float(precision),
+        "recall": float(recall),
+        "f1_score": float(f1),
+        "confusion_matrix": {"tn": int(n_neg - fp), "fp": int(fp), "fn": int(fn), "tp": int(tp)},
+        "curves": {"fpr": fpr, "tpr": tpr, "precision": precision_curve, "recall": tpr},
+    }
+
+
+def classification_metrics(y_true, proba, threshold=None, return_curves=False):
+    """
+    Calcula AUC, PR-AUC, precision, recall, F1 y matriz de confusión con un único ordenamiento.
+
+    Las transacciones se ordenan una vez por probabilidad; los conteos acumulados de positivos y
+    negativos en cada umbral distinto dan a la vez las curvas ROC y precision-recall y la matriz de
+    confusión en el umbral de decisión (`proba > threshold`, como `apply_threshold`). Los valores
+    coinciden con `roc_auc_score`, `average_precision_score`, `precision_score`, `recall_score` y
+    `f1_score` de scikit-learn (con 0 cuando la métrica no está definida).
+
+    Parameters:
+        y_true (array-like): Etiquetas reales 0/1.
+        proba (array-like): Probabilidad de fraude.
+        threshold (float, optional): Umbral de decisión. Si es None se usa DECISION_THRESHOLD.
+        return_curves (bool): Si es True, incluye las curvas ('fpr', 'tpr', 'precision', 'recall')
+            y los umbrales en la clave 'curves'.
+
+    Returns:
+        dict: Claves 'auc', 'pr_auc', 'precision', 'recall', 'f1_score' y 'confusion_matrix'.
+    """
+    if threshold is None:
+        threshold = get_decision_threshold()
+    y_true = np.asarray(y_true) == 1
+    proba = np.asarray(proba, dtype=np.float64)
+
+    order = np.argsort(proba, kind="mergesort")[::-1]
+    scores = proba[order]
+    # Último índice de cada grupo de puntajes empatados
+    distinct = np.flatnonzero(np.diff(scores)) if scores.size else np.empty(0, dtype=np.intp)
+    ends = np.concatenate([distinct, [scores.size - 1]]) if scores.size else distinct
+    tps = np.cumsum(y_true[order])[ends]
+    fps = (ends + 1) - tps
+    thresholds = scores[ends]
+
+    predicted = int(np.count_nonzero(thresholds > threshold))
+    metrics = _metrics_from_counts(tps, fps, int(y_true.sum()), int((~y_true).sum()), predicted)
+    if return_curves:
+        metrics["curves"]["thresholds"] = np.concatenate([[np.inf], thresholds])
+    else:
+        del metrics["curves"]
+    return metrics
+
+
+class BinnedMetricsAccumulator:
+    """
+    Acumulador combinable de métricas de clasificación sobre puntajes agrupados en intervalos.
+
+    Guarda, por intervalo de probabilidad, cuántos positivos y negativos cayeron en él, de modo que
+    las predicciones se pueden procesar por bloques (o en paralelo y luego con `merge`) sin mantenerlas
+    en memoria. Los intervalos son (e_k, e_{k+1}] sobre `n_bins` bordes equiespaciados en [0, 1]:
+
+    - Las métricas en un umbral que coincide con un borde (como 0.5) son exactas.
+    - AUC y PR-AUC son exactas cuando cada puntaje distinto cae en su propio intervalo; es el caso
+      de un bosque de hasta `n_bins` árboles (probabilidades múltiplos de 1/n_árboles). Si no, los
+      puntajes de un mismo intervalo se tratan como empatados.
+
+    Parameters:
+        n_bins (int): Número de intervalos.
+    """
+
+    def __init__(self, n_bins=10_000):
+        self.n_bins = n_bins
+        self.edges = np.linspace(0.0, 1.0, n_bins + 1)
+        self.positives = np.zeros(n_bins, dtype=np.int64)
+        self.negatives = np.zeros(n_bins, dtype=np.int64)
+
+    def update(self, y_true, proba):
+        """
+        Agrega un bloque de predicciones.
+
+        Parameters:
+            y_true (array-like): Etiquetas reales 0/1.
+            proba (array-like): Probabilidad de fraude.
+
+        Returns:
+            BinnedMetricsAccumulator: La propia instancia.
+        """
+        y_true = np.asarray(y_true) == 1
+        bins = np.clip(np.searchsorted(self.edges, np.asarray(proba, dtype=np.float64), side="left") - 1,
+                       0, self.n_bins - 1)
+        self.positives += np.bincount(bins[y_true], minlength=self.n_bins)
+        self.negatives += np.bincount(bins[~y_true], minlength=self.n_bins)
+        return self
+
+    def merge(self, other):
+        """
+        Combina otro acumulador con los mismos intervalos.
+
+        Parameters:
+            other (BinnedMetricsAccumulator): Acumulador a combinar.
+
+        Returns:
+            BinnedMetricsAccumulator: La propia instancia.
+        """
+        if other.n_bins != self.n_bins:
+            raise ValueError("Los acumuladores deben tener el mismo número de intervalos.")
+        self.positives += other.positives
+        self.negatives += other.negatives
+        return self
+
+    def result(self, threshold=None, return_curves=False):
+        """
+        Calcula las métricas acumuladas.
+
+        Parameters:
+            threshold (float, optional): Umbral de decisión (se usa el borde más cercano). Si es None
+                se usa DECISION_THRESHOLD.
+            return_curves (bool): Si es True, incluye las curvas en la clave 'curves'.
+
+        Returns:
+            dict: Mismas claves que `classification_metrics`.
+        """
+        if threshold is None:
+            threshold = get_decision_threshold()
+        occupied = np.flatnonzero((self.positives + self.negatives)[::-1])
+        tps = np.cumsum(self.positives[::-1])[occupied]
+        fps = np.cumsum(self.negatives[::-1])[occupied]
+        # Límite superior de cada intervalo ocupado, de mayor a menor
+        upper = self.edges[1:][::-1][occupied]
+        edge = self.edges[int(np.clip(round(threshold * self.n_bins), 0, self.n_bins))]
+        predicted = int(np.count_nonzero(upper > edge))
+
+        metrics = _metrics_from_counts(
+            tps, fps, int(self.positives.sum()), int(self.negatives.sum()), predicted
+        )
+        if return_curves:
+            metrics["curves"]["thresholds"] = np.concatenate([[np.inf], upper])
+        else:
+            del metrics["curves"]
+        return metrics
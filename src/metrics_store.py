@@ -0,0 +1,259 @@
+# src/metrics_store.py
+
+import os
+import sqlite3
+import pandas as pd
+
+# Columnas del historial de monitoreo. Otras métricas se agregan como columnas nuevas al insertarlas.
+METRIC_COLUMNS = ["auc", "precision", "recall", "f1_score", "drift_score", "retrain_triggered"]
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    {", ".join(f'"{col}" REAL' for col in METRIC_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS idx_metrics_date ON metrics (date);
+CREATE TABLE IF NOT EXISTS stage_timings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    job TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    calls INTEGER,
+    rows INTEGER,
+    wall_s REAL,
+    cpu_s REAL,
+    peak_rss_mib REAL
+);
+CREATE INDEX IF NOT EXISTS idx_stage_timings_job_date ON stage_timings (job, date);
+"""
+
+# Columnas de la tabla de tiempos por etapa (ver `src.profiling.profile_run`)
+STAGE_TIMING_COLUMNS = ["stage", "calls", "rows", "wall_s", "cpu_s", "peak_rss_mib"]
+
+
+def get_store_path(db_path=None):
+    """
+    Devuelve la ruta de la base de métricas.
+
+    Parameters:
+        db_path (str, optional): Ruta explícita. Por defecto MONITORING_DB o 'data/monitoring.db'.
+
+    Returns:
+        str: Ruta del archivo SQLite.
+    """
+    return db_path or os.getenv("MONITORING_DB", "data/monitoring.db")
+
+
+def _format_date(value):
+    # Texto ISO: el orden lexicográfico coincide con el cronológico y usa el índice en las consultas
+    return pd.Timestamp(value).isoformat(sep=" ")
+
+
+def connect(db_path=None, legacy_csv=None):
+    """
+    Abre la base de métricas de monitoreo (SQLite en modo WAL), creándola si no existe.
+
+    Si la base está vacía se importa el historial del CSV heredado (MONITORING_METRICS), si existe;
+    con la base ya poblada, abrirla para leer no toma el lock de escritura.
+    En modo WAL cada inserción es una transacción atómica que solo agrega al log, y los lectores
+    (el dashboard) no bloquean al escritor.
+
+    Parameters:
+        db_path (str, optional): Ruta de la base. Por defecto MONITORING_DB.
+        legacy_csv (str, optional): CSV a importar si la base está vacía. Por defecto MONITORING_METRICS.
+
+    Returns:
+        sqlite3.Connection: Conexión abierta.
+    """
+    db_path = get_store_path(db_path)
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    legacy_csv = legacy_csv or os.getenv("MONITORING_METRICS")
+    if legacy_csv and os.path.exists(legacy_csv) and _is_empty(conn):
+        # Solo con la tabla vacía se toma el lock de escritura (las lecturas no lo piden) y se vuelve
+        # a comprobar dentro de la transacción: dos procesos que abren la base a la vez no importan
+        # el CSV dos veces
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if _is_empty(conn):
+                for record in pd.read_csv(legacy_csv).to_dict("records"):
+                    _insert(conn, record)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return conn
+
+
+def _is_empty(conn):
+    return conn.execute("SELECT 1 FROM metrics LIMIT 1").fetchone() is None
+
+
+def _columns(conn):
+    return [row[1] for row in conn.execute("PRAGMA table_info(metrics)")]
+
+
+def _insert(conn, record):
+    record = dict(record)
+    record["date"] = _format_date(record["date"])
+    existing = set(_columns(conn))
+    for col in record:
+        if col not in existing:
+            conn.execute(f'ALTER TABLE metrics ADD COLUMN "{col}" REAL')
+    columns = ", ".join(f'"{col}"' for col in record)
+    placeholders = ", ".join("?" for _ in record)
+    values = [None if pd.isna(v) else (v.item() if hasattr(v, "item") else v) for v in record.values()]
+    conn.execute(f"INSERT INTO metrics ({columns}) VALUES ({placeholders})", values)
+
+
+def append_metrics(metrics, db_path=None):
+    """
+    Agrega un registro de métricas al historial en una transacción atómica.
+
+    Parameters:
+        metrics (dict): Métricas del día; debe incluir 'date'. Las claves que no existan como
+            columna se agregan a la tabla.
+        db_path (str, optional): Ruta de la base. Por defecto MONITORING_DB.
+    """
+    conn = connect(db_path)
+    try:
+        with conn:
+            _insert(conn, metrics)
+    finally:
+        conn.close()
+
+
+def append_stage_timings(job, stages, date=None, db_path=None):
+    """
+    Agrega los tiempos por etapa de una ejecución de una tarea en una transacción atómica.
+
+    Parameters:
+        job (str): Nombre de la tarea (por ejemplo 'cron_daily_predict').
+        stages (list): Diccionarios con las claves de STAGE_TIMING_COLUMNS, uno por etapa.
+        date (str or datetime, optional): Momento de la ejecución. Por defecto, ahora.
+        db_path (str, optional): Ruta de la base. Por defecto MONITORING_DB.
+    """
+    date = _format_date(date if date is not None else pd.Timestamp.now())
+    rows = [(date, job, *(record.get(col) for col in STAGE_TIMING_COLUMNS)) for record in stages]
+    columns = ", ".join(["date", "job"] + STAGE_TIMING_COLUMNS)
+    placeholders = ", ".join("?" for _ in range(len(STAGE_TIMING_COLUMNS) + 2))
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.executemany(f"INSERT INTO stage_timings ({columns}) VALUES ({placeholders})", rows)
+    finally:
+        conn.close()
+
+
+def query_stage_timings(job=None, start_date=None, end_date=None, db_path=None):
+    """
+    Consulta los tiempos por etapa registrados, opcionalmente de una sola tarea y desde una fecha.
+
+    Parameters:
+        job (str, optional): Tarea a consultar. Si es None, todas.
+        start_date (str or datetime, optional): Fecha inicial (inclusive).
+        end_date (str or datetime, optional): Fecha final (inclusive, hasta el final del día si no trae hora).
+        db_path (str, optional): Ruta de la base. Por defecto MONITORING_DB.
+
+    Returns:
+        pd.DataFrame: Una fila por tarea, ejecución y etapa ('date', 'job' y STAGE_TIMING_COLUMNS),
+        ordenadas por fecha.
+    """
+    clauses, params = [], []
+    if job is not None:
+        clauses.append("job = ?")
+        params.append(job)
+    if start_date is not None:
+        clauses.append("date >= ?")
+        params.append(_format_date(start_date))
+    if end_date is not None:
+        end = pd.Timestamp(end_date)
+        if end == end.normalize():
+            end += pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+        clauses.append("date <= ?")
+        params.append(_format_date(end))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    conn = connect(db_path)
+    try:
+        return _read(conn, f"SELECT * FROM stage_timings {where} ORDER BY date, id", params)
+    finally:
+        conn.close()
+
+
+def _read(conn, sql, params=()):
+    df = pd.read_sql_query(sql, conn, params=params)
+    df["date"] = pd.to_datetime(df["date"], format="ISO8601")
+    if "retrain_triggered" in df:
+        df["retrain_triggered"] = pd.to_numeric(df["retrain_triggered"]).fillna(0).astype(int)
+    return df.drop(columns="id")
+
+
+def query_metrics(start_date=None, end_date=None, db_path=None):
+    """
+    Consulta el historial de métricas, opcionalmente acotado a un rango de fechas (usa el índice por fecha).
+
+    Parameters:
+        start_date (str or datetime, optional): Fecha inicial (inclusive).
+        end_date (str or datetime, optional): Fecha final (inclusive, hasta el final del día si no trae hora).
+        db_path (str, optional): Ruta de la base. Por defecto MONITORING_DB.
+
+    Returns:
+        pd.DataFrame: Registros ordenados por fecha.
+    """
+    clauses, params = [], []
+    if start_date is not None:
+        clauses.append("date >= ?")
+        params.append(_format_date(start_date))
+    if end_date is not None:
+        end = pd.Timestamp(end_date)
+        if end == end.normalize():
+            end += pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+        clauses.append("date <= ?")
+        params.append(_format_date(end))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    conn = connect(db_path)
+    try:
+        return _read(conn, f"SELECT * FROM metrics {where} ORDER BY date, id", params)
+    finally:
+        conn.close()
+
+
+def latest_metrics(db_path=None):
+    """
+    Devuelve el registro más reciente sin leer el resto del historial.
+
+    Parameters:
+        db_path (str, optional): Ruta de la base. Por defecto MONITORING_DB.
+
+    Returns:
+        pd.Series or None: Último registro, o None si el historial está vacío.
+    """
+    conn = connect(db_path)
+    try:
+        df = _read(conn, "SELECT * FROM metrics ORDER BY date DESC, id DESC LIMIT 1")
+    finally:
+        conn.close()
+    return None if df.empty else df.iloc[0]
+
+
+def store_version(db_path=None):
+    """
+    Identificador que cambia con cada inserción (útil como clave de caché).
+
+    Parameters:
+        db_path (str, optional): Ruta de la base. Por defecto MONITORING_DB.
+
+    Returns:
+        tuple: (ruta absoluta de la base, id del último registro de métricas, id del último tiempo por etapa).
+    """
+    conn = connect(db_path)
+    try:
+        last_id = conn.execute("SELECT MAX(id) FROM metrics").fetchone()[0]
+        last_timing_id = conn.execute("SELECT MAX(id) FROM stage_timings").fetchone()[0]
+    finally:
+        conn.close()
+    return (os.path.abspath(get_store_path(db_path)), last_id, last_timing_id)
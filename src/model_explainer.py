@@ -1,12 +1,10 @@
 # src/model_explainer.py
 
-import shap
+import numpy as np
 import pandas as pd
 import joblib
-import matplotlib.pyplot as plt
 
-# Evita que SHAP intente mostrar en entorno no interactivo
-shap.initjs()
+# shap y matplotlib se importan en cada función: importar el módulo no los carga
 
 def load_model(model_path):
     """
@@ -25,20 +23,64 @@ def get_shap_values(model, X_sample):
     """
     Calcula los valores SHAP para una muestra de datos utilizando TreeExplainer.
 
+    El explicador se construye en cada llamada; para explicar varias veces el mismo modelo (explicador
+    en caché por versión del archivo) usar `src.explainer_service.ExplainerService`. En un modelo con
+    negativos submuestreados los valores se llevan a la escala de la probabilidad recalibrada que sirve
+    el modelo (ver `src.explainer_service.prior_corrected_values`); el `expected_value` del explicador
+    sigue en la escala del promedio de los árboles.
+
+    Un `FlatForest` se explica con su RandomForest original; si no lo trae (los del registro de
+    modelos), se carga el de su versión en MODEL_REGISTRY_DIR.
+
     Parameters:
-        model (sklearn.base.BaseEstimator): Modelo ya entrenado.
+        model (sklearn.base.BaseEstimator or FlatForest): Modelo ya entrenado.
         X_sample (pd.DataFrame): Subconjunto representativo del dataset para explicación.
 
     Returns:
         tuple: 
             - explainer (shap.TreeExplainer): Instancia del explicador.
             - shap_values (list or np.ndarray): Valores SHAP generados.
+
+    Raises:
+        ValueError: Si el modelo es un `FlatForest` sin modelo original ni versión del registro que lo tenga.
     """
+    import shap
+    from src.forest_engine import FlatForest
+
+    # Con el backend de inferencia 'flat' se explica el RandomForest original (un RandomForest también
+    # tiene `estimator`, el árbol base sin entrenar: no sirve mirar solo el atributo)
+    if isinstance(model, FlatForest):
+        model = model.estimator if model.estimator is not None else _registry_estimator(model)
     explainer = shap.TreeExplainer(model)
     shap_values = explainer.shap_values(X_sample)
+    negative_rate = getattr(model, "negative_rate_", 1.0)
+    if negative_rate != 1:
+        from src.explainer_service import fraud_class_values, fraud_expected_value, prior_corrected_values
+
+        fraud, _ = prior_corrected_values(
+            fraud_class_values(shap_values, model.classes_),
+            fraud_expected_value(explainer.expected_value, model.classes_), negative_rate,
+        )
+        # En un problema binario los valores de la clase 0 son los de fraude con el signo cambiado
+        per_class = [fraud if c == 1 else -fraud for c in model.classes_]
+        shap_values = per_class if isinstance(shap_values, list) else np.stack(per_class, axis=-1)
     return explainer, shap_values
 
 
+def _registry_estimator(forest):
+    from src.model_registry import MODEL_FILE, bundle_file
+
+    version = getattr(forest, "version", None)
+    path = bundle_file(MODEL_FILE, version) if version else None
+    if path is None:
+        raise ValueError(
+            "El bosque aplanado no incluye el modelo original"
+            + (f" y la versión {version} no está en el registro" if version else "")
+            + ": cargar el modelo con el backend 'sklearn' para explicarlo."
+        )
+    return joblib.load(path)
+
+
 def plot_shap_summary_bar(shap_values, X_sample, class_idx=1):
     """
     Genera un gráfico de barras que muestra la importancia global media de cada feature.
@@ -51,6 +93,9 @@ def plot_shap_summary_bar(shap_values, X_sample, class_idx=1):
     Returns:
         matplotlib.figure.Figure: Figura matplotlib lista para guardar o mostrar.
     """
+    import shap
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(10, 6))
     shap.summary_plot(shap_values[class_idx], X_sample, plot_type="bar", show=False)
     return plt.gcf()  # Devuelve la figura actual
@@ -69,6 +114,9 @@ def plot_shap_summary_dot(shap_values, X_sample, class_idx=1):
     Returns:
         matplotlib.figure.Figure: Figura matplotlib con el gráfico generado.
     """
+    import shap
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(10, 6))
     shap.summary_plot(shap_values[class_idx], X_sample, plot_type="dot", show=False)
     return plt.gcf()
\ No newline at end of file
@@ -0,0 +1,335 @@
+# src/model_registry.py
+
+import os
+import json
+import time
+import shutil
+import logging
+import argparse
+import threading
+import joblib
+from src.forest_engine import FlatForest
+from src.reference_profile import save_reference_profile, load_reference_profile
+
+# Archivos de cada versión. Los .joblib se guardan sin comprimir: `joblib.load(mmap_mode='r')` mapea
+# sus arreglos desde el archivo, de modo que varios procesos comparten las mismas páginas
+MODEL_FILE = "model.joblib"
+FOREST_FILE = "forest.joblib"
+PREPROCESSOR_FILE = "preprocessor.joblib"
+VELOCITY_FILE = "velocity_store.npz"
+PROFILE_FILE = "reference_profile.json"
+METRICS_FILE = "metrics.json"
+CURRENT_FILE = "CURRENT"
+
+logger = logging.getLogger(__name__)
+
+
+def get_registry_dir(registry_dir=None):
+    """
+    Devuelve la carpeta del registro de modelos.
+
+    Parameters:
+        registry_dir (str, optional): Carpeta explícita. Por defecto MODEL_REGISTRY_DIR (models/registry).
+
+    Returns:
+        str: Ruta de la carpeta.
+    """
+    return registry_dir or os.getenv("MODEL_REGISTRY_DIR", "models/registry")
+
+
+def list_versions(registry_dir=None):
+    """
+    Lista las versiones publicadas, de la más antigua a la más reciente.
+
+    Parameters:
+        registry_dir (str, optional): Carpeta del registro. Por defecto MODEL_REGISTRY_DIR.
+
+    Returns:
+        list: Identificadores de versión (vacía si el registro no existe).
+    """
+    registry_dir = get_registry_dir(registry_dir)
+    if not os.path.isdir(registry_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(registry_dir)
+        if not name.startswith(".") and os.path.isdir(os.path.join(registry_dir, name))
+    )
+
+
+def current_version(registry_dir=None):
+    """
+    Devuelve la versión vigente (la que usan la predicción diaria, el servidor y el dashboard).
+
+    Parameters:
+        registry_dir (str, optional): Carpeta del registro. Por defecto MODEL_REGISTRY_DIR.
+
+    Returns:
+        str or None: Versión vigente, o None si todavía no se publicó ninguna.
+    """
+    try:
+        with open(os.path.join(get_registry_dir(registry_dir), CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def bundle_file(name, version=None, registry_dir=None):
+    """
+    Devuelve la ruta de un archivo de una versión (por ejemplo `PROFILE_FILE`).
+
+    Parameters:
+        name (str): Nombre del archivo dentro de la versión.
+        version (str, optional): Versión. Por defecto la vigente.
+        registry_dir (str, optional): Carpeta del registro. Por defecto MODEL_REGISTRY_DIR.
+
+    Returns:
+        str or None: Ruta del archivo, o None si no hay versión vigente o la versión no lo tiene.
+    """
+    version = version or current_version(registry_dir)
+    if version is None:
+        return None
+    path = os.path.join(get_registry_dir(registry_dir), version, name)
+    return path if os.path.exists(path) else None
+
+
+def set_current_version(version, registry_dir=None):
+    """
+    Cambia la versión vigente de forma atómica (también sirve para volver a una versión anterior).
+
+    El puntero CURRENT se escribe en un archivo temporal y se renombra, así que quien lo lee ve la
+    versión anterior o la nueva, nunca un archivo a medias.
+
+    Parameters:
+        version (str): Versión publicada.
+        registry_dir (str, optional): Carpeta del registro. Por defecto MODEL_REGISTRY_DIR.
+
+    Raises:
+        ValueError: Si la versión no existe en el registro.
+    """
+    registry_dir = get_registry_dir(registry_dir)
+    if not os.path.isdir(os.path.join(registry_dir, version)):
+        raise ValueError(f"La versión {version} no existe en {registry_dir}.")
+    tmp_path = os.path.join(registry_dir, f".{CURRENT_FILE}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(f"{version}\n")
+    os.replace(tmp_path, os.path.join(registry_dir, CURRENT_FILE))
+
+
+def publish_model_bundle(version, model, preprocessor, reference_profile, metrics, velocity=None,
+                         registry_dir=None, make_current=True, keep=None):
+    """
+    Publica una versión del modelo con todo lo necesario para usarla.
+
+    Cada versión es una carpeta `<registro>/<versión>/` con:
+        - model.joblib: el `RandomForestClassifier` (reentrenamiento incremental, SHAP y lotes grandes).
+        - forest.joblib: el bosque aplanado (`FlatForest`). Sus arreglos se mapean en memoria al
+          cargarlo con `mmap_mode='r'`, así que los procesos de puntuación los comparten sin copiarlos
+          (los árboles de scikit-learn, en cambio, se copian al deserializarse).
+        - preprocessor.joblib, reference_profile.json, metrics.json y, si el preprocesamiento usa
+          variables por cuenta, velocity_store.npz.
+    La carpeta se escribe con otro nombre y se renombra al terminar: una versión visible está siempre
+    completa y no se modifica después. Luego se actualiza CURRENT (ver `set_current_version`) y se
+    borran las versiones más antiguas que excedan `keep`; un proceso que todavía tenga mapeada una
+    versión borrada la sigue leyendo sin problemas.
+
+    Parameters:
+        version (str): Identificador de la versión (el del manifiesto del modelo).
+        model (RandomForestClassifier): Modelo entrenado.
+        preprocessor (FraudPreprocessor): Preprocesamiento ajustado.
+        reference_profile (dict): Perfil de referencia (ver `build_reference_profile`).
+        metrics (dict): Métricas y metadatos del entrenamiento (serializables en JSON).
+        velocity (AccountVelocityStore, optional): Estado de las variables por cuenta al final del entrenamiento.
+        registry_dir (str, optional): Carpeta del registro. Por defecto MODEL_REGISTRY_DIR.
+        make_current (bool): Si es True, la versión pasa a ser la vigente.
+        keep (int, optional): Versiones a conservar. Por defecto MODEL_REGISTRY_KEEP (5); 0 conserva todas.
+
+    Returns:
+        str: Carpeta de la versión publicada.
+
+    Raises:
+        ValueError: Si la versión ya existe.
+    """
+    registry_dir = get_registry_dir(registry_dir)
+    path = os.path.join(registry_dir, version)
+    if os.path.exists(path):
+        raise ValueError(f"La versión {version} ya existe en {registry_dir}.")
+    tmp_path = os.path.join(registry_dir, f".{version}.tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    forest = FlatForest.from_sklearn(model)
+    forest.estimator, forest.version = None, version
+    joblib.dump(model, os.path.join(tmp_path, MODEL_FILE))
+    joblib.dump(forest, os.path.join(tmp_path, FOREST_FILE))
+    joblib.dump(preprocessor, os.path.join(tmp_path, PREPROCESSOR_FILE))
+    if velocity is not None:
+        velocity.save(os.path.join(tmp_path, VELOCITY_FILE))
+    save_reference_profile(reference_profile, os.path.join(tmp_path, PROFILE_FILE))
+    with open(os.path.join(tmp_path, METRICS_FILE), "w", encoding="utf-8") as f:
+        json.dump(metrics, f, indent=2)
+    os.rename(tmp_path, path)
+
+    if make_current:
+        set_current_version(version, registry_dir)
+    keep = int(os.getenv("MODEL_REGISTRY_KEEP", 5)) if keep is None else keep
+    if keep > 0:
+        current = current_version(registry_dir)
+        for old in list_versions(registry_dir)[:-keep]:
+            if old != current:
+                shutil.rmtree(os.path.join(registry_dir, old), ignore_errors=True)
+    return path
+
+
+def load_model_bundle(version=None, registry_dir=None, backend=None, mmap_mode="r"):
+    """
+    Carga una versión del registro.
+
+    Con el backend 'flat' el modelo es el bosque aplanado mapeado en memoria (compartido entre
+    procesos, ideal para lotes chicos); con 'sklearn', el `RandomForestClassifier` (más rápido en
+    lotes grandes). El estado por cuenta no se carga: se devuelve su ruta.
+
+    Parameters:
+        version (str, optional): Versión a cargar. Por defecto la vigente.
+        registry_dir (str, optional): Carpeta del registro. Por defecto MODEL_REGISTRY_DIR.
+        backend (str, optional): 'sklearn' o 'flat'. Por defecto INFERENCE_BACKEND ('sklearn').
+        mmap_mode (str, optional): Modo de `joblib.load` para los modelos.
+
+    Returns:
+        dict: 'version', 'path', 'model', 'model_path' (archivo del modelo cargado), 'preprocessor',
+            'reference_profile', 'metrics' y 'velocity_store_path' (None si no hay estado por cuenta).
+
+    Raises:
+        FileNotFoundError: Si no hay versión vigente o la versión no existe.
+        ValueError: Si el backend no es válido.
+    """
+    registry_dir = get_registry_dir(registry_dir)
+    version = version or current_version(registry_dir)
+    if version is None:
+        raise FileNotFoundError(f"No hay una versión vigente en {registry_dir}.")
+    path = os.path.join(registry_dir, version)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"La versión {version} no existe en {registry_dir}.")
+
+    backend = backend or os.getenv("INFERENCE_BACKEND", "sklearn")
+    if backend not in ("sklearn", "flat"):
+        raise ValueError(f"Backend de inferencia no soportado: {backend}")
+    model_path = os.path.join(path, FOREST_FILE if backend == "flat" else MODEL_FILE)
+    with open(os.path.join(path, METRICS_FILE), encoding="utf-8") as f:
+        metrics = json.load(f)
+    velocity_path = os.path.join(path, VELOCITY_FILE)
+    model = joblib.load(model_path, mmap_mode=mmap_mode)
+    if isinstance(model, FlatForest):
+        # Las versiones publicadas antes de guardar `version` en el bosque no la traen
+        model.version = version
+    return {
+        "version": version,
+        "path": path,
+        "model": model,
+        "model_path": model_path,
+        "preprocessor": joblib.load(os.path.join(path, PREPROCESSOR_FILE)),
+        "reference_profile": load_reference_profile(os.path.join(path, PROFILE_FILE)),
+        "metrics": metrics,
+        "velocity_store_path": velocity_path if os.path.exists(velocity_path) else None,
+    }
+
+
+class ModelHolder:
+    """
+    Mantiene cargada la versión vigente del registro y la reemplaza en caliente cuando cambia.
+
+    `get()` relee el puntero CURRENT como máximo cada `refresh_seconds`, en un hilo de fondo: si
+    apunta a otra versión, la carga con `load` y la publica con una sola asignación. Mientras tanto
+    `get()` sigue devolviendo la versión cargada sin esperar, y cada llamada devuelve una versión
+    completa (vieja o nueva), nunca una mezcla. Quien la use debe tomarla una vez por solicitud y no
+    volver a pedirla a mitad de camino. Si la carga falla (por ejemplo, una versión ya borrada por
+    MODEL_REGISTRY_KEEP), se registra el error y se sigue sirviendo la anterior; se reintenta en la
+    próxima revisión. Las cargas se serializan con un lock.
+
+    Parameters:
+        load (callable, optional): `load(version, previous)` devuelve lo que se sirve para esa versión;
+            `previous` es lo cargado antes (o None). Por defecto `load_model_bundle(version)`.
+        registry_dir (str, optional): Carpeta del registro. Por defecto MODEL_REGISTRY_DIR.
+        refresh_seconds (float, optional): Intervalo entre lecturas de CURRENT. Por defecto
+            MODEL_REFRESH_SECONDS (5).
+    """
+
+    def __init__(self, load=None, registry_dir=None, refresh_seconds=None):
+        self.registry_dir = get_registry_dir(registry_dir)
+        self.load = load or (lambda version, previous: load_model_bundle(version, self.registry_dir))
+        self.refresh_seconds = (float(os.getenv("MODEL_REFRESH_SECONDS", 5))
+                                if refresh_seconds is None else refresh_seconds)
+        self._current = (None, None)
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self.refresh()
+
+    @property
+    def version(self):
+        """str: Versión cargada."""
+        return self._current[0]
+
+    def get(self):
+        """
+        Devuelve lo cargado para la versión vigente, sin esperar a que termine una carga en curso.
+
+        Si pasaron `refresh_seconds` desde la última revisión, lanza una en un hilo de fondo.
+
+        Returns:
+            object: Resultado de `load` para la versión cargada.
+        """
+        if time.monotonic() - self._checked_at >= self.refresh_seconds and not self._lock.locked():
+            self._checked_at = time.monotonic()
+            self._refresh_thread = threading.Thread(target=self._refresh_in_background, daemon=True)
+            self._refresh_thread.start()
+        return self._current[1]
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("No se pudo cargar la versión vigente de %s; se sigue sirviendo la %s.",
+                             self.registry_dir, self.version)
+
+    def refresh(self):
+        """
+        Relee CURRENT y carga la versión vigente si es distinta de la cargada.
+
+        Si la carga falla, la versión cargada no cambia.
+
+        Returns:
+            bool: True si se cargó una versión nueva.
+
+        Raises:
+            FileNotFoundError: Si el registro no tiene versión vigente y no hay nada cargado.
+            Exception: Lo que lance `load` (por ejemplo, FileNotFoundError si la versión ya no existe).
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            version = current_version(self.registry_dir)
+            if version is None and self._current[0] is None:
+                raise FileNotFoundError(f"No hay una versión vigente en {self.registry_dir}.")
+            if version is None or version == self._current[0]:
+                return False
+            self._current = (version, self.load(version, self._current[1]))
+            return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registro de versiones del modelo de fraude.")
+    parser.add_argument("--registry-dir", help="Carpeta del registro (por defecto MODEL_REGISTRY_DIR).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Lista las versiones publicadas.")
+    promote = commands.add_parser("promote", help="Cambia la versión vigente (p. ej. para volver atrás).")
+    promote.add_argument("version")
+    args = parser.parse_args()
+
+    if args.command == "promote":
+        set_current_version(args.version, args.registry_dir)
+    current = current_version(args.registry_dir)
+    for version in list_versions(args.registry_dir):
+        print(f"{'*' if version == current else ' '} {version}")
+
+
+if __name__ == "__main__":
+    main()
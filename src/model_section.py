@@ -1,33 +1,32 @@
 # src/model_section.py
 
-import os
+import json
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 from PIL import Image
-from dotenv import load_dotenv
+from src.metrics_store import query_metrics, latest_metrics, query_stage_timings
+from src.model_registry import METRICS_FILE, bundle_file, current_version, list_versions
 
-load_dotenv()
-
-def load_monitoring_data(csv_path=os.getenv("MONITORING_METRICS")):
+def load_monitoring_data(db_path=None, start_date=None, end_date=None):
     """
-    Carga el archivo CSV de métricas de monitoreo del modelo.
+    Carga el historial de métricas de monitoreo del modelo desde la base de métricas.
 
     Parameters:
-        csv_path (str): Ruta al archivo CSV con métricas históricas.
+        db_path (str, optional): Ruta a la base SQLite de métricas. Por defecto MONITORING_DB.
+        start_date (str or datetime, optional): Fecha inicial del rango (inclusive).
+        end_date (str or datetime, optional): Fecha final del rango (inclusive).
 
     Returns:
         pd.DataFrame: DataFrame con columnas como 'date', 'auc', 'recall', etc.
 
     Raises:
-        FileNotFoundError: Si el archivo no existe.
-        ValueError: Si ocurre un error al leer el archivo.
+        ValueError: Si ocurre un error al leer la base.
     """
-    if not os.path.exists(csv_path):
-        raise FileNotFoundError(f"El archivo no existe: {csv_path}")
     try:
-        return pd.read_csv(csv_path, parse_dates=["date"])
+        return query_metrics(start_date, end_date, db_path)
     except Exception as e:
-        raise ValueError(f"Error al leer el archivo CSV: {e}")
+        raise ValueError(f"Error al leer las métricas de monitoreo: {e}")
 
 
 def plot_model_performance(df):
@@ -69,6 +68,56 @@ def plot_drift(df):
     return fig
 
 
+def load_stage_timings(job=None, db_path=None, start_date=None, end_date=None):
+    """
+    Carga los tiempos por etapa de las tareas cron registrados en la base de métricas.
+
+    Parameters:
+        job (str, optional): Tarea a consultar (por ejemplo 'cron_daily_predict'). Si es None, todas.
+        db_path (str, optional): Ruta a la base SQLite de métricas. Por defecto MONITORING_DB.
+        start_date (str or datetime, optional): Fecha inicial del rango (inclusive).
+        end_date (str or datetime, optional): Fecha final del rango (inclusive).
+
+    Returns:
+        pd.DataFrame: Una fila por ejecución y etapa, con 'date', 'job', 'stage', 'wall_s', 'cpu_s',
+        'rows' y 'peak_rss_mib'.
+
+    Raises:
+        ValueError: Si ocurre un error al leer la base.
+    """
+    try:
+        return query_stage_timings(job, start_date, end_date, db_path)
+    except Exception as e:
+        raise ValueError(f"Error al leer los tiempos del pipeline: {e}")
+
+
+def plot_pipeline_latency(df, job):
+    """
+    Genera un gráfico de barras apiladas con el tiempo de cada etapa por ejecución de una tarea.
+
+    Solo se grafican las etapas de primer nivel (las anidadas, como 'preprocess/impute', ya están
+    incluidas en su etapa padre); la línea muestra el tiempo total de la tarea.
+
+    Parameters:
+        df (pd.DataFrame): Tiempos por etapa (ver `load_stage_timings`).
+        job (str): Tarea a graficar.
+
+    Returns:
+        plotly.graph_objects.Figure: Gráfico de latencia por etapa.
+    """
+    df = df[df["job"] == job]
+    stages = df[~df["stage"].str.contains("/") & (df["stage"] != "total")]
+    fig = px.bar(
+        stages, x="date", y="wall_s", color="stage", title=f"Latencia por Etapa ({job})",
+        labels={"wall_s": "Segundos", "date": "Fecha", "stage": "Etapa"},
+        hover_data=["rows", "cpu_s", "peak_rss_mib"]
+    )
+    total = df[df["stage"] == "total"]
+    fig.add_scatter(x=total["date"], y=total["wall_s"], mode="lines+markers", name="total",
+                    line=dict(color="black"))
+    return fig
+
+
 def load_shap_bar_plot(csv_path):
     """
     Carga un archivo CSV con valores de SHAP y genera un gráfico de barras horizontales
@@ -91,22 +140,24 @@ def load_shap_bar_plot(csv_path):
     return fig
 
 
-def load_latest_metrics(df):
+def load_latest_metrics(df=None, db_path=None):
     """
-    Extrae las métricas más recientes desde el DataFrame de monitoreo.
+    Extrae las métricas más recientes, desde un DataFrame de monitoreo o directamente desde la
+    base de métricas (leyendo solo el último registro).
 
     Parameters:
-        df (pd.DataFrame): DataFrame con métricas por fecha.
+        df (pd.DataFrame, optional): DataFrame con métricas por fecha. Si es None se consulta la base.
+        db_path (str, optional): Ruta a la base SQLite de métricas. Por defecto MONITORING_DB.
 
     Returns:
         dict: Diccionario con las métricas del último día.
 
     Raises:
-        ValueError: Si el DataFrame está vacío.
+        ValueError: Si no hay métricas registradas.
     """
-    if df.empty:
-        raise ValueError("El DataFrame de monitoreo está vacío. No se puede extraer la última métrica.")
-    latest = df.iloc[-1]
+    latest = latest_metrics(db_path) if df is None else (None if df.empty else df.iloc[-1])
+    if latest is None:
+        raise ValueError("El historial de monitoreo está vacío. No se puede extraer la última métrica.")
     summary = {
         "date": latest["date"].date(),
         "auc": latest["auc"],
@@ -116,4 +167,83 @@ def load_latest_metrics(df):
         "drift_score": latest["drift_score"],
         "retrain": bool(latest["retrain_triggered"])
     }
-    return summary
\ No newline at end of file
+    return summary
+
+
+def load_registry_versions(registry_dir=None):
+    """
+    Resume las versiones del registro de modelos a partir de sus métricas de entrenamiento.
+
+    Parameters:
+        registry_dir (str, optional): Carpeta del registro. Por defecto MODEL_REGISTRY_DIR.
+
+    Returns:
+        pd.DataFrame: Una fila por versión (la más reciente primero) con modo, filas, árboles, último
+            step, AUC y PR-AUC de la partición de prueba (solo entrenamientos completos) y si es la vigente.
+    """
+    current = current_version(registry_dir)
+    rows = []
+    for version in reversed(list_versions(registry_dir)):
+        with open(bundle_file(METRICS_FILE, version, registry_dir), encoding="utf-8") as f:
+            metrics = json.load(f)
+        holdout = metrics.get("holdout", {})
+        rows.append({
+            "version": version,
+            "vigente": version == current,
+            "created_at": metrics.get("created_at"),
+            "mode": metrics.get("mode"),
+            "n_rows": metrics.get("n_rows"),
+            "n_trees": metrics.get("n_trees"),
+            "trained_through_step": metrics.get("trained_through_step"),
+            "holdout_auc": holdout.get("auc"),
+            "holdout_pr_auc": holdout.get("pr_auc"),
+        })
+    return pd.DataFrame(rows)
+
+
+def reference_profile_summary(profile):
+    """
+    Resume el perfil de referencia del entrenamiento en una tabla por variable.
+
+    Parameters:
+        profile (dict): Perfil generado por `src.reference_profile.build_reference_profile`.
+
+    Returns:
+        pd.DataFrame: Media, desviación estándar, mediana y percentiles 1/99 por variable.
+    """
+    rows = {
+        col: {
+            "media": stats["mean"],
+            "desv_std": stats["variance"] ** 0.5,
+            "p01": stats["quantiles"]["0.01"],
+            "mediana": stats["quantiles"]["0.5"],
+            "p99": stats["quantiles"]["0.99"],
+        }
+        for col, stats in profile["columns"].items()
+    }
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def plot_reference_histogram(profile, column):
+    """
+    Genera el histograma de referencia (datos de entrenamiento) de una variable del perfil.
+
+    Parameters:
+        profile (dict): Perfil de referencia.
+        column (str): Variable a graficar.
+
+    Returns:
+        plotly.graph_objects.Figure: Histograma entre los percentiles 0.5 y 99.5.
+    """
+    hist = profile["columns"][column]["histogram"]
+    edges = hist["edges"]
+    fig = go.Figure(go.Bar(
+        x=[(lo + hi) / 2 for lo, hi in zip(edges[:-1], edges[1:])],
+        y=hist["counts"],
+        width=[hi - lo for lo, hi in zip(edges[:-1], edges[1:])],
+    ))
+    fig.update_layout(
+        title=f"Distribución de referencia de {column}",
+        xaxis_title=column, yaxis_title="Frecuencia", bargap=0
+    )
+    return fig
@@ -1,31 +1,232 @@
+import os
+import json
 import joblib
+import numpy as np
+import pandas as pd
+from datetime import datetime
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
+from src.forest_engine import prior_correction
+from src.profiling import stage
 
-def train_model(X, y, save_path=None):
+def _to_float32(X, rows):
+    """
+    Copia las filas `rows` de X en un arreglo float32 contiguo por columnas (orden Fortran).
+
+    Es el tipo con el que scikit-learn construye los árboles, y el orden por columnas es el que recorre
+    el buscador de cortes; al llenarlo columna a columna no se crea la copia intermedia de `DataFrame.to_numpy`.
+
+    Parameters:
+        X (pd.DataFrame): Variables predictoras.
+        rows (np.ndarray): Posiciones de las filas a copiar.
+
+    Returns:
+        np.ndarray: Arreglo (len(rows), n_columnas) float32 en orden Fortran.
+    """
+    out = np.empty((len(rows), X.shape[1]), dtype=np.float32, order="F")
+    for j, col in enumerate(X.columns):
+        out[:, j] = X[col].to_numpy()[rows]
+    return out
+
+class DownsampledRandomForestClassifier(RandomForestClassifier):
+    """
+    Random Forest entrenado con una fracción `negative_rate_` de las transacciones legítimas.
+
+    `predict_proba` (y por lo tanto `predict`) devuelve las probabilidades corregidas a la tasa de
+    fraude original (ver `prior_correction`), de modo que el umbral de decisión conserva su significado.
+    Los árboles son los de un `RandomForestClassifier` común.
+    """
+
+    def predict_proba(self, X):
+        return prior_correction(super().predict_proba(X), self.classes_, getattr(self, "negative_rate_", 1.0))
+
+def downsample_negatives(y, rows, negative_rate, random_state=42):
+    """
+    Submuestrea la clase negativa conservando todos los positivos.
+
+    Parameters:
+        y (np.ndarray): Variable objetivo binaria completa.
+        rows (np.ndarray): Posiciones candidatas (p. ej. las de entrenamiento).
+        negative_rate (float): Fracción de negativos a conservar, en (0, 1].
+        random_state (int): Semilla.
+
+    Returns:
+        np.ndarray: Posiciones conservadas, en el mismo orden.
+
+    Raises:
+        ValueError: Si `negative_rate` no está en (0, 1].
+    """
+    if not 0 < negative_rate <= 1:
+        raise ValueError("negative_rate debe estar en (0, 1].")
+    if negative_rate == 1:
+        return rows
+    keep = (y[rows] != 0) | (np.random.RandomState(random_state).random_sample(len(rows)) < negative_rate)
+    return rows[keep]
+
+def train_model(X, y, save_path=None, n_jobs=None, negative_rate=1.0):
     """
     Entrena un modelo Random Forest sobre los datos proporcionados y opcionalmente guarda el modelo.
 
+    La partición entrenamiento/prueba se hace sobre posiciones, y solo las filas usadas se copian a
+    arreglos float32 contiguos (ver `_to_float32`), sin pasar por copias float64 del DataFrame. Con
+    `negative_rate` < 1 se entrena con todos los fraudes y esa fracción de las transacciones legítimas
+    (la partición de prueba no se submuestrea) y se devuelve un `DownsampledRandomForestClassifier`,
+    cuyas probabilidades se recalibran a la tasa de fraude original. Los árboles se entrenan en
+    paralelo con `n_jobs` núcleos; el modelo se devuelve con `n_jobs=None` para que la inferencia
+    siga controlada por PREDICT_N_JOBS.
+
     Parameters:
         X (pd.DataFrame): Variables predictoras.
         y (pd.Series): Variable objetivo binaria.
         save_path (str, optional): Ruta donde guardar el modelo entrenado (.pkl). Si no se proporciona, no se guarda.
+        n_jobs (int, optional): Núcleos para entrenar. Por defecto TRAIN_N_JOBS (-1, todos).
+        negative_rate (float): Fracción de negativos a conservar. Con 1 se usan todos.
 
     Returns:
         tuple: 
             - model (RandomForestClassifier): Modelo entrenado.
-            - X_train (pd.DataFrame): Subconjunto de entrenamiento.
-            - X_test (pd.DataFrame): Subconjunto de prueba.
+            - X_train (pd.DataFrame): Filas usadas para entrenar (float32, tras el submuestreo).
+            - X_test (pd.DataFrame): Subconjunto de prueba (float32).
             - y_train (pd.Series): Target de entrenamiento.
             - y_test (pd.Series): Target de prueba.
     """
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, stratify=y, random_state=42
+    n_jobs = n_jobs or int(os.getenv("TRAIN_N_JOBS", -1))
+    y_values = np.asarray(y)
+    train_rows, test_rows = train_test_split(
+        np.arange(len(y_values)), test_size=0.2, stratify=y_values, random_state=42
     )
-    model = RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42)
-    model.fit(X_train, y_train)
+    # Se conserva el orden de la partición: sin submuestreo el modelo es el mismo que con el DataFrame
+    train_rows = downsample_negatives(y_values, train_rows, negative_rate)
+    with stage("to_float32", rows=len(train_rows)):
+        X_train = _to_float32(X, train_rows)
+
+    estimator = RandomForestClassifier if negative_rate == 1 else DownsampledRandomForestClassifier
+    model = estimator(n_estimators=100, max_depth=10, random_state=42, n_jobs=n_jobs)
+    with stage("fit", rows=len(train_rows)):
+        model.fit(X_train, y_values[train_rows])
+    # Entrenado con arreglos: se conservan los nombres para validar las columnas al predecir
+    model.feature_names_in_ = np.asarray(X.columns, dtype=object)
+    model.set_params(n_jobs=None)
+    if negative_rate != 1:
+        model.negative_rate_ = float(negative_rate)
 
     if save_path:
         joblib.dump(model, save_path)
 
-    return model, X_train, X_test, y_train, y_test
\ No newline at end of file
+    X_train = pd.DataFrame(X_train, columns=X.columns, index=X.index[train_rows], copy=False)
+    X_test = pd.DataFrame(_to_float32(X, test_rows), columns=X.columns, index=X.index[test_rows], copy=False)
+    return model, X_train, X_test, y.iloc[train_rows], y.iloc[test_rows]
+
+def update_model(model, X, y, window, n_new_trees=25, max_trees=100, save_path=None, n_jobs=None):
+    """
+    Actualiza un Random Forest de forma incremental: agrega árboles entrenados solo con la ventana nueva
+    (`warm_start`) y retira los más antiguos.
+
+    Cada árbol recuerda la ventana de `step` con la que se entrenó (`model.tree_windows_`, en orden
+    cronológico; los árboles de un modelo sin ese atributo se consideran de una única ventana anterior).
+    Tras agregar `n_new_trees`, si el bosque supera `max_trees` se descartan los árboles de las ventanas
+    más antiguas, de modo que el modelo cubre un horizonte deslizante y el costo de cada actualización
+    depende del tamaño de la ventana nueva y no del historial completo. Los árboles nuevos se entrenan
+    igual que en `train_model` (float32 contiguo, `n_jobs` núcleos), con la misma fracción de negativos
+    que el modelo original (`negative_rate_`), para que la recalibración valga para todo el bosque.
+
+    Parameters:
+        model (RandomForestClassifier): Modelo ya entrenado (se modifica en el lugar).
+        X (pd.DataFrame): Variables predictoras de la ventana nueva, con las mismas columnas del modelo.
+        y (pd.Series): Variable objetivo de la ventana nueva.
+        window (tuple): (step inicial, step final) de la ventana nueva.
+        n_new_trees (int): Árboles a agregar.
+        max_trees (int): Tamaño máximo del bosque tras la actualización.
+        save_path (str, optional): Ruta donde guardar el modelo actualizado.
+        n_jobs (int, optional): Núcleos para entrenar. Por defecto TRAIN_N_JOBS (-1, todos).
+
+    Returns:
+        RandomForestClassifier: El modelo actualizado.
+
+    Raises:
+        ValueError: Si la ventana no contiene ambas clases.
+    """
+    if y.nunique() < 2:
+        raise ValueError("La ventana nueva debe contener transacciones de ambas clases.")
+    windows = list(getattr(model, "tree_windows_", [None] * len(model.estimators_)))
+
+    n_jobs = n_jobs or int(os.getenv("TRAIN_N_JOBS", -1))
+    y_values = np.asarray(y)
+    rows = downsample_negatives(y_values, np.arange(len(y_values)), getattr(model, "negative_rate_", 1.0))
+
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + n_new_trees, n_jobs=n_jobs)
+    with stage("fit", rows=len(rows)):
+        model.fit(_to_float32(X, rows), y_values[rows])
+    model.feature_names_in_ = np.asarray(X.columns, dtype=object)
+    windows += [tuple(window)] * n_new_trees
+
+    # Retirar los árboles más antiguos (los primeros de la lista)
+    retired = max(len(model.estimators_) - max_trees, 0)
+    model.estimators_ = model.estimators_[retired:]
+    model.tree_windows_ = windows[retired:]
+    model.set_params(warm_start=False, n_estimators=len(model.estimators_), n_jobs=None)
+
+    if save_path:
+        joblib.dump(model, save_path)
+
+    return model
+
+def load_model_manifest(manifest_path):
+    """
+    Carga el historial de versiones del modelo.
+
+    Parameters:
+        manifest_path (str): Ruta del manifiesto JSON.
+
+    Returns:
+        list: Versiones registradas, de la más antigua a la más reciente (vacía si no existe el archivo).
+    """
+    if not manifest_path or not os.path.exists(manifest_path):
+        return []
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)["versions"]
+
+def record_model_version(manifest_path, mode, trained_through_step, n_rows, model, **extra):
+    """
+    Registra una nueva versión del modelo en el manifiesto.
+
+    Parameters:
+        manifest_path (str): Ruta del manifiesto JSON.
+        mode (str): 'full' o 'incremental'.
+        trained_through_step (int): Último `step` incluido en el entrenamiento.
+        n_rows (int): Filas usadas en esta versión (el dataset completo o la ventana nueva).
+        model (RandomForestClassifier): Modelo entrenado.
+        **extra: Campos adicionales a guardar (p. ej. tiempo de entrenamiento). 'parent_version'
+            reemplaza a la versión anterior del manifiesto como versión de partida.
+
+    Returns:
+        dict: Entrada registrada.
+    """
+    versions = load_model_manifest(manifest_path)
+    windows = [w for w in getattr(model, "tree_windows_", []) if w is not None]
+    # Dos versiones en el mismo segundo se distinguen con un sufijo (el orden alfabético sigue siendo el cronológico)
+    version = base = datetime.now().strftime("%Y%m%d%H%M%S")
+    existing = {v["version"] for v in versions}
+    suffix = 1
+    while version in existing:
+        suffix += 1
+        version = f"{base}_{suffix}"
+    entry = {
+        "version": version,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "mode": mode,
+        "parent_version": versions[-1]["version"] if versions else None,
+        "trained_through_step": int(trained_through_step),
+        "n_rows": int(n_rows),
+        "n_trees": len(model.estimators_),
+        "oldest_step": int(min(w[0] for w in windows)) if windows else None,
+        **extra,
+    }
+    versions.append(entry)
+
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"versions": versions}, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return entry
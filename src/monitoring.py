@@ -1,9 +1,7 @@
-from scipy.stats import wasserstein_distance
-from sklearn.metrics import roc_auc_score
-from dotenv import load_dotenv
-import os
+import numpy as np
+
+_PSI_EPS = 1e-6
 
-load_dotenv()
 def check_drift(df_new, df_ref, columns, threshold=0.1):
     """
     Calcula el drift (desviación) entre las distribuciones de las columnas seleccionadas
@@ -20,6 +18,8 @@ def check_drift(df_new, df_ref, columns, threshold=0.1):
             - "drift_score": valor de la distancia de Wasserstein.
             - "drifted": True si el drift supera el umbral, False en caso contrario.
     """
+    from scipy.stats import wasserstein_distance
+
     drift_report = {}
     for col in columns:
         dist = wasserstein_distance(df_new[col], df_ref[col])
@@ -45,6 +45,8 @@ def check_model_degradation(y_true, y_proba, baseline_auc, threshold=0.05):
             - "auc_drop": Diferencia entre el baseline y el AUC actual.
             - "retrain": True si la caída de AUC supera el umbral, False en caso contrario.
     """
+    from sklearn.metrics import roc_auc_score
+
     current_auc = roc_auc_score(y_true, y_proba)
     auc_drop = baseline_auc - current_auc
     needs_retraining = auc_drop > threshold
@@ -52,4 +54,217 @@ def check_model_degradation(y_true, y_proba, baseline_auc, threshold=0.05):
         "current_auc": current_auc,
         "auc_drop": auc_drop,
         "retrain": needs_retraining
-    }
\ No newline at end of file
+    }
+
+
+def build_reference_sketch(values, n_quantiles=1000, psi_bins=10):
+    """
+    Resume la distribución de referencia de una columna en un sketch de cuantiles.
+
+    Guarda los cuantiles únicos de la referencia (que actúan como bordes de intervalo) junto con
+    su función de distribución exacta en cada borde, tanto a izquierda F(e-) como a derecha F(e),
+    para representar correctamente las masas puntuales (por ejemplo, saldos en 0), y la integral
+    exacta de F en cada intervalo. Con este resumen, el drift diario se calcula sin volver a
+    cargar ni ordenar la referencia.
+
+    Parameters:
+        values (array-like): Valores de referencia de la columna (se ignoran los NaN).
+        n_quantiles (int): Número de cuantiles uniformes; cada intervalo abierto entre bordes
+            contiene como máximo ~1/n_quantiles de la masa de referencia. Se agregan además
+            cuantiles extremos (hasta 1e-7 y 1 - 1e-7) para acotar los intervalos de las colas.
+        psi_bins (int): Número de intervalos (por cuantiles de referencia) para el PSI.
+
+    Returns:
+        dict: Sketch serializable en JSON con 'edges', 'cdf_left', 'cdf_right', 'integral',
+        'psi_edges' y 'n'. Si no hay valores (columna vacía o toda nula) las listas quedan vacías y
+        `n` es 0; el drift contra ese sketch es NaN (ver `DriftAccumulator.result`).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = np.sort(values[~np.isnan(values)])
+    n = len(values)
+    if n == 0:
+        return {"edges": [], "cdf_left": [], "cdf_right": [], "integral": [], "psi_edges": [], "n": 0}
+    # Rejilla uniforme más cuantiles extremos, para no dejar intervalos muy anchos en colas pesadas
+    tail = np.logspace(-7, np.log10(1 / n_quantiles), 8)
+    probs = np.concatenate([np.linspace(0, 1, n_quantiles + 1), tail, 1 - tail])
+    edges = np.unique(np.quantile(values, np.clip(probs, 0, 1)))
+    left = np.searchsorted(values, edges, side="left")
+    right = np.searchsorted(values, edges, side="right")
+    # Conteo y suma de los valores estrictamente dentro de cada intervalo (e_k, e_k+1)
+    counts = left[1:] - right[:-1]
+    cumsum = np.concatenate([[0.0], np.cumsum(values)])
+    sums = cumsum[left[1:]] - cumsum[right[:-1]]
+    psi_edges = np.unique(np.searchsorted(right / n, np.linspace(0, 1, psi_bins + 1)[1:-1], side="left"))
+    return {
+        "edges": edges.tolist(),
+        "cdf_left": (left / n).tolist(),
+        "cdf_right": (right / n).tolist(),
+        "integral": _cdf_integrals(edges, right / n, counts, sums, n).tolist(),
+        "psi_edges": psi_edges.tolist(),
+        "n": int(n),
+    }
+
+
+def _cdf_integrals(edges, cdf_right, counts, sums, n):
+    # Integral exacta de F en cada intervalo [e_k, e_k+1]: F(e_k) * ancho más el aporte de cada
+    # valor x dentro del intervalo, (e_k+1 - x) / n
+    return cdf_right[:-1] * np.diff(edges) + (counts * edges[1:] - sums) / max(n, 1)
+
+
+class DriftAccumulator:
+    """
+    Acumulador en una sola pasada del drift de una columna frente a su sketch de referencia.
+
+    Cada bloque de datos nuevos se reparte en los intervalos del sketch (`update`), guardando
+    conteo y suma por intervalo; los acumuladores de distintos bloques pueden combinarse con
+    `merge`. Con esos resúmenes se obtienen, sin volver a recorrer los datos:
+        - Distancia de Wasserstein: en cada intervalo se usa |integral(F_nueva - F_ref)|, que es
+          exacta salvo que ambas distribuciones se crucen dentro del intervalo; en ese caso el
+          error está acotado por 2 * ancho * min(max(dif), max(-dif)) y se informa la suma de
+          esas cotas. Las colas fuera del rango de referencia se integran de forma exacta.
+        - KS (máxima diferencia entre distribuciones evaluada en los bordes).
+        - PSI sobre intervalos de igual masa en la referencia.
+
+    Parameters:
+        sketch (dict): Sketch de referencia de la columna (ver `build_reference_sketch`).
+    """
+
+    def __init__(self, sketch):
+        self.edges = np.asarray(sketch["edges"], dtype=np.float64)
+        self.ref_cdf_left = np.asarray(sketch["cdf_left"])
+        self.ref_cdf_right = np.asarray(sketch["cdf_right"])
+        self.ref_integral = np.asarray(sketch["integral"])
+        self.psi_edges = np.asarray(sketch["psi_edges"], dtype=np.intp)
+        n_edges = len(self.edges)
+        # open_*[k]: valores en el intervalo abierto que termina en el borde k (k = 0 es la
+        # cola inferior, k = n_edges la superior); atom_counts[k]: valores iguales al borde k
+        self.open_counts = np.zeros(n_edges + 1, dtype=np.int64)
+        self.open_sums = np.zeros(n_edges + 1, dtype=np.float64)
+        self.atom_counts = np.zeros(n_edges, dtype=np.int64)
+        self.n = 0
+
+    def update(self, values):
+        """
+        Incorpora un bloque de valores nuevos (se ignoran los NaN).
+
+        Parameters:
+            values (array-like): Valores de la columna.
+
+        Returns:
+            DriftAccumulator: La propia instancia.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        left = np.searchsorted(self.edges, values, side="left")
+        is_atom = np.searchsorted(self.edges, values, side="right") > left
+        inside = ~is_atom
+        size = len(self.open_counts)
+        self.open_counts += np.bincount(left[inside], minlength=size)
+        self.open_sums += np.bincount(left[inside], weights=values[inside], minlength=size)
+        self.atom_counts += np.bincount(left[is_atom], minlength=len(self.atom_counts))
+        self.n += len(values)
+        return self
+
+    def merge(self, other):
+        """
+        Combina otro acumulador construido sobre el mismo sketch.
+
+        Parameters:
+            other (DriftAccumulator): Acumulador a sumar.
+
+        Returns:
+            DriftAccumulator: La propia instancia.
+        """
+        self.open_counts += other.open_counts
+        self.open_sums += other.open_sums
+        self.atom_counts += other.atom_counts
+        self.n += other.n
+        return self
+
+    def result(self):
+        """
+        Calcula las métricas de drift acumuladas.
+
+        Returns:
+            dict: 'wasserstein', 'wasserstein_error_bound', 'ks', 'psi' y 'n'. Las métricas son NaN
+            si el sketch de referencia está vacío.
+        """
+        if not len(self.edges):
+            return {"wasserstein": np.nan, "wasserstein_error_bound": np.nan, "ks": np.nan, "psi": np.nan, "n": self.n}
+        n = max(self.n, 1)
+        # F_nueva(e-) y F_nueva(e) en cada borde
+        before_edge = np.cumsum(self.open_counts[:-1]) + np.concatenate([[0], np.cumsum(self.atom_counts)[:-1]])
+        new_cdf_left = before_edge / n
+        new_cdf_right = (before_edge + self.atom_counts) / n
+
+        # Colas: la referencia vale 0 antes del primer borde y 1 después del último
+        below = self.open_counts[0] * self.edges[0] - self.open_sums[0]
+        above = self.open_sums[-1] - self.open_counts[-1] * self.edges[-1]
+
+        widths = np.diff(self.edges)
+        new_integral = _cdf_integrals(self.edges, new_cdf_right, self.open_counts[1:-1], self.open_sums[1:-1], n)
+        # Rango posible de F_nueva - F_ref dentro de cada intervalo
+        diff_low = new_cdf_right[:-1] - self.ref_cdf_left[1:]
+        diff_high = new_cdf_left[1:] - self.ref_cdf_right[:-1]
+        crosses = (diff_low < 0) & (diff_high > 0)
+
+        wasserstein = (below + above) / n + float(np.sum(np.abs(new_integral - self.ref_integral)))
+        error_bound = float(np.sum(np.where(crosses, 2 * widths * np.minimum(diff_high, -diff_low), 0.0)))
+        ks = float(max(np.max(np.abs(new_cdf_left - self.ref_cdf_left)),
+                       np.max(np.abs(new_cdf_right - self.ref_cdf_right))))
+
+        # PSI: masa de cada intervalo [borde_a, borde_b) entre los bordes elegidos
+        new_psi = np.diff(np.concatenate([[0.0], new_cdf_left[self.psi_edges], [1.0]]))
+        ref_psi = np.diff(np.concatenate([[0.0], self.ref_cdf_left[self.psi_edges], [1.0]]))
+        new_psi = np.clip(new_psi, _PSI_EPS, None)
+        ref_psi = np.clip(ref_psi, _PSI_EPS, None)
+        psi = float(np.sum((new_psi - ref_psi) * np.log(new_psi / ref_psi)))
+
+        return {
+            "wasserstein": wasserstein,
+            "wasserstein_error_bound": error_bound,
+            "ks": ks,
+            "psi": psi,
+            "n": self.n,
+        }
+
+
+def check_drift_sketch(df_new, reference, columns, threshold=0.1):
+    """
+    Calcula el drift de las columnas seleccionadas frente a sketches de referencia precalculados.
+
+    Equivalente a `check_drift` pero sin necesitar el dataset de referencia: `drift_score` es la
+    distancia de Wasserstein aproximada (ver `DriftAccumulator`), y además se informan la cota de
+    error, KS y PSI obtenidos en la misma pasada.
+
+    Args:
+        df_new (pd.DataFrame or iterable): DataFrame con los datos nuevos, o un iterable de bloques
+            (DataFrames) para procesarlos en streaming.
+        reference (dict): Diccionario columna -> sketch (ver `build_reference_sketch`).
+        columns (list): Lista de nombres de columnas numéricas a comparar.
+        threshold (float, opcional): Umbral a partir del cual se considera que hay drift. Por defecto 0.1.
+
+    Returns:
+        dict: Diccionario donde cada clave es una columna y el valor es otro diccionario con:
+            - "drift_score": distancia de Wasserstein aproximada.
+            - "drifted": True si el drift supera el umbral, False en caso contrario.
+            - "error_bound": cota del error absoluto de "drift_score".
+            - "ks" y "psi": estadísticos KS y PSI.
+    """
+    accumulators = {col: DriftAccumulator(reference[col]) for col in columns}
+    chunks = [df_new] if hasattr(df_new, "columns") else df_new
+    for chunk in chunks:
+        for col in columns:
+            accumulators[col].update(chunk[col].to_numpy())
+
+    drift_report = {}
+    for col, accumulator in accumulators.items():
+        result = accumulator.result()
+        drift_report[col] = {
+            "drift_score": result["wasserstein"],
+            "drifted": result["wasserstein"] > threshold,
+            "error_bound": result["wasserstein_error_bound"],
+            "ks": result["ks"],
+            "psi": result["psi"],
+        }
+    return drift_report
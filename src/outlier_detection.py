@@ -1,27 +1,43 @@
+import numpy as np
 import pandas as pd
 
-def remove_outliers_iqr(df, cols, target='isFraud'):
+def remove_outliers_iqr(df, cols, target='isFraud', sequential=False, random_state=42):
     """
     Elimina valores atípicos (outliers) de columnas numéricas usando el método IQR,
     pero solo para la clase mayoritaria (no fraudulenta) para preservar datos valiosos de fraude.
 
+    Los cuartiles de todas las columnas se calculan sobre las transacciones legítimas en una sola
+    llamada, y los límites se aplican a la vez como una única máscara booleana: una fila legítima se
+    descarta si alguna columna queda fuera de [Q1 - 1.5·IQR, Q3 + 1.5·IQR] (o es nula). El resultado se
+    arma con un solo `take` en el orden de una permutación aleatoria de las filas conservadas, sin
+    copias intermedias del dataset; coincide con `pd.concat([legítimas, fraudes]).sample(frac=1,
+    random_state=random_state)`.
+
+    Con `sequential=True` se conserva la semántica anterior: las columnas se filtran una tras otra y
+    los cuartiles de cada columna se calculan sobre las filas que sobrevivieron a las anteriores, por
+    lo que el resultado depende del orden de `cols`.
+
     Parameters:
         df (pd.DataFrame): Conjunto de datos original.
         cols (list): Lista de columnas numéricas sobre las que aplicar detección de outliers.
         target (str): Nombre de la variable objetivo binaria. Default: 'isFraud'.
+        sequential (bool): Si es True, calcula los límites de cada columna sobre las filas ya filtradas
+            por las columnas anteriores. Default: False.
+        random_state (int): Semilla del reordenamiento aleatorio. Default: 42.
 
     Returns:
         pd.DataFrame: Dataset combinado sin outliers en la clase legítima y con todos los casos de fraude.
     """
-    df_fraud = df[df[target] == 1]
-    df_legit = df[df[target] == 0]
+    keep = (df[target] == 0).to_numpy()
+    fraud = (df[target] == 1).to_numpy()
 
+    quartiles = None if sequential else df.loc[keep, cols].quantile([0.25, 0.75])
     for col in cols:
-        Q1 = df_legit[col].quantile(0.25)
-        Q3 = df_legit[col].quantile(0.75)
+        values = df[col].to_numpy()
+        Q1, Q3 = df[col][keep].quantile([0.25, 0.75]) if sequential else quartiles[col]
         IQR = Q3 - Q1
-        lower = Q1 - 1.5 * IQR
-        upper = Q3 + 1.5 * IQR
-        df_legit = df_legit[(df_legit[col] >= lower) & (df_legit[col] <= upper)]
+        keep &= (values >= Q1 - 1.5 * IQR) & (values <= Q3 + 1.5 * IQR)
 
-    return pd.concat([df_legit, df_fraud], axis=0).sample(frac=1, random_state=42)
\ No newline at end of file
+    rows = np.concatenate([np.flatnonzero(keep), np.flatnonzero(fraud)])
+    # Misma permutación que `sample(frac=1, random_state=...)`
+    return df.take(rows[np.random.RandomState(random_state).permutation(len(rows))])
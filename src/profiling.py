@@ -0,0 +1,302 @@
+# src/profiling.py
+
+import os
+import time
+import inspect
+import cProfile
+import functools
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from src.metrics_store import append_stage_timings
+
+PROFILE_MODES = ("off", "basic", "deep")
+
+# Etapas abiertas (de afuera hacia adentro) y ejecución en curso; las tareas cron corren en el hilo principal
+_active = []
+_current_run = None
+
+
+def _status_mib(key):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(key):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    # En Linux, escribir 5 en clear_refs reinicia el máximo de RSS (VmHWM) del proceso
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class Stage:
+    """
+    Medición de una etapa: tiempo de reloj, tiempo de CPU, filas procesadas y memoria máxima.
+
+    La memoria máxima es el pico de RSS del proceso durante la etapa. En Linux se mide reiniciando
+    el máximo del kernel (VmHWM) al entrar; las etapas anidadas incorporan a las de afuera el pico
+    visto antes de reiniciarlo, así que cada nivel conserva su propio máximo. Fuera de Linux queda en None.
+
+    Attributes:
+        name (str): Nombre de la etapa; las anidadas dentro de otras llevan la ruta ('score/flat').
+        rows (int): Filas procesadas (se puede asignar dentro del bloque).
+        wall_s (float): Tiempo de reloj, en segundos.
+        cpu_s (float): Tiempo de CPU del proceso, en segundos.
+        start_rss_mib (float): RSS al entrar, en MiB.
+        peak_rss_mib (float): Pico de RSS durante la etapa, en MiB.
+        discard (bool): Si se marca dentro del bloque, la etapa no se suma a la ejecución en curso.
+    """
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.wall_s = self.cpu_s = None
+        self.start_rss_mib = self.peak_rss_mib = None
+        self.discard = False
+
+    def _observe(self, peak):
+        if peak is not None and (self.peak_rss_mib is None or peak > self.peak_rss_mib):
+            self.peak_rss_mib = peak
+
+    def as_dict(self):
+        return {
+            "stage": self.name, "rows": self.rows, "wall_s": self.wall_s, "cpu_s": self.cpu_s,
+            "peak_rss_mib": self.peak_rss_mib,
+        }
+
+
+@contextmanager
+def stage(name, rows=None, force=False):
+    """
+    Mide un bloque de código como una etapa y la registra en la ejecución en curso (ver `profile_run`).
+
+    El costo es de menos de 0,1 ms por etapa (unas pocas lecturas de /proc), por lo que
+    se usa alrededor de pasos completos (leer un bloque, puntuarlo, escribirlo), no por fila.
+    Con PROFILE_MODE=off y sin ejecución en curso no se mide nada (ni se reinicia el pico de RSS).
+
+    Parameters:
+        name (str): Nombre de la etapa.
+        rows (int, optional): Filas procesadas; también se puede asignar a `.rows` dentro del bloque.
+        force (bool): Medir aunque el perfilado esté desactivado (lo usan los benchmarks).
+
+    Yields:
+        Stage: La medición, completa al salir del bloque (sin tiempos ni memoria si no se midió).
+    """
+    if not force and _current_run is None and get_profile_mode() == "off":
+        yield Stage(name, rows)
+        return
+    parent = _active[-1] if _active else None
+    if parent is not None and (_current_run is None or parent is not _current_run.root):
+        name = f"{parent.name}/{name}"
+    record = Stage(name, rows)
+    peak = _status_mib("VmHWM:")
+    for outer in _active:
+        outer._observe(peak)
+    if not _reset_peak_rss():
+        peak = None
+    record.start_rss_mib = _status_mib("VmRSS:")
+    _active.append(record)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.wall_s = time.perf_counter() - wall_start
+        record.cpu_s = time.process_time() - cpu_start
+        _active.pop()
+        if peak is not None:
+            peak = _status_mib("VmHWM:")
+            record._observe(peak)
+            for outer in _active:
+                outer._observe(peak)
+        if _current_run is not None and record is not _current_run.root and not record.discard:
+            _current_run.add(record)
+
+
+def stage_iter(name, iterable):
+    """
+    Recorre un iterable midiendo como etapa la obtención de cada elemento (por ejemplo, leer un bloque).
+
+    Parameters:
+        name (str): Nombre de la etapa.
+        iterable (iterable): Iterable a recorrer; si sus elementos tienen `len`, se cuentan como filas.
+
+    Yields:
+        object: Los elementos de `iterable`.
+    """
+    iterator = iter(iterable)
+    while True:
+        with stage(name) as record:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                # Detectar el final no es una lectura más
+                record.discard = True
+                return
+            record.rows = len(item) if hasattr(item, "__len__") else None
+        yield item
+
+
+def profiled(name=None, rows_arg=None):
+    """
+    Decorador que mide cada llamada a la función como una etapa (ver `stage`).
+
+    Parameters:
+        name (str, optional): Nombre de la etapa. Por defecto, el nombre de la función.
+        rows_arg (str, optional): Parámetro cuyo `len` se registra como filas procesadas.
+
+    Returns:
+        callable: Decorador.
+    """
+    def decorator(func):
+        signature = inspect.signature(func) if rows_arg else None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            rows = None
+            if rows_arg:
+                value = signature.bind_partial(*args, **kwargs).arguments.get(rows_arg)
+                rows = len(value) if hasattr(value, "__len__") else None
+            with stage(name or func.__name__, rows):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ProfileRun:
+    """
+    Ejecución de una tarea (por ejemplo `cron_daily_predict`) con sus etapas agregadas por nombre.
+
+    Una etapa que se repite (una por bloque) suma tiempos y filas y conserva el mayor pico de memoria.
+
+    Attributes:
+        job (str): Nombre de la tarea.
+        started_at (datetime): Inicio de la ejecución.
+        root (Stage): Medición de la tarea completa.
+        stages (dict): Totales por etapa: 'calls', 'rows', 'wall_s', 'cpu_s', 'peak_rss_mib'.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.started_at = datetime.now()
+        self.root = None
+        self.stages = {}
+
+    def add(self, record):
+        totals = self.stages.setdefault(
+            record.name, {"calls": 0, "rows": None, "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_mib": None}
+        )
+        totals["calls"] += 1
+        totals["wall_s"] += record.wall_s
+        totals["cpu_s"] += record.cpu_s
+        if record.rows is not None:
+            totals["rows"] = (totals["rows"] or 0) + record.rows
+        if record.peak_rss_mib is not None:
+            totals["peak_rss_mib"] = max(totals["peak_rss_mib"] or 0.0, record.peak_rss_mib)
+
+    def records(self):
+        """
+        Devuelve una fila por etapa, más la fila 'total' de la tarea completa.
+
+        Returns:
+            list: Diccionarios con 'stage', 'calls', 'rows', 'wall_s', 'cpu_s' y 'peak_rss_mib'.
+        """
+        total = dict(self.root.as_dict(), stage="total", calls=1)
+        return [total] + [dict(stage=name, **totals) for name, totals in self.stages.items()]
+
+
+def get_profile_mode(mode=None):
+    """
+    Devuelve el modo de perfilado: 'off', 'basic' (por defecto) o 'deep'.
+
+    Parameters:
+        mode (str, optional): Modo explícito. Por defecto PROFILE_MODE.
+
+    Returns:
+        str: Modo validado.
+
+    Raises:
+        ValueError: Si el modo no es uno de `PROFILE_MODES`.
+    """
+    mode = (mode or os.getenv("PROFILE_MODE", "basic")).lower()
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"PROFILE_MODE debe ser uno de {PROFILE_MODES}, no '{mode}'.")
+    return mode
+
+
+def _dump_deep_profile(job, started_at, profiler, snapshot, traced_peak, profile_dir):
+    os.makedirs(profile_dir, exist_ok=True)
+    stem = os.path.join(profile_dir, f"{job}_{started_at:%Y%m%d_%H%M%S}")
+    profiler.dump_stats(f"{stem}.prof")
+    with open(f"{stem}_memory.txt", "w") as f:
+        f.write(f"# {job}: pico de memoria asignada desde Python {traced_peak / 2**20:.1f} MiB (tracemalloc)\n")
+        f.write("# 25 líneas con más memoria asignada y todavía viva al terminar:\n")
+        for stat in snapshot.statistics("lineno")[:25]:
+            f.write(f"{stat}\n")
+    return stem
+
+
+@contextmanager
+def profile_run(job, mode=None, db_path=None):
+    """
+    Mide una tarea completa y guarda los tiempos de sus etapas en la base de monitoreo.
+
+    Las etapas (`stage`, `stage_iter`, `profiled`) que se ejecutan dentro del bloque se agregan por
+    nombre y, al terminar sin errores, se insertan en la tabla de tiempos de MONITORING_DB (ver
+    `src.metrics_store.append_stage_timings`), junto con la fila 'total'. Según el modo:
+        - 'off': no se registra nada.
+        - 'basic': tiempos, CPU, filas y pico de memoria por etapa.
+        - 'deep': además, cProfile y tracemalloc durante toda la tarea; se escriben en PROFILE_DIR
+          `<tarea>_<fecha>.prof` (abrir con `pstats` o snakeviz) y `<tarea>_<fecha>_memory.txt`.
+          Pueden hacer la tarea bastante más lenta (sobre todo tracemalloc en código que asigna
+          muchos objetos de Python): usar solo para diagnosticar.
+    También sirve como decorador: `@profile_run("cron_daily_predict")`.
+
+    Parameters:
+        job (str): Nombre de la tarea.
+        mode (str, optional): Modo de perfilado. Por defecto PROFILE_MODE ('basic').
+        db_path (str, optional): Base de monitoreo. Por defecto MONITORING_DB.
+
+    Yields:
+        ProfileRun or None: La ejecución en curso (None en modo 'off').
+    """
+    global _current_run
+    mode = get_profile_mode(mode)
+    if mode == "off" or _current_run is not None:
+        # Una tarea llamada desde otra se mide como una etapa más de la de afuera
+        if mode == "off":
+            yield None
+        else:
+            with stage(job):
+                yield _current_run
+        return
+
+    run = _current_run = ProfileRun(job)
+    profiler = None
+    if mode == "deep":
+        profiler = cProfile.Profile()
+        tracemalloc.start()
+        profiler.enable()
+    try:
+        with stage(job) as run.root:
+            yield run
+    finally:
+        _current_run = None
+        if profiler is not None:
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            traced_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            _dump_deep_profile(job, run.started_at, profiler, snapshot, traced_peak,
+                               os.getenv("PROFILE_DIR", "data/profiles"))
+
+    append_stage_timings(job, run.records(), date=run.started_at, db_path=db_path)
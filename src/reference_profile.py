@@ -0,0 +1,127 @@
+# src/reference_profile.py
+
+import os
+import json
+from datetime import datetime
+import numpy as np
+from src.monitoring import build_reference_sketch
+
+PROFILE_FORMAT_VERSION = 1
+
+PROFILE_QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+def build_reference_profile(df, columns, target='isFraud', version=None, n_bins=50, missing=None):
+    """
+    Construye el perfil de referencia de los datos de entrenamiento.
+
+    El perfil resume, por columna, media, varianza, mínimo, máximo, cuantiles, un histograma y el
+    sketch de cuantiles que usa el monitoreo de drift, además del balance de clases. Es un archivo
+    pequeño que reemplaza al dataset de entrenamiento en el monitoreo y en el dashboard.
+
+    Una columna sin valores (toda nula o un DataFrame vacío) queda con `n` 0, estadísticas NaN e
+    histograma vacío, como su sketch (ver `build_reference_sketch`).
+
+    Parameters:
+        df (pd.DataFrame): Datos de entrenamiento ya enriquecidos (con variables derivadas).
+        columns (list): Columnas numéricas a perfilar.
+        target (str): Nombre de la variable objetivo binaria.
+        version (str, optional): Identificador de versión. Por defecto, la fecha y hora actuales.
+        n_bins (int): Número de intervalos del histograma (entre los percentiles 0.5 y 99.5).
+        missing (dict, optional): Valores faltantes por columna antes de imputar (por ejemplo
+            `FraudPreprocessor.missing_counts_`). Por defecto se cuentan en `df`, que en el
+            entrenamiento ya está imputado.
+
+    Returns:
+        dict: Perfil serializable en JSON.
+    """
+    created_at = datetime.now()
+    profile = {
+        "format_version": PROFILE_FORMAT_VERSION,
+        "version": version or created_at.strftime("%Y%m%d%H%M%S"),
+        "created_at": created_at.isoformat(timespec="seconds"),
+        "n_rows": int(len(df)),
+        "columns": {},
+    }
+    if target in df.columns:
+        counts = df[target].value_counts().sort_index()
+        profile["class_balance"] = {str(k): float(v / len(df)) for k, v in counts.items()}
+
+    for col in columns:
+        values = df[col].to_numpy(dtype=np.float64)
+        values = values[~np.isnan(values)]
+        missing_count = int(df[col].isna().sum() if missing is None else missing.get(col, 0))
+        if values.size == 0:
+            profile["columns"][col] = {
+                "n": 0, "mean": np.nan, "variance": np.nan, "min": np.nan, "max": np.nan,
+                "missing": missing_count,
+                "quantiles": {str(p): np.nan for p in PROFILE_QUANTILES},
+                "histogram": {"edges": [], "counts": [], "below": 0, "above": 0},
+                "sketch": build_reference_sketch(values),
+            }
+            continue
+        lo, hi = np.quantile(values, [0.005, 0.995])
+        hist_counts, hist_edges = np.histogram(values, bins=n_bins, range=(lo, hi) if hi > lo else None)
+        profile["columns"][col] = {
+            "n": int(values.size),
+            "mean": float(values.mean()),
+            "variance": float(values.var()),
+            "min": float(values.min()),
+            "max": float(values.max()),
+            "missing": missing_count,
+            "quantiles": {str(p): float(q) for p, q in zip(PROFILE_QUANTILES, np.quantile(values, PROFILE_QUANTILES))},
+            "histogram": {
+                "edges": hist_edges.tolist(),
+                "counts": hist_counts.tolist(),
+                "below": int(np.sum(values < hist_edges[0])),
+                "above": int(np.sum(values > hist_edges[-1])),
+            },
+            "sketch": build_reference_sketch(values),
+        }
+    return profile
+
+
+def save_reference_profile(profile, path):
+    """
+    Guarda el perfil de referencia en JSON de forma atómica.
+
+    Parameters:
+        profile (dict): Perfil generado por `build_reference_profile`.
+        path (str): Ruta del archivo JSON.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(profile, f)
+    os.replace(tmp_path, path)
+
+
+def load_reference_profile(path):
+    """
+    Carga un perfil de referencia.
+
+    Parameters:
+        path (str): Ruta del archivo JSON.
+
+    Returns:
+        dict: Perfil de referencia.
+
+    Raises:
+        FileNotFoundError: Si el archivo no existe.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"El archivo no existe: {path}")
+    with open(path) as f:
+        return json.load(f)
+
+
+def reference_sketches(profile):
+    """
+    Extrae los sketches de drift del perfil, en el formato que espera `check_drift_sketch`.
+
+    Parameters:
+        profile (dict): Perfil de referencia.
+
+    Returns:
+        dict: Diccionario columna -> sketch.
+    """
+    return {col: stats["sketch"] for col, stats in profile["columns"].items()}
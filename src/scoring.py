@@ -0,0 +1,176 @@
+# src/scoring.py
+
+import os
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from src.forest_engine import FlatForest
+
+DEFAULT_THRESHOLD = 0.5
+
+# Modelos cargados por proceso trabajador (modo 'processes'), indexados por ruta y backend
+_WORKER_MODELS = {}
+
+
+def get_decision_threshold():
+    """
+    Devuelve el umbral de decisión configurado para clasificar una transacción como fraude.
+
+    Returns:
+        float: Valor de la variable de entorno DECISION_THRESHOLD o 0.5 si no está definida.
+    """
+    return float(os.getenv("DECISION_THRESHOLD", DEFAULT_THRESHOLD))
+
+
+def load_model(model_path, backend=None, mmap_mode=None):
+    """
+    Carga el modelo entrenado con el backend de inferencia indicado.
+
+    Parameters:
+        model_path (str): Ruta al archivo .pkl del modelo.
+        backend (str, optional): 'sklearn' (modelo tal cual) o 'flat' (`FlatForest`, recorrido
+            vectorizado de arreglos planos). Si es None se usa INFERENCE_BACKEND ('sklearn' por defecto).
+        mmap_mode (str, optional): Modo de `joblib.load`. Con 'r' los arreglos de un `FlatForest`
+            guardado (el `forest.joblib` del registro de modelos) se mapean en memoria y los procesos
+            comparten sus páginas; los árboles de un `RandomForestClassifier` se copian igual al
+            deserializarse (`Tree.__setstate__`), así que cada proceso tiene su propia copia.
+
+    Returns:
+        sklearn.base.ClassifierMixin or FlatForest: Modelo con `predict_proba`/`predict`.
+
+    Raises:
+        ValueError: Si el backend no es válido.
+    """
+    return as_backend(joblib.load(model_path, mmap_mode=mmap_mode), backend)
+
+
+def as_backend(model, backend=None):
+    """
+    Adapta un modelo ya cargado al backend de inferencia indicado.
+
+    Parameters:
+        model (sklearn.base.ClassifierMixin or FlatForest): Modelo entrenado (un `FlatForest` solo
+            admite el backend 'flat' y se devuelve tal cual).
+        backend (str, optional): 'sklearn' o 'flat' (ver `load_model`). Si es None se usa
+            INFERENCE_BACKEND ('sklearn' por defecto).
+
+    Returns:
+        sklearn.base.ClassifierMixin or FlatForest: Modelo con `predict_proba`/`predict`.
+
+    Raises:
+        ValueError: Si el backend no es válido.
+    """
+    backend = backend or os.getenv("INFERENCE_BACKEND", "sklearn")
+    if backend == "sklearn":
+        return model
+    if backend == "flat":
+        return model if isinstance(model, FlatForest) else FlatForest.from_sklearn(model)
+    raise ValueError(f"Backend de inferencia no soportado: {backend}")
+
+
+def apply_threshold(proba, threshold=None):
+    """
+    Convierte probabilidades de fraude en etiquetas binarias.
+
+    Se usa la comparación estricta `proba > threshold`, que con el umbral 0.5 reproduce
+    exactamente `RandomForestClassifier.predict` (en caso de empate gana la clase 0).
+    Permite recalcular etiquetas con un umbral nuevo sin volver a puntuar.
+
+    Parameters:
+        proba (array-like): Probabilidades de la clase fraudulenta.
+        threshold (float, optional): Umbral de decisión. Si es None se usa DECISION_THRESHOLD.
+
+    Returns:
+        np.ndarray: Etiquetas 0/1 (int64).
+    """
+    if threshold is None:
+        threshold = get_decision_threshold()
+    return (np.asarray(proba) > threshold).astype(np.int64)
+
+
+def predict_proba_parallel(model, X, n_jobs=None, prefer=None, model_path=None, shards_per_job=4):
+    """
+    Calcula la probabilidad de fraude repartiendo las filas entre varios trabajadores.
+
+    Las filas se dividen en fragmentos contiguos que se puntúan en paralelo y se reensamblan en
+    el orden original, por lo que el resultado es idéntico al de una sola llamada.
+
+    - 'threads': todos los hilos comparten el mismo modelo en memoria; el recorrido de los
+      árboles de scikit-learn libera el GIL, así que escala con los núcleos sin copiar nada.
+    - 'processes': cada proceso carga el modelo desde `model_path` una sola vez y lo reutiliza en
+      los fragmentos siguientes. Un `RandomForestClassifier` queda copiado en cada proceso (scikit-learn
+      copia los nodos al deserializar los árboles); solo un `FlatForest` guardado se comparte vía
+      page cache con `mmap_mode='r'` (ver `load_model`). joblib mapea en memoria los fragmentos
+      grandes de `X`, que no se copian a cada proceso.
+
+    Parameters:
+        model (sklearn.base.ClassifierMixin or FlatForest): Modelo ya cargado.
+        X (pd.DataFrame or np.ndarray): Variables predictoras.
+        n_jobs (int, optional): Número de trabajadores. Por defecto PREDICT_N_JOBS (1).
+        prefer (str, optional): 'threads' o 'processes'. Por defecto PREDICT_PARALLEL_BACKEND ('threads').
+        model_path (str, optional): Ruta del modelo, necesaria para 'processes'.
+        shards_per_job (int): Fragmentos por trabajador, para equilibrar la carga.
+
+    Returns:
+        np.ndarray: Probabilidad de fraude por fila.
+    """
+    n_jobs = n_jobs or int(os.getenv("PREDICT_N_JOBS", 1))
+    prefer = prefer or os.getenv("PREDICT_PARALLEL_BACKEND", "threads")
+    if n_jobs == 1 or len(X) < 2:
+        return model.predict_proba(X)[:, 1]
+
+    bounds = np.linspace(0, len(X), min(len(X), n_jobs * shards_per_job) + 1).astype(int)
+    shards = [X[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+    if prefer == "threads":
+        tasks = (delayed(_predict_shard)(model, shard) for shard in shards)
+    elif prefer == "processes":
+        if model_path is None:
+            raise ValueError("El modo 'processes' requiere model_path.")
+        columns = list(X.columns) if hasattr(X, "columns") else None
+        backend = "flat" if isinstance(model, FlatForest) else "sklearn"
+        tasks = (
+            delayed(_predict_shard_from_path)(model_path, backend, np.asarray(shard, dtype=np.float32), columns)
+            for shard in shards
+        )
+    else:
+        raise ValueError(f"Modo de paralelismo no soportado: {prefer}")
+
+    return np.concatenate(Parallel(n_jobs=n_jobs, prefer=prefer)(tasks))
+
+
+def _predict_shard(model, X):
+    return model.predict_proba(X)[:, 1]
+
+
+def _predict_shard_from_path(model_path, backend, X, columns):
+    key = (model_path, backend)
+    if key not in _WORKER_MODELS:
+        _WORKER_MODELS[key] = load_model(model_path, backend, mmap_mode="r")
+    if columns is not None:
+        X = pd.DataFrame(X, columns=columns, copy=False)
+    return _predict_shard(_WORKER_MODELS[key], X)
+
+
+def score(model, X, threshold=None, n_jobs=None, model_path=None):
+    """
+    Puntúa un conjunto de transacciones recorriendo el bosque una sola vez.
+
+    Calcula `predict_proba` y deriva las etiquetas a partir de las probabilidades, en lugar de
+    llamar además a `predict` (que volvería a recorrer todos los árboles). Con más de un
+    trabajador, las filas se puntúan en paralelo (ver `predict_proba_parallel`).
+
+    Parameters:
+        model (sklearn.base.ClassifierMixin): Modelo binario entrenado con `predict_proba`.
+        X (pd.DataFrame or np.ndarray): Variables predictoras.
+        threshold (float, optional): Umbral de decisión. Si es None se usa DECISION_THRESHOLD.
+        n_jobs (int, optional): Número de trabajadores. Por defecto PREDICT_N_JOBS (1).
+        model_path (str, optional): Ruta del modelo, necesaria si PREDICT_PARALLEL_BACKEND='processes'.
+
+    Returns:
+        tuple:
+            - proba (np.ndarray): Probabilidad de fraude por transacción.
+            - labels (np.ndarray): Etiqueta predicha (1 = fraude).
+    """
+    proba = predict_proba_parallel(model, X, n_jobs=n_jobs, model_path=model_path)
+    return proba, apply_threshold(proba, threshold)
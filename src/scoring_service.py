@@ -0,0 +1,464 @@
+# src/scoring_service.py
+
+import os
+import json
+import math
+import asyncio
+import logging
+import argparse
+import joblib
+import numpy as np
+from src.data_cache import COMPACT_DTYPES
+from src.forest_engine import FlatForest, prior_correction
+from src.scoring import load_model, apply_threshold
+from src.velocity_store import AccountVelocityStore
+from src.model_registry import ModelHolder, current_version, load_model_bundle
+
+# Columnas que el caché columnar guarda en float32: se redondean igual en línea para que
+# la puntuación coincida bit a bit con la del batch.
+_FLOAT32_INPUTS = {col for col, dtype in COMPACT_DTYPES.items() if dtype == 'float32'}
+
+
+def _resolve(scorer):
+    # Con un `ModelHolder`, cada solicitud usa la versión vigente al llegar (ver `ModelHolder.get`)
+    return scorer.get() if isinstance(scorer, ModelHolder) else scorer
+
+
+class FraudScorer:
+    """
+    Puntuación en proceso de transacciones individuales o micro-lotes.
+
+    Carga el modelo y el preprocesamiento una sola vez y construye el vector de variables de
+    cada transacción directamente desde un dict, sin pasar por pandas. Replica la semántica de
+    `engineer_features` + `FraudPreprocessor` (mismos redondeos float32 e imputación con las
+    medianas de entrenamiento), por lo que la probabilidad coincide bit a bit con la del batch.
+
+    Si el preprocesamiento usa variables por cuenta, el estado se retoma del snapshot
+    VELOCITY_STORE_PATH (o parte vacío) y cada transacción construida se incorpora a él: las
+    transacciones deben llegar en orden de step y cada una debe construirse una sola vez. Un lote con
+    alguna transacción inválida no modifica el estado (ver `build_matrix`).
+
+    Para usar una versión del registro de modelos ver `from_registry`.
+
+    Parameters:
+        model_path (str, optional): Ruta del modelo. Por defecto MODEL_PATH.
+        preprocessor_path (str, optional): Ruta del preprocesamiento. Por defecto PREPROCESSOR_PATH.
+        threshold (float, optional): Umbral de decisión. Si es None se usa DECISION_THRESHOLD.
+        backend (str, optional): Backend de inferencia ('sklearn' o 'flat'). Si es None se usa
+            INFERENCE_BACKEND.
+        velocity_store_path (str, optional): Snapshot del estado por cuenta. Por defecto VELOCITY_STORE_PATH.
+    """
+
+    def __init__(self, model_path=None, preprocessor_path=None, threshold=None, backend=None,
+                 velocity_store_path=None):
+        self.version = None
+        self._setup(
+            load_model(model_path or os.getenv("MODEL_PATH"), backend),
+            joblib.load(preprocessor_path or os.getenv("PREPROCESSOR_PATH")),
+            threshold, velocity_store_path or os.getenv("VELOCITY_STORE_PATH"),
+        )
+
+    @classmethod
+    def from_registry(cls, version=None, registry_dir=None, threshold=None, backend=None, previous=None):
+        """
+        Construye un scorer con una versión del registro de modelos (ver `src.model_registry`).
+
+        Con el backend 'flat' el bosque aplanado se mapea en memoria desde el registro, así que varios
+        procesos de puntuación comparten los mismos arreglos sin copiarlos. Si `previous` usa variables
+        por cuenta con la misma ventana, el nuevo scorer continúa su estado (más reciente que el
+        snapshot del entrenamiento); si no, parte del snapshot de la versión.
+
+        Parameters:
+            version (str, optional): Versión a cargar. Por defecto la vigente.
+            registry_dir (str, optional): Carpeta del registro. Por defecto MODEL_REGISTRY_DIR.
+            threshold (float, optional): Umbral de decisión. Si es None se usa DECISION_THRESHOLD.
+            backend (str, optional): 'sklearn' o 'flat'. Si es None se usa INFERENCE_BACKEND.
+            previous (FraudScorer, optional): Scorer al que reemplaza.
+
+        Returns:
+            FraudScorer: Scorer de la versión pedida.
+        """
+        bundle = load_model_bundle(version, registry_dir, backend)
+        window = getattr(bundle["preprocessor"], "velocity_window", None)
+        carry = previous is not None and previous.velocity is not None and previous.velocity.window == window
+        scorer = cls.__new__(cls)
+        scorer.version = bundle["version"]
+        scorer._setup(bundle["model"], bundle["preprocessor"], threshold,
+                      None if carry else bundle["velocity_store_path"])
+        if carry:
+            scorer.velocity = previous.velocity
+        return scorer
+
+    def _setup(self, model, preprocessor, threshold, velocity_store_path):
+        self.model = model
+        self.threshold = threshold
+        self.feature_names = list(preprocessor.feature_names_)
+        self._type_categories = list(preprocessor.type_categories)
+        self._fill_values = dict(zip(preprocessor.num_cols, preprocessor.imputer_.statistics_))
+        self.velocity = preprocessor.new_velocity_store()
+        if self.velocity is not None and velocity_store_path and os.path.exists(velocity_store_path):
+            self.velocity = AccountVelocityStore.load(velocity_store_path)
+        self._fraud_idx = list(self.model.classes_).index(1)
+
+    def build_features(self, record):
+        """
+        Construye el vector de variables de una transacción.
+
+        Parameters:
+            record (dict): Transacción con las columnas originales del dataset
+                ('step', 'type', 'amount', saldos y, con variables por cuenta, 'nameOrig' y 'nameDest').
+                Los valores ausentes se imputan.
+
+        Returns:
+            np.ndarray: Vector float32 en el orden de `feature_names`.
+        """
+        return self.build_matrix([record])[0]
+
+    def build_matrix(self, records):
+        """
+        Construye la matriz de variables de varias transacciones.
+
+        Primero se leen y validan todas las transacciones; el estado por cuenta se actualiza después,
+        una sola vez para todo el lote, de modo que un lote con alguna transacción inválida lo deja
+        como estaba.
+
+        Parameters:
+            records (list): Transacciones (dict), como en `build_features`.
+
+        Returns:
+            np.ndarray: Matriz float32 (n_transacciones, n_variables) en el orden de `feature_names`.
+
+        Raises:
+            ValueError: Si un valor numérico no es válido o, con variables por cuenta, si falta el
+                step o es anterior al último procesado.
+            TypeError: Si un valor numérico no es un número ni un texto.
+        """
+        rows = [self._base_values(record) for record in records]
+        if self.velocity is not None and rows:
+            features = self.velocity.update(
+                [values['step'] for values in rows],
+                [record.get('nameOrig') for record in records],
+                [record.get('nameDest') for record in records],
+                [values['amount'] for values in rows],
+            )
+            for i, values in enumerate(rows):
+                values.update((name, float(column[i])) for name, column in features.items())
+
+        X = np.empty((len(rows), len(self.feature_names)), dtype=np.float32)
+        for i, values in enumerate(rows):
+            for col, fill in self._fill_values.items():
+                if math.isnan(values[col]):
+                    values[col] = fill
+            X[i] = [values[col] for col in self.feature_names]
+        return X
+
+    def _base_values(self, record):
+        # Variables que dependen solo de la transacción (sin estado por cuenta), sin imputar
+        raw = {col: self._read_number(record, col) for col in (
+            'step', 'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest'
+        )}
+        old_orig, new_orig = raw['oldbalanceOrg'], raw['newbalanceOrig']
+        old_dest, new_dest = raw['oldbalanceDest'], raw['newbalanceDest']
+
+        values = dict(raw)
+        values['balance_diff_orig'] = np.float32(old_orig - new_orig)
+        values['balance_diff_dest'] = np.float32(new_dest - old_dest)
+        values['error_balance_orig'] = float(old_orig == 0 and new_orig == 0)
+        values['error_balance_dest'] = float(old_dest == 0 and new_dest == 0)
+        values['amount_to_balance_ratio'] = np.float32(raw['amount'] / (old_orig + np.float64(1)))
+        for category in self._type_categories:
+            values[f'type_{category}'] = float(record.get('type') == category)
+        return values
+
+    def score_record(self, record):
+        """
+        Devuelve la probabilidad de fraude de una transacción.
+
+        Parameters:
+            record (dict): Transacción con las columnas originales del dataset.
+
+        Returns:
+            float: Probabilidad de fraude.
+        """
+        return float(self.score_matrix(self.build_features(record)[np.newaxis, :])[0])
+
+    def score_records(self, records):
+        """
+        Puntúa varias transacciones con un único recorrido del bosque.
+
+        Parameters:
+            records (list): Lista de transacciones (dict).
+
+        Returns:
+            np.ndarray: Probabilidad de fraude por transacción.
+        """
+        return self.score_matrix(self.build_matrix(records))
+
+    def score_matrix(self, X):
+        """
+        Puntúa una matriz de variables ya construida.
+
+        Con el backend 'flat' se usa `FlatForest`. Con 'sklearn' se recorren los árboles de bajo
+        nivel (`tree_.predict`) directamente, evitando la validación y el despacho de joblib de
+        `RandomForestClassifier.predict_proba`. En ambos casos la acumulación sigue el orden de
+        scikit-learn, por lo que el resultado es idéntico.
+
+        Parameters:
+            X (np.ndarray): Matriz float32 (n_transacciones, n_variables).
+
+        Returns:
+            np.ndarray: Probabilidad de fraude por fila.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if isinstance(self.model, FlatForest):
+            return self.model.predict_proba(X)[:, self._fraud_idx]
+        n_classes = len(self.model.classes_)
+        proba = np.zeros((X.shape[0], n_classes))
+        for tree in self.model.estimators_:
+            proba += tree.tree_.predict(X)[:, :n_classes]
+        proba /= len(self.model.estimators_)
+        proba = prior_correction(proba, self.model.classes_, getattr(self.model, "negative_rate_", 1.0))
+        return proba[:, self._fraud_idx]
+
+    def label(self, proba):
+        """
+        Convierte una probabilidad en etiqueta con el umbral configurado.
+
+        Parameters:
+            proba (float or array-like): Probabilidad(es) de fraude.
+
+        Returns:
+            np.ndarray: Etiqueta(s) 0/1.
+        """
+        return apply_threshold(proba, self.threshold)
+
+    @staticmethod
+    def _read_number(record, col):
+        value = record.get(col)
+        value = math.nan if value is None else float(value)
+        return np.float64(np.float32(value)) if col in _FLOAT32_INPUTS else np.float64(value)
+
+
+class MicroBatcher:
+    """
+    Agrupa solicitudes concurrentes para puntuarlas con un único recorrido del bosque.
+
+    Cada llamada a `score` construye su vector de variables y espera en una cola; una tarea de
+    fondo junta hasta `max_batch` vectores o espera como máximo `max_wait_ms` desde el primero,
+    puntúa el lote completo y resuelve cada solicitud. Si la versión del modelo cambia con
+    solicitudes en cola, cada una se puntúa con la versión que construyó sus variables.
+
+    Parameters:
+        scorer (FraudScorer or ModelHolder): Instancia de puntuación, o un `ModelHolder` de scorers
+            para cambiar de versión en caliente.
+        max_batch (int): Tamaño máximo del lote.
+        max_wait_ms (float): Espera máxima para completar un lote, en milisegundos.
+    """
+
+    def __init__(self, scorer, max_batch=64, max_wait_ms=2.0):
+        self.scorer = scorer
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = asyncio.Queue()
+        self._worker = None
+
+    def start(self):
+        """Lanza la tarea de fondo en el event loop actual."""
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Detiene la tarea de fondo."""
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    async def score(self, record):
+        """
+        Encola una transacción y espera su probabilidad de fraude.
+
+        Parameters:
+            record (dict): Transacción con las columnas originales del dataset.
+
+        Returns:
+            float: Probabilidad de fraude.
+        """
+        future = asyncio.get_running_loop().create_future()
+        scorer = _resolve(self.scorer)
+        await self._queue.put((scorer, scorer.build_features(record), future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            groups = {}
+            for scorer, features, future in batch:
+                group = groups.setdefault(id(scorer), (scorer, [], []))
+                group[1].append(features)
+                group[2].append(future)
+            for scorer, features, futures in groups.values():
+                try:
+                    proba = scorer.score_matrix(np.vstack(features))
+                except Exception as e:
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for future, p in zip(futures, proba):
+                    if not future.done():
+                        future.set_result(float(p))
+
+
+class ScoringServer:
+    """
+    Servidor HTTP mínimo (asyncio) para puntuar transacciones en tiempo de autorización.
+
+    Endpoints:
+        - POST /score: cuerpo JSON con una transacción (dict) o una lista de transacciones.
+          Responde {"fraud_probability": p, "is_fraud": 0/1} o una lista de esos objetos; un cuerpo
+          inválido (o una lista con elementos que no son objetos) responde 400.
+        - GET /health: responde {"status": "ok", "model_version": versión} (None fuera del registro).
+
+    Parameters:
+        scorer (FraudScorer or ModelHolder): Instancia de puntuación ya cargada, o un `ModelHolder` de
+            scorers para pasar a cada versión nueva del registro sin reiniciar.
+        micro_batch (bool): Si es True, las solicitudes individuales pasan por `MicroBatcher`.
+        max_batch (int): Tamaño máximo del micro-lote.
+        max_wait_ms (float): Espera máxima del micro-lote, en milisegundos.
+        max_body_bytes (int): Tamaño máximo del cuerpo de una solicitud; uno mayor se rechaza con 413
+            sin leerlo.
+    """
+
+    def __init__(self, scorer, micro_batch=False, max_batch=64, max_wait_ms=2.0, max_body_bytes=1_048_576):
+        self.scorer = scorer
+        self.max_body_bytes = max_body_bytes
+        self.batcher = MicroBatcher(scorer, max_batch, max_wait_ms) if micro_batch else None
+
+    async def start(self, host="127.0.0.1", port=8080):
+        """
+        Abre el socket de escucha.
+
+        Parameters:
+            host (str): Interfaz de escucha.
+            port (int): Puerto (0 para elegir uno libre).
+
+        Returns:
+            asyncio.Server: Servidor en ejecución.
+        """
+        if self.batcher is not None:
+            self.batcher.start()
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                # Un cuerpo inválido o demasiado grande no se lee: se responde y se cierra la conexión
+                if length < 0:
+                    await self._respond(writer, "400 Bad Request", {"error": "Content-Length inválido."})
+                    break
+                if length > self.max_body_bytes:
+                    await self._respond(writer, "413 Payload Too Large",
+                                        {"error": f"El cuerpo supera {self.max_body_bytes} bytes."})
+                    break
+                body = await reader.readexactly(length)
+
+                status, payload = await self._dispatch(method, path, body)
+                await self._respond(writer, status, payload)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+        )
+        await writer.drain()
+
+    async def _dispatch(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return "200 OK", {"status": "ok", "model_version": _resolve(self.scorer).version}
+        if method != "POST" or path != "/score":
+            return "404 Not Found", {"error": f"Ruta no encontrada: {method} {path}"}
+        scorer = _resolve(self.scorer)
+        try:
+            payload = json.loads(body or b"null")
+            if isinstance(payload, list):
+                if not all(isinstance(record, dict) for record in payload):
+                    raise ValueError("Cada elemento de la lista debe ser un objeto JSON.")
+                proba = scorer.score_records(payload)
+                return "200 OK", [self._result(scorer, p) for p in proba]
+            if not isinstance(payload, dict):
+                raise ValueError("El cuerpo debe ser un objeto JSON o una lista de objetos.")
+            if self.batcher is not None:
+                proba = await self.batcher.score(payload)
+            else:
+                proba = scorer.score_record(payload)
+            return "200 OK", self._result(scorer, proba)
+        except (ValueError, TypeError) as e:
+            return "400 Bad Request", {"error": str(e)}
+
+    @staticmethod
+    def _result(scorer, proba):
+        return {"fraud_probability": float(proba), "is_fraud": int(scorer.label(proba))}
+
+
+async def _serve(args):
+    # Con un registro publicado, el servidor pasa solo a cada versión nueva; si no, usa MODEL_PATH
+    if current_version() is not None:
+        scorer = ModelHolder(lambda version, previous: FraudScorer.from_registry(version, previous=previous))
+    else:
+        scorer = FraudScorer()
+    server = ScoringServer(
+        scorer, micro_batch=args.micro_batch,
+        max_batch=args.max_batch, max_wait_ms=args.max_wait_ms, max_body_bytes=args.max_body_bytes
+    )
+    listener = await server.start(args.host, args.port)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de puntuación de fraude en línea.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--micro-batch", action="store_true", help="Agrupa solicitudes concurrentes.")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--max-body-bytes", type=int, default=1_048_576, help="Tamaño máximo del cuerpo.")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(_serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,34 @@
 import os
+import json
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import time
 import joblib
+import pyarrow.compute as pc
 from datetime import datetime
-from sklearn.metrics import roc_auc_score, precision_score, recall_score, f1_score
-from src.data_preprocessing import engineer_features, impute_missing_values
-from src.model_training import train_model
-from src.model_section import load_monitoring_data
-from src.monitoring import check_drift
-from dotenv import load_dotenv
+from src.data_preprocessing import FraudPreprocessor, NUM_COLS
+from src.data_cache import load_dataset, iter_dataset_chunks
+from src.model_training import train_model, update_model, load_model_manifest, record_model_version
+from src.metrics_store import append_metrics
+from src.monitoring import check_drift_sketch
+from src.reference_profile import build_reference_profile, save_reference_profile, load_reference_profile, reference_sketches
+from src.scoring import load_model, as_backend, score
+from src.metrics_engine import classification_metrics
+from src.explainer_service import ExplainerService
+from src.velocity_store import AccountVelocityStore
+from src.model_registry import (
+    METRICS_FILE, MODEL_FILE, PREPROCESSOR_FILE, PROFILE_FILE, VELOCITY_FILE,
+    bundle_file, current_version, load_model_bundle, publish_model_bundle,
+)
+from src.profiling import profile_run, stage, stage_iter
 
-load_dotenv()
+# Columnas del archivo de predicciones: claves de la transacción, etiqueta real, variables monitoreadas
+# (las del perfil de referencia) y predicciones
+PREDICTION_COLUMNS = ['step', 'nameOrig', 'nameDest', 'isFraud'] + [c for c in NUM_COLS if c != 'step'] + ['pred_proba', 'pred_label']
+
+# Tipos de las columnas guardadas: variables monitoreadas en float32; `step` sigue siendo entero tras la imputación
+PREDICTION_DTYPES = {**{col: 'float32' for col in NUM_COLS}, 'step': 'int32'}
 
 def check_drift_condition(metrics, auc_threshold=0.88, drift_threshold=0.15):
     """
@@ -39,83 +58,351 @@ def write_retrain_warning(flag, warning_path="data/retrain_warning.txt"):
         else:
             f.write("")
 
-def cron_weekly_train_model():
+def refresh_shap_global(X, sample_size=None):
+    """
+    Regenera SHAP_GLOBAL (media de |SHAP| por variable) para el modelo guardado en MODEL_PATH.
+
+    Se explica una muestra de SHAP_SAMPLE_SIZE filas en lotes con `ExplainerService`; la importancia
+    se acumula lote a lote sin guardar los valores SHAP.
+
+    Args:
+        X (pd.DataFrame): Variables preprocesadas de las que se toma la muestra.
+        sample_size (int, opcional): Filas a explicar. Por defecto SHAP_SAMPLE_SIZE (1000).
+    """
+    sample_size = sample_size or int(os.getenv("SHAP_SAMPLE_SIZE", 1000))
+    if len(X) > sample_size:
+        X = X.sample(n=sample_size, random_state=int(os.getenv("RANDOM_STATE", 42)))
+    with stage("shap_global", rows=len(X)):
+        service = ExplainerService(cache_size=0)
+        service.explain(X)
+        service.save_global_importance()
+
+def load_velocity_store(preprocessor, data_path, through_step, snapshot_path=None):
+    """
+    Devuelve el estado de las variables por cuenta al final de `through_step`.
+
+    Usa el snapshot si corresponde a ese step; si no existe o quedó en otro step, reconstruye el
+    estado recorriendo el historial (solo las columnas necesarias).
+
+    Args:
+        preprocessor (FraudPreprocessor): Preprocesamiento ajustado.
+        data_path (str): Ruta del dataset.
+        through_step (int): Último step ya procesado.
+        snapshot_path (str, opcional): Snapshot del estado. Por defecto VELOCITY_STORE_PATH.
+
+    Returns:
+        AccountVelocityStore or None: None si el preprocesamiento no usa variables por cuenta.
+    """
+    velocity = preprocessor.new_velocity_store()
+    if velocity is None:
+        return None
+    snapshot_path = snapshot_path or os.getenv("VELOCITY_STORE_PATH")
+    if snapshot_path and os.path.exists(snapshot_path):
+        snapshot = AccountVelocityStore.load(snapshot_path)
+        if snapshot.current_step == through_step and snapshot.window == velocity.window:
+            return snapshot
+    history = load_dataset(data_path, columns=["step", "nameOrig", "nameDest", "amount"],
+                           filter=pc.field("step") <= through_step)
+    velocity.update(history["step"], history["nameOrig"], history["nameDest"], history["amount"])
+    return velocity
+
+def _incremental_parent(manifest_path, model_path):
+    """
+    Devuelve la versión de la que parte el reentrenamiento incremental.
+
+    Con un registro publicado es la versión vigente (CURRENT), de modo que una vuelta atrás con
+    `python -m src.model_registry promote` se respeta; con el registro vacío, la última del manifiesto
+    con la copia de trabajo (MODEL_PATH, PREPROCESSOR_PATH y VELOCITY_STORE_PATH).
+
+    Args:
+        manifest_path (str): Ruta del manifiesto de versiones (MODEL_MANIFEST_PATH).
+        model_path (str): Ruta de la copia de trabajo del modelo (MODEL_PATH).
+
+    Returns:
+        dict or None: 'version', 'trained_through_step', 'model_path', 'preprocessor_path' y
+            'velocity_store_path'; None si no hay un modelo previo.
+    """
+    version = current_version()
+    if version is not None:
+        with open(bundle_file(METRICS_FILE, version), encoding="utf-8") as f:
+            trained_through_step = json.load(f)["trained_through_step"]
+        return {
+            "version": version,
+            "trained_through_step": trained_through_step,
+            "model_path": bundle_file(MODEL_FILE, version),
+            "preprocessor_path": bundle_file(PREPROCESSOR_FILE, version),
+            "velocity_store_path": bundle_file(VELOCITY_FILE, version),
+        }
+    versions = load_model_manifest(manifest_path)
+    if not versions or not os.path.exists(model_path):
+        return None
+    return {
+        "version": versions[-1]["version"],
+        "trained_through_step": versions[-1]["trained_through_step"],
+        "model_path": model_path,
+        "preprocessor_path": os.getenv("PREPROCESSOR_PATH"),
+        "velocity_store_path": os.getenv("VELOCITY_STORE_PATH"),
+    }
+
+def _train_incremental(data_path, model_path, manifest_path, parent, start):
+    """
+    Reentrenamiento incremental: agrega árboles entrenados con las transacciones posteriores a `parent`.
+
+    Se agregan TRAIN_NEW_TREES árboles al modelo de `parent` y se retiran los más antiguos para no
+    superar TRAIN_MAX_TREES (ver `update_model`), manteniendo la fracción de negativos del modelo. El
+    preprocesamiento de `parent` no se modifica, para que los árboles existentes sigan viendo las mismas
+    variables, y las variables por cuenta continúan desde su estado (ver `load_velocity_store`). El
+    modelo resultante queda en MODEL_PATH, el perfil de referencia y la muestra de SHAP_GLOBAL salen de
+    la ventana nueva, y la versión se registra en MODEL_MANIFEST_PATH y se publica en el registro de
+    modelos. Si la ventana está vacía o no contiene ambas clases, el modelo no cambia y esas filas se
+    incluyen en la próxima ejecución.
+
+    Args:
+        data_path (str): Ruta del dataset.
+        model_path (str): Ruta donde guardar el modelo actualizado (MODEL_PATH).
+        manifest_path (str): Ruta del manifiesto de versiones (MODEL_MANIFEST_PATH).
+        parent (dict): Versión de partida (ver `_incremental_parent`).
+        start (float): Inicio de la tarea (`time.perf_counter`), para el tiempo de entrenamiento registrado.
+    """
+    last_step = parent["trained_through_step"]
+    with stage("load") as load:
+        df = load_dataset(data_path, filter=pc.field("step") > last_step)
+        load.rows = len(df)
+    if df.empty or df["isFraud"].nunique() != 2:
+        return
+    preprocessor = joblib.load(parent["preprocessor_path"])
+    with stage("velocity_state"):
+        velocity = load_velocity_store(preprocessor, data_path, last_step, parent["velocity_store_path"])
+    with stage("preprocess", rows=len(df)):
+        df, missing = preprocessor.transform(df, velocity=velocity, return_missing=True)
+    window = (int(df["step"].min()), int(df["step"].max()))
+    with stage("train", rows=len(df)):
+        model = update_model(
+            joblib.load(parent["model_path"]), df[preprocessor.feature_names_], df["isFraud"], window,
+            n_new_trees=int(os.getenv("TRAIN_NEW_TREES", 25)),
+            max_trees=int(os.getenv("TRAIN_MAX_TREES", 100)), save_path=model_path,
+        )
+    with stage("save"):
+        entry = record_model_version(manifest_path, "incremental", window[1], len(df), model,
+                                     parent_version=parent["version"], negative_rate=getattr(model, "negative_rate_", 1.0),
+                                     train_seconds=round(time.perf_counter() - start, 3))
+        # La copia de trabajo queda con lo que usa la versión nueva (después de una vuelta atrás,
+        # el preprocesamiento de la versión de partida)
+        if parent["preprocessor_path"] != os.getenv("PREPROCESSOR_PATH"):
+            joblib.dump(preprocessor, os.getenv("PREPROCESSOR_PATH"))
+        if velocity is not None:
+            velocity.save(os.getenv("VELOCITY_STORE_PATH"))
+    # El perfil y la muestra de SHAP salen de la ventana nueva, ya preprocesada: no se relee el historial
+    with stage("reference_profile", rows=len(df)):
+        profile = build_reference_profile(df, NUM_COLS, missing=missing)
+        save_reference_profile(profile, os.getenv("REFERENCE_PROFILE_PATH"))
+    with stage("publish"):
+        publish_model_bundle(entry["version"], model, preprocessor, profile, entry, velocity=velocity)
+    refresh_shap_global(df[preprocessor.feature_names_])
+
+def _train_full(data_path, model_path, manifest_path, negative_rate, start):
+    """
+    Entrenamiento completo sobre todo el dataset.
+
+    Ajusta el preprocesamiento (ingeniería de características + imputador) y lo guarda en
+    PREPROCESSOR_PATH para que la predicción diaria solo lo aplique. Con VELOCITY_WINDOW_STEPS > 0
+    agrega las variables por cuenta (ver `AccountVelocityStore`) y guarda su estado en
+    VELOCITY_STORE_PATH. Entrena en paralelo (TRAIN_N_JOBS) con una fracción `negative_rate` de las
+    transacciones legítimas (ver `train_model`). Guarda el modelo en MODEL_PATH, el perfil de
+    referencia (cuantiles, histogramas, media/varianza y balance de clases) en REFERENCE_PROFILE_PATH y
+    la versión en MODEL_MANIFEST_PATH, publica la versión con las métricas de la partición de prueba
+    (ver `src.model_registry`) y regenera SHAP_GLOBAL (ver `refresh_shap_global`).
+
+    Args:
+        data_path (str): Ruta del dataset.
+        model_path (str): Ruta donde guardar el modelo (MODEL_PATH).
+        manifest_path (str): Ruta del manifiesto de versiones (MODEL_MANIFEST_PATH).
+        negative_rate (float): Fracción de transacciones legítimas para entrenar (TRAIN_NEGATIVE_RATE).
+        start (float): Inicio de la tarea (`time.perf_counter`), para el tiempo de entrenamiento registrado.
+    """
+    with stage("load") as load:
+        df = load_dataset(data_path)
+        load.rows = len(df)
+    preprocessor = FraudPreprocessor(velocity_window=int(os.getenv("VELOCITY_WINDOW_STEPS", 0)) or None)
+    velocity = preprocessor.new_velocity_store()
+    with stage("preprocess", rows=len(df)):
+        df = preprocessor.fit_transform(df, velocity=velocity)
+    with stage("train", rows=len(df)):
+        model, _, X_test, _, y_test = train_model(df[preprocessor.feature_names_], df["isFraud"], negative_rate=negative_rate)
+    model.tree_windows_ = [(int(df["step"].min()), int(df["step"].max()))] * len(model.estimators_)
+    with stage("save"):
+        joblib.dump(preprocessor, os.getenv("PREPROCESSOR_PATH"))
+        if velocity is not None:
+            velocity.save(os.getenv("VELOCITY_STORE_PATH"))
+        joblib.dump(model, model_path)
+        entry = record_model_version(manifest_path, "full", df["step"].max(), len(df), model,
+                                     negative_rate=negative_rate, train_seconds=round(time.perf_counter() - start, 3))
+    with stage("holdout", rows=len(X_test)):
+        holdout = classification_metrics(y_test, model.predict_proba(X_test)[:, 1])
+    with stage("reference_profile", rows=len(df)):
+        profile = build_reference_profile(df, NUM_COLS, missing=preprocessor.missing_counts_)
+        save_reference_profile(profile, os.getenv("REFERENCE_PROFILE_PATH"))
+    with stage("publish"):
+        metrics = dict(entry, holdout={k: holdout[k] for k in ("auc", "pr_auc", "precision", "recall", "f1_score")})
+        publish_model_bundle(entry["version"], model, preprocessor, profile, metrics, velocity=velocity)
+    refresh_shap_global(df[preprocessor.feature_names_])
+
+@profile_run("cron_weekly_train_model")
+def cron_weekly_train_model(mode=None):
     """
     Simula una tarea semanal (cron) que reentrena el modelo usando los datos más recientes,
-    actualiza el archivo del modelo y escribe una advertencia si es necesario.
-    """
-    df = pd.read_csv(os.getenv("FRAUD_DATASET"))
-    df = engineer_features(df)
-    df = df.drop(columns=["nameOrig", "nameDest", "isFlaggedFraud"])
-    num_cols = [
-        'step', 'amount', 'oldbalanceOrg', 'newbalanceOrig',
-        'oldbalanceDest', 'newbalanceDest',
-        'balance_diff_orig', 'balance_diff_dest',
-        'amount_to_balance_ratio'
-    ]
-    df = impute_missing_values(df, num_cols)
-    model, *_ = train_model(df.drop(columns=["isFraud"]), df["isFraud"], save_path=os.getenv("MODEL_PATH"))
-
-    # Check drift + performance y escribir warning
-    latest = load_monitoring_data(os.getenv("MONITORING_METRICS")).iloc[-1]
+    publica la nueva versión en el registro de modelos y escribe una advertencia si es necesario.
+
+    En modo 'incremental' agrega árboles al modelo de la versión vigente con las transacciones nuevas
+    (ver `_train_incremental`); en modo 'full', o si no hay un modelo previo, reentrena desde cero
+    (ver `_train_full`).
+    Los tiempos de cada etapa se registran en MONITORING_DB (ver `src.profiling`).
+
+    Args:
+        mode (str, opcional): 'full' o 'incremental'. Por defecto TRAIN_MODE ('full' si no está definida).
+    """
+    mode = mode or os.getenv("TRAIN_MODE", "full")
+    data_path = os.getenv("FRAUD_DATASET")
+    model_path = os.getenv("MODEL_PATH")
+    manifest_path = os.getenv("MODEL_MANIFEST_PATH")
+    start = time.perf_counter()
+
+    parent = _incremental_parent(manifest_path, model_path) if mode == "incremental" else None
+    if parent is not None:
+        _train_incremental(data_path, model_path, manifest_path, parent, start)
+    else:
+        _train_full(data_path, model_path, manifest_path, float(os.getenv("TRAIN_NEGATIVE_RATE", 1.0)), start)
+
+    # Check drift + performance y escribir warning (model_section importa plotly: solo al entrenar)
+    from src.model_section import load_latest_metrics
+    latest = load_latest_metrics()
     flag = check_drift_condition(latest)
     write_retrain_warning(flag)
 
-def cron_daily_predict():
+def get_predictions_path(date=None):
+    """
+    Devuelve la ruta del archivo de predicciones de un día.
+
+    Args:
+        date (str, opcional): Fecha en formato YYYY-MM-DD. Por defecto, hoy.
+
+    Returns:
+        str: Ruta `data/predictions_{fecha}.parquet`.
+    """
+    date = date or datetime.today().strftime("%Y-%m-%d")
+    return f"data/predictions_{date}.parquet"
+
+@profile_run("cron_daily_predict")
+def cron_daily_predict(chunksize=None):
     """
     Simula una tarea diaria (cron) que genera predicciones usando el modelo más reciente
-    y guarda los resultados en un archivo CSV con la fecha actual.
-    """
-    model = joblib.load(os.getenv("MODEL_PATH"))
-    df = pd.read_csv(os.getenv("FRAUD_DATASET"))
-    df = engineer_features(df)
-    df = impute_missing_values(df, [
-        'step', 'amount', 'oldbalanceOrg', 'newbalanceOrig',
-        'oldbalanceDest', 'newbalanceDest',
-        'balance_diff_orig', 'balance_diff_dest', 'amount_to_balance_ratio'
-    ])
-    X = df.drop(columns=["nameOrig", "nameDest", "isFlaggedFraud", "isFraud"])
-    df["pred_proba"] = model.predict_proba(X)[:, 1]
-    df["pred_label"] = model.predict(X)
+    y guarda los resultados en un archivo Parquet con la fecha actual. El modelo y el preprocesamiento
+    son los de la versión vigente del registro (ver `src.model_registry`); si todavía no se publicó
+    ninguna, los de MODEL_PATH y PREPROCESSOR_PATH.
 
-    today = datetime.today().strftime("%Y-%m-%d")
-    df.to_csv(f"data/predictions_{today}.csv", index=False)
+    El dataset se lee desde el caché columnar (ver `src.data_cache`) y se procesa en bloques
+    de `chunksize` filas: cada bloque se convierte a pandas, se enriquece,
+    se puntúa y se agrega como row group al Parquet de salida, de modo que la memoria queda acotada
+    por el tamaño del bloque y no por el del archivo. Solo se guardan las claves de la transacción,
+    la etiqueta real, las variables monitoreadas (float32, salvo `step`, que se guarda entero) y las
+    predicciones (PREDICTION_COLUMNS), con
+    compresión zstd; la probabilidad se guarda en float64 sin pérdida, a diferencia del texto CSV. El resultado se escribe primero en un archivo temporal
+    y se renombra al terminar, para no dejar predicciones a medias si el proceso falla.
+    Con PREDICT_N_JOBS > 1, cada bloque se reparte entre varios hilos o procesos
+    (PREDICT_PARALLEL_BACKEND) que comparten el modelo en modo solo lectura. Si el preprocesamiento usa
+    variables por cuenta, un mismo estado recorre todos los bloques en orden de step. Los tiempos de
+    lectura, preprocesamiento, puntuación y escritura se registran en MONITORING_DB (ver `src.profiling`).
+
+    Args:
+        chunksize (int, opcional): Filas por bloque. Por defecto se toma de la variable de
+            entorno PREDICT_CHUNKSIZE (500000 si no está definida).
 
+    Raises:
+        ValueError: Si el dataset no tiene transacciones (no se escribe ningún archivo).
+    """
+    chunksize = chunksize or int(os.getenv("PREDICT_CHUNKSIZE", 500_000))
+    data_path = os.getenv("FRAUD_DATASET")
+    if current_version() is not None:
+        # En lotes grandes conviene el modelo de scikit-learn (el bosque aplanado lo usa si INFERENCE_BACKEND=flat)
+        bundle = load_model_bundle(backend="sklearn")
+        model, model_path, preprocessor = as_backend(bundle["model"]), bundle["model_path"], bundle["preprocessor"]
+    else:
+        model_path = os.getenv("MODEL_PATH")
+        model = load_model(model_path)
+        preprocessor = joblib.load(os.getenv("PREPROCESSOR_PATH"))
+
+    output_path = get_predictions_path()
+    tmp_path = f"{output_path}.tmp"
+
+    writer = None
+    velocity = preprocessor.new_velocity_store()
+    reader = iter_dataset_chunks(data_path, chunksize)
+    try:
+        for df in stage_iter("read", reader):
+            with stage("preprocess", rows=len(df)):
+                df = preprocessor.transform(df, velocity=velocity)
+            with stage("score", rows=len(df)):
+                X = df[preprocessor.feature_names_]
+                proba, labels = score(model, X, model_path=model_path)
+                df["pred_proba"], df["pred_label"] = proba, labels.astype("int8")
+            with stage("write", rows=len(df)):
+                # El esquema del primer bloque se impone al resto (p. ej. si un bloque trae nulos)
+                schema = writer.schema if writer is not None else None
+                output = df[PREDICTION_COLUMNS].astype(PREDICTION_DTYPES)
+                table = pa.Table.from_pandas(output, schema=schema, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema.remove_metadata(), compression="zstd")
+                writer.write_table(table.replace_schema_metadata(None))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        raise ValueError(f"El dataset {data_path} no tiene transacciones: no se generaron predicciones.")
+    os.replace(tmp_path, output_path)
+
+@profile_run("cron_daily_evaluate")
 def cron_daily_evaluate():
     """
     Simula una tarea diaria (cron) que evalúa las predicciones del modelo, actualiza las métricas de monitoreo
-    y agrega los resultados al archivo CSV de monitoreo.
+    y agrega los resultados a la base de monitoreo (MONITORING_DB) con una inserción atómica. Las etiquetas se
+    derivan de `pred_proba` con el umbral DECISION_THRESHOLD vigente, por lo que ajustar el umbral no requiere
+    volver a puntuar; todas las métricas se calculan con un único ordenamiento (ver `src.metrics_engine`).
+    El drift se mide contra los sketches del perfil de referencia que genera el entrenamiento (el de la
+    versión vigente del registro o, sin registro, REFERENCE_PROFILE_PATH), por lo que la evaluación no
+    depende del tamaño del dataset de entrenamiento.
+    Los tiempos de lectura, drift y métricas se registran en MONITORING_DB (ver `src.profiling`).
     """
     today = datetime.today().strftime("%Y-%m-%d")
-    df = pd.read_csv(f"data/predictions_{today}.csv")
-    df_ref = pd.read_csv(os.getenv("FRAUD_DATASET"))
-
-    # Seleccionar columnas para evaluar drift
-    drift_cols = [
-        'step', 'amount', 'oldbalanceOrg', 'newbalanceOrig',
-        'oldbalanceDest', 'newbalanceDest',
-        'balance_diff_orig', 'balance_diff_dest',
-        'amount_to_balance_ratio'
-    ]
-
-    drift_report = check_drift(df[drift_cols], df_ref[drift_cols], columns=drift_cols)
+
+    # Las columnas de drift son las perfiladas al entrenar; del Parquet solo se leen esas y las de evaluación
+    with stage("read") as read:
+        profile = load_reference_profile(bundle_file(PROFILE_FILE) or os.getenv("REFERENCE_PROFILE_PATH"))
+        drift_cols = list(profile["columns"])
+        df = pd.read_parquet(get_predictions_path(today), columns=["isFraud", "pred_proba"] + drift_cols)
+        read.rows = len(df)
+
+    with stage("drift", rows=len(df)):
+        drift_report = check_drift_sketch(df, reference_sketches(profile), columns=drift_cols)
     
     # Calcular drift_score promedio
     avg_drift_score = sum(d["drift_score"] for d in drift_report.values()) / len(drift_report)
 
+    # AUC, PR-AUC, precision, recall y F1 salen de un único ordenamiento de las probabilidades
+    with stage("metrics", rows=len(df)):
+        scores = classification_metrics(df["isFraud"], df["pred_proba"])
     metrics = {
         "date": today,
-        "auc": roc_auc_score(df["isFraud"], df["pred_proba"]),
-        "precision": precision_score(df["isFraud"], df["pred_label"]),
-        "recall": recall_score(df["isFraud"], df["pred_label"]),
-        "f1_score": f1_score(df["isFraud"], df["pred_label"]),
+        "auc": scores["auc"],
+        "precision": scores["precision"],
+        "recall": scores["recall"],
+        "f1_score": scores["f1_score"],
+        "pr_auc": scores["pr_auc"],
         "drift_score": avg_drift_score,
         "retrain_triggered": int(check_drift_condition({
-            "auc": roc_auc_score(df["isFraud"], df["pred_proba"]),
+            "auc": scores["auc"],
             "drift_score": avg_drift_score
         }))
     }
 
-    monitor_df = pd.read_csv(os.getenv("MONITORING_METRICS"))
-    monitor_df = pd.concat([monitor_df, pd.DataFrame([metrics])], ignore_index=True)
-    monitor_df.to_csv(os.getenv("MONITORING_METRICS"), index=False)
\ No newline at end of file
+    append_metrics(metrics)
@@ -0,0 +1,316 @@
+# src/velocity_store.py
+
+import os
+from collections import deque
+import numpy as np
+import pandas as pd
+
+# Variables por cuenta que agrega `AccountVelocityStore.update`, en este orden
+VELOCITY_FEATURES = ['orig_tx_count', 'orig_amount_sum', 'dest_tx_count', 'dest_amount_sum', 'dest_first_seen']
+
+# Claves nuevas que se acumulan en el diccionario antes de volcarlas al índice principal
+_MAX_EXTRA_KEYS = 65_536
+
+
+def hash_accounts(names):
+    """
+    Hash de 64 bits de los identificadores de cuenta ('nameOrig', 'nameDest').
+
+    Parameters:
+        names (array-like): Identificadores de cuenta.
+
+    Returns:
+        np.ndarray: Hashes uint64 (iguales para el mismo identificador en cualquier proceso).
+    """
+    # Sin `categorize`: casi todas las cuentas son distintas, factorizar antes de hashear no ahorra nada
+    return pd.util.hash_array(np.asarray(names, dtype=object), categorize=False)
+
+
+class AccountInterner:
+    """
+    Asigna a cada cuenta un identificador entero denso (0, 1, 2...) en orden de aparición.
+
+    Las cuentas se guardan como hashes uint64 (ver `hash_accounts`) en un índice de pandas, que
+    resuelve lotes enteros con una búsqueda vectorizada. Las claves nuevas de lotes chicos (por
+    ejemplo, una transacción en línea) van a un diccionario que se vuelca al índice cuando supera
+    `_MAX_EXTRA_KEYS` entradas; los lotes con muchas claves nuevas se agregan directamente. Así,
+    internar una cuenta cuesta O(1) amortizado y ~8 bytes más la tabla hash por cuenta.
+
+    Parameters:
+        keys (np.ndarray, optional): Hashes ya internados, en orden de identificador.
+    """
+
+    def __init__(self, keys=None):
+        self._keys = np.asarray(keys if keys is not None else [], dtype=np.uint64)
+        self._index = pd.Index(self._keys)
+        self._extra = {}
+
+    def __len__(self):
+        return len(self._keys) + len(self._extra)
+
+    def keys(self):
+        """
+        Devuelve todos los hashes internados.
+
+        Returns:
+            np.ndarray: Hashes uint64; la posición de cada uno es su identificador.
+        """
+        extra = np.fromiter(self._extra, dtype=np.uint64, count=len(self._extra))
+        return np.concatenate([self._keys, extra])
+
+    def intern(self, keys):
+        """
+        Devuelve el identificador de cada clave, asignando uno nuevo a las que no se vieron.
+
+        Parameters:
+            keys (np.ndarray): Hashes uint64.
+
+        Returns:
+            np.ndarray: Identificadores int64.
+        """
+        keys = np.asarray(keys, dtype=np.uint64)
+        ids = self._index.get_indexer(keys)
+        missing = ids < 0
+        if not missing.any():
+            return ids
+
+        codes, uniques = pd.factorize(keys[missing])
+        uniques = np.asarray(uniques, dtype=np.uint64)
+        if self._extra:
+            unique_ids = np.array([self._extra.get(k, -1) for k in uniques.tolist()], dtype=np.int64)
+        else:
+            unique_ids = np.full(len(uniques), -1, dtype=np.int64)
+        new = unique_ids < 0
+        n_new = int(new.sum())
+        unique_ids[new] = np.arange(len(self), len(self) + n_new)
+
+        if len(self._extra) + n_new > _MAX_EXTRA_KEYS:
+            # Los identificadores se conservan: las claves del diccionario siguen su orden de inserción
+            self._keys = np.concatenate([self.keys(), uniques[new]])
+            self._index = pd.Index(self._keys)
+            self._extra = {}
+        else:
+            self._extra.update(zip(uniques[new].tolist(), unique_ids[new].tolist()))
+
+        ids[missing] = unique_ids[codes]
+        return ids
+
+
+def _aggregate(ids, amount):
+    # Conteo y suma por cuenta de un step: identificadores únicos (ordenados), conteos y sumas
+    unique, inverse = np.unique(ids, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(unique)).astype(np.int32)
+    sums = np.bincount(inverse, weights=amount, minlength=len(unique))
+    return unique, counts, sums
+
+
+class AccountVelocityStore:
+    """
+    Estado incremental de variables por cuenta sobre una ventana de steps.
+
+    Para cada transacción devuelve, a partir de las transacciones de los `window` steps anteriores
+    (steps `step - window` a `step - 1`):
+        - orig_tx_count / orig_amount_sum: transacciones y monto enviados por la cuenta de origen.
+        - dest_tx_count / dest_amount_sum: transacciones y monto recibidos por la cuenta de destino.
+        - dest_first_seen: 1 si la cuenta de destino nunca recibió una transacción en un step anterior
+          (sin ventana: cubre todo el historial procesado).
+    Las transacciones del mismo step no se ven entre sí (PaySim no ordena dentro de la hora), por lo que
+    el resultado no depende del orden de las filas ni de cómo se corten los bloques.
+
+    Las cuentas se internan a identificadores densos (`AccountInterner`) y el estado vive en arreglos
+    NumPy indexados por identificador: conteo y suma enviados, conteo y suma recibidos, y un indicador
+    de destino ya visto. Cada step cerrado se guarda agregado por cuenta en una cola FIFO; al avanzar
+    el step, los bloques que salen de la ventana se restan del estado. Cada transacción se procesa en
+    O(1) amortizado, con operaciones vectorizadas por step.
+
+    Las transacciones deben llegar en orden de `step` entre llamadas sucesivas a `update`; el estado
+    se puede guardar y recuperar con `save` / `load` para continuar donde quedó.
+
+    Parameters:
+        window (int): Cantidad de steps anteriores que cubren las variables.
+    """
+
+    def __init__(self, window=24):
+        if int(window) < 1:
+            raise ValueError("La ventana debe cubrir al menos un step.")
+        self.window = int(window)
+        self.accounts = AccountInterner()
+        self.current_step = None
+        self._out_count = np.zeros(0, dtype=np.int32)
+        self._out_sum = np.zeros(0)
+        self._in_count = np.zeros(0, dtype=np.int32)
+        self._in_sum = np.zeros(0)
+        self._seen = np.zeros(0, dtype=bool)
+        # Steps cerrados dentro de la ventana: (step, ids_orig, conteos, sumas, ids_dest, conteos, sumas)
+        self._blocks = deque()
+        # Partes (ids_orig, ids_dest, montos) del step en curso, que todavía no cuentan
+        self._open = []
+
+    def _grow(self, size):
+        capacity = len(self._seen)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        for name in ('_out_count', '_out_sum', '_in_count', '_in_sum', '_seen'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _close_step(self):
+        if not self._open:
+            return
+        orig_ids, dest_ids, amount = (np.concatenate(parts) for parts in zip(*self._open))
+        out_ids, out_count, out_sum = _aggregate(orig_ids, amount)
+        in_ids, in_count, in_sum = _aggregate(dest_ids, amount)
+        self._out_count[out_ids] += out_count
+        self._out_sum[out_ids] += out_sum
+        self._in_count[in_ids] += in_count
+        self._in_sum[in_ids] += in_sum
+        self._seen[in_ids] = True
+        self._blocks.append((self.current_step, out_ids, out_count, out_sum, in_ids, in_count, in_sum))
+        self._open = []
+
+    def _advance(self, step):
+        self._close_step()
+        while self._blocks and self._blocks[0][0] < step - self.window:
+            _, out_ids, out_count, out_sum, in_ids, in_count, in_sum = self._blocks.popleft()
+            for ids, counts, sums, state_count, state_sum in (
+                (out_ids, out_count, out_sum, self._out_count, self._out_sum),
+                (in_ids, in_count, in_sum, self._in_count, self._in_sum),
+            ):
+                state_count[ids] -= counts
+                state_sum[ids] -= sums
+                # Sin transacciones en la ventana la suma vuelve a 0 exacto (sin residuos de redondeo)
+                state_sum[ids[state_count[ids] == 0]] = 0.0
+        self.current_step = step
+
+    def update(self, step, orig, dest, amount):
+        """
+        Calcula las variables de un lote de transacciones y las incorpora al estado.
+
+        Las filas del lote no necesitan estar ordenadas (se procesan en orden estable de `step`), pero
+        ningún `step` puede ser anterior al último procesado.
+
+        Parameters:
+            step (array-like): Step de cada transacción.
+            orig (array-like): Cuenta de origen ('nameOrig').
+            dest (array-like): Cuenta de destino ('nameDest').
+            amount (array-like): Monto (los nulos cuentan como 0).
+
+        Returns:
+            dict: Arreglo por variable de `VELOCITY_FEATURES`, alineado con las filas de entrada
+            (conteos int32, sumas float32, `dest_first_seen` uint8).
+
+        Raises:
+            ValueError: Si el lote contiene un `step` anterior al último procesado.
+        """
+        step = np.asarray(step, dtype=np.int64)
+        amount = np.nan_to_num(np.asarray(amount, dtype=np.float64))
+        n = len(step)
+        # Se valida antes de tocar el estado (incluido el interning de cuentas)
+        if n and self.current_step is not None and step.min() < self.current_step:
+            raise ValueError(
+                f"Las transacciones deben llegar en orden de step: se recibió el step {step.min()} "
+                f"después del {self.current_step}."
+            )
+        orig_ids = self.accounts.intern(hash_accounts(orig))
+        dest_ids = self.accounts.intern(hash_accounts(dest))
+
+        order = None
+        if n > 1 and (np.diff(step) < 0).any():
+            order = np.argsort(step, kind='stable')
+            step, orig_ids, dest_ids, amount = step[order], orig_ids[order], dest_ids[order], amount[order]
+        self._grow(len(self.accounts))
+
+        orig_count = np.empty(n, dtype=np.int32)
+        orig_sum = np.empty(n)
+        dest_count = np.empty(n, dtype=np.int32)
+        dest_sum = np.empty(n)
+        first_seen = np.empty(n, dtype=bool)
+        bounds = np.flatnonzero(np.diff(step)) + 1
+        for start, stop in zip(np.r_[0, bounds], np.r_[bounds, n]):
+            if step[start] != self.current_step:
+                self._advance(int(step[start]))
+            o, d = orig_ids[start:stop], dest_ids[start:stop]
+            orig_count[start:stop] = self._out_count[o]
+            orig_sum[start:stop] = self._out_sum[o]
+            dest_count[start:stop] = self._in_count[d]
+            dest_sum[start:stop] = self._in_sum[d]
+            first_seen[start:stop] = ~self._seen[d]
+            self._open.append((o, d, amount[start:stop]))
+
+        features = dict(zip(VELOCITY_FEATURES, (
+            orig_count, orig_sum.astype(np.float32), dest_count, dest_sum.astype(np.float32),
+            first_seen.view(np.uint8),
+        )))
+        if order is not None:
+            for name, values in features.items():
+                unsorted = np.empty_like(values)
+                unsorted[order] = values
+                features[name] = unsorted
+        return features
+
+    def save(self, path):
+        """
+        Guarda el estado en un `.npz` sin comprimir (escritura atómica).
+
+        Parameters:
+            path (str): Ruta del archivo destino.
+        """
+        n = len(self.accounts)
+        blocks = list(zip(*self._blocks)) or [[]] * 7
+        open_parts = list(zip(*self._open)) or [[]] * 3
+
+        def concat(parts, dtype):
+            return np.concatenate(parts) if len(parts) else np.zeros(0, dtype=dtype)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f, window=self.window, current_step=-1 if self.current_step is None else self.current_step,
+                keys=self.accounts.keys(), out_count=self._out_count[:n], out_sum=self._out_sum[:n],
+                in_count=self._in_count[:n], in_sum=self._in_sum[:n], seen=self._seen[:n],
+                block_steps=np.array(blocks[0], dtype=np.int64),
+                block_out_sizes=np.array([len(ids) for ids in blocks[1]], dtype=np.int64),
+                block_in_sizes=np.array([len(ids) for ids in blocks[4]], dtype=np.int64),
+                block_out_ids=concat(blocks[1], np.int64), block_out_count=concat(blocks[2], np.int32),
+                block_out_sum=concat(blocks[3], np.float64), block_in_ids=concat(blocks[4], np.int64),
+                block_in_count=concat(blocks[5], np.int32), block_in_sum=concat(blocks[6], np.float64),
+                open_orig=concat(open_parts[0], np.int64), open_dest=concat(open_parts[1], np.int64),
+                open_amount=concat(open_parts[2], np.float64),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Recupera un estado guardado con `save`.
+
+        Parameters:
+            path (str): Ruta del archivo `.npz`.
+
+        Returns:
+            AccountVelocityStore: Estado listo para continuar con los steps siguientes.
+        """
+        with np.load(path) as data:
+            store = cls(int(data["window"]))
+            current_step = int(data["current_step"])
+            store.current_step = None if current_step < 0 else current_step
+            store.accounts = AccountInterner(data["keys"])
+            store._out_count, store._out_sum = data["out_count"], data["out_sum"]
+            store._in_count, store._in_sum = data["in_count"], data["in_sum"]
+            store._seen = data["seen"]
+
+            out_splits = np.cumsum(data["block_out_sizes"])[:-1]
+            in_splits = np.cumsum(data["block_in_sizes"])[:-1]
+            out_parts = [np.split(data[name], out_splits) for name in ('block_out_ids', 'block_out_count', 'block_out_sum')]
+            in_parts = [np.split(data[name], in_splits) for name in ('block_in_ids', 'block_in_count', 'block_in_sum')]
+            store._blocks = deque(
+                (int(step), *out_block, *in_block)
+                for step, out_block, in_block in zip(data["block_steps"], zip(*out_parts), zip(*in_parts))
+            )
+            if len(data["open_orig"]):
+                store._open = [(data["open_orig"], data["open_dest"], data["open_amount"])]
+        return store
@@ -0,0 +1,16 @@
+# tests/conftest.py
+
+import os
+import sys
+import pytest
+
+# Las pruebas importan `src` y `benchmarks` desde la raíz del repositorio, como los scripts
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def transactions():
+    """Transacciones sintéticas (20.000 filas, 1% de fraude, algunos saldos nulos) con los tipos del caché."""
+    from benchmarks.synthetic import transactions_frame
+
+    return transactions_frame(20_000, seed=0, fraud_rate=0.01, missing_rate=0.01)
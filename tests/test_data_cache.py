@@ -0,0 +1,37 @@
+# tests/test_data_cache.py
+
+import os
+import threading
+import pyarrow as pa
+import pytest
+from src import data_cache
+from src.data_cache import build_cache, load_dataset
+
+
+@pytest.fixture
+def csv_path(tmp_path, transactions):
+    path = tmp_path / "transactions.csv"
+    transactions.head(2000).to_csv(path, index=False)
+    return str(path)
+
+
+def test_concurrent_builds_leave_a_complete_cache(tmp_path, csv_path):
+    cache_path = str(tmp_path / "cache" / "transactions.arrow")
+    threads = [threading.Thread(target=build_cache, args=(csv_path, cache_path)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert pa.ipc.open_file(pa.memory_map(cache_path)).read_all().num_rows == 2000
+    assert os.listdir(tmp_path / "cache") == ["transactions.arrow"]
+    assert len(load_dataset(csv_path, cache_dir=str(tmp_path / "cache"))) == 2000
+
+
+def test_failed_build_removes_its_temporary_file(tmp_path, csv_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(data_cache.pa.ipc, "new_file", fail)
+    with pytest.raises(OSError):
+        build_cache(csv_path, str(tmp_path / "cache" / "transactions.arrow"))
+    assert os.listdir(tmp_path / "cache") == []
@@ -0,0 +1,57 @@
+# tests/test_explainer_service.py
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from src.data_preprocessing import FraudPreprocessor
+from src.explainer_service import ExplainerService, fraud_class_values, fraud_expected_value, prior_corrected_values
+from src.model_explainer import get_shap_values
+from src.model_training import train_model, update_model
+
+
+@pytest.fixture(scope="module", params=[1.0, 0.2], ids=["sin_submuestreo", "negativos_0.2"])
+def trained(request, transactions, tmp_path_factory):
+    """Modelo guardado en una carpeta temporal y una muestra de variables preprocesadas."""
+    path = tmp_path_factory.mktemp("model") / "model.pkl"
+    preprocessor = FraudPreprocessor()
+    df = preprocessor.fit_transform(transactions)
+    X = df[preprocessor.feature_names_]
+    model = train_model(X, df["isFraud"], n_jobs=1, negative_rate=request.param)[0]
+    joblib.dump(model, path)
+    # Todas las filas de fraude y algunas legítimas: probabilidades altas y bajas
+    sample = X[df["isFraud"] == 1].head(100)._append(X[df["isFraud"] == 0].head(100))
+    return model, path, sample
+
+
+def test_service_values_add_up_to_served_probability(trained):
+    model, path, X = trained
+    service = ExplainerService(model_path=str(path), cache_size=0)
+    values = service.explain(X)
+    served = model.predict_proba(X)[:, 1]
+    np.testing.assert_allclose(service.expected_value + values.sum(axis=1), served, rtol=0, atol=1e-6)
+
+
+def test_get_shap_values_add_up_to_served_probability(trained):
+    model, _, X = trained
+    explainer, shap_values = get_shap_values(model, X)
+    served = model.predict_proba(X)[:, 1]
+    fraud = fraud_class_values(shap_values, model.classes_)
+    # Mismos valores que el servicio y en la escala de la probabilidad servida
+    assert np.corrcoef(fraud.sum(axis=1), served)[0, 1] > 0.999
+    np.testing.assert_allclose(fraud, ExplainerService(model_path=str(trained[1]), cache_size=0).explain(X), atol=1e-9)
+
+
+
+def test_get_shap_values_follows_in_place_update(trained):
+    _, path, X = trained
+    model = joblib.load(path)  # copia: `update_model` modifica el modelo en el lugar
+    get_shap_values(model, X)
+    y = pd.Series([1] * 100 + [0] * 100, index=X.index)
+    update_model(model, X, y, window=(1, 2), n_new_trees=5, max_trees=len(model.estimators_), n_jobs=1)
+
+    explainer, shap_values = get_shap_values(model, X)
+    fraud = fraud_class_values(shap_values, model.classes_)
+    base = prior_corrected_values(fraud[:0], fraud_expected_value(explainer.expected_value, model.classes_),
+                                  getattr(model, "negative_rate_", 1.0))[1]
+    np.testing.assert_allclose(base + fraud.sum(axis=1), model.predict_proba(X)[:, 1], rtol=0, atol=1e-6)
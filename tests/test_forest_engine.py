@@ -0,0 +1,45 @@
+# tests/test_forest_engine.py
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from src.data_preprocessing import FraudPreprocessor
+from src.forest_engine import FlatForest
+from src.model_training import train_model
+
+
+@pytest.fixture(scope="module")
+def features(transactions):
+    preprocessor = FraudPreprocessor()
+    df = preprocessor.fit_transform(transactions)
+    return df[preprocessor.feature_names_], df["isFraud"]
+
+
+@pytest.mark.parametrize("negative_rate", [1.0, 0.2])
+def test_flat_forest_matches_sklearn(features, negative_rate):
+    X, y = features
+    model = train_model(X, y, n_jobs=1, negative_rate=negative_rate)[0]
+    forest = FlatForest.from_sklearn(model, block_size=257)
+    forest.estimator = None  # todo el lote por el recorrido de NumPy
+    sample = X.iloc[:3000]
+    assert np.array_equal(forest.predict_proba(sample), model.predict_proba(sample))
+    assert np.array_equal(forest.predict(sample), model.predict(sample))
+
+
+def test_flat_forest_matches_sklearn_with_missing_values():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(4000, 6)).astype(np.float32)
+    y = (X[:, 0] + X[:, 1] > 0.5).astype(int)
+    X[rng.random(X.shape) < 0.1] = np.nan
+    model = RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0).fit(X, y)
+    forest = FlatForest.from_sklearn(model)
+    forest.estimator = None
+    assert np.array_equal(forest.predict_proba(X), model.predict_proba(X))
+
+
+def test_flat_forest_delegates_large_batches(features):
+    X, y = features
+    model = train_model(X, y, n_jobs=1)[0]
+    forest = FlatForest.from_sklearn(model, large_batch_rows=100)
+    assert np.array_equal(forest.predict_proba(X.iloc[:1000]), model.predict_proba(X.iloc[:1000]))
+    assert np.array_equal(forest.predict_proba(X.iloc[:1]), model.predict_proba(X.iloc[:1]))
@@ -0,0 +1,66 @@
+# tests/test_metrics_store.py
+
+import sqlite3
+import threading
+
+import pandas as pd
+
+from src.metrics_store import connect, query_metrics
+
+
+def _legacy_csv(tmp_path, n=50):
+    path = tmp_path / "metrics.csv"
+    pd.DataFrame({
+        "date": pd.date_range("2024-01-01", periods=n, freq="D"),
+        "auc": 0.9,
+        "drift_score": 0.1,
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def test_legacy_csv_imported_once(tmp_path, monkeypatch):
+    monkeypatch.delenv("MONITORING_METRICS", raising=False)
+    csv = _legacy_csv(tmp_path)
+    db = str(tmp_path / "monitoring.db")
+    for _ in range(2):
+        connect(db, legacy_csv=csv).close()
+    assert len(query_metrics(db_path=db)) == 50
+
+
+def test_concurrent_connects_import_legacy_csv_once(tmp_path, monkeypatch):
+    monkeypatch.delenv("MONITORING_METRICS", raising=False)
+    csv = _legacy_csv(tmp_path)
+    db = str(tmp_path / "monitoring.db")
+    connect(db).close()  # base creada y vacía: todos los hilos ven la tabla sin filas
+    barrier = threading.Barrier(4)
+    errors = []
+
+    def open_store():
+        try:
+            barrier.wait()
+            connect(db, legacy_csv=csv).close()
+        except Exception as exc:  # pragma: no cover - se informa en la aserción
+            errors.append(exc)
+
+    threads = [threading.Thread(target=open_store) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(query_metrics(db_path=db)) == 50
+
+
+def test_reading_populated_store_does_not_take_write_lock(tmp_path, monkeypatch):
+    monkeypatch.delenv("MONITORING_METRICS", raising=False)
+    csv = _legacy_csv(tmp_path)
+    db = str(tmp_path / "monitoring.db")
+    connect(db, legacy_csv=csv).close()
+    monkeypatch.setenv("MONITORING_METRICS", csv)
+    writer = sqlite3.connect(db)
+    writer.execute("BEGIN IMMEDIATE")  # un escritor con la transacción abierta
+    try:
+        assert len(query_metrics(db_path=db)) == 50
+    finally:
+        writer.rollback()
+        writer.close()
@@ -0,0 +1,101 @@
+# tests/test_model_registry.py
+
+import os
+import threading
+import numpy as np
+import pytest
+from src.data_preprocessing import NUM_COLS, FraudPreprocessor
+from src.model_explainer import get_shap_values
+from src.model_registry import ModelHolder, load_model_bundle, publish_model_bundle, set_current_version
+from src.model_training import record_model_version, train_model
+from src.reference_profile import build_reference_profile
+from src.utils import _incremental_parent
+
+
+@pytest.fixture(scope="module")
+def trained(transactions):
+    """Preprocesamiento, modelo y variables preprocesadas de una muestra."""
+    preprocessor = FraudPreprocessor()
+    df = preprocessor.fit_transform(transactions)
+    model = train_model(df[preprocessor.feature_names_], df["isFraud"], n_jobs=1, negative_rate=0.2)[0]
+    return preprocessor, model, df
+
+
+def _publish(registry_dir, manifest_path, trained, step):
+    preprocessor, model, df = trained
+    entry = record_model_version(manifest_path, "full", step, len(df), model)
+    publish_model_bundle(entry["version"], model, preprocessor, build_reference_profile(df, NUM_COLS), entry,
+                         registry_dir=registry_dir)
+    return entry["version"]
+
+
+def _registry(tmp_path, *versions):
+    for version in versions:
+        os.makedirs(tmp_path / version)
+    set_current_version(versions[0], str(tmp_path))
+    return str(tmp_path)
+
+
+def test_get_serves_previous_version_while_loading_in_background(tmp_path):
+    registry_dir = _registry(tmp_path, "v1", "v2")
+    release = threading.Event()
+
+    def load(version, previous):
+        if version == "v2":
+            release.wait(5)
+        return version
+
+    holder = ModelHolder(load, registry_dir, refresh_seconds=0)
+    set_current_version("v2", registry_dir)
+    assert holder.get() == "v1"
+    release.set()
+    holder._refresh_thread.join(5)
+    assert holder.get() == "v2"
+
+
+def test_failed_load_keeps_previous_version_and_is_logged(tmp_path, caplog):
+    registry_dir = _registry(tmp_path, "v1", "v2")
+
+    def load(version, previous):
+        if version == "v2":
+            raise FileNotFoundError(f"La versión {version} no existe.")
+        return version
+
+    holder = ModelHolder(load, registry_dir, refresh_seconds=0)
+    set_current_version("v2", registry_dir)
+    assert holder.get() == "v1"
+    holder._refresh_thread.join(5)
+    assert holder.get() == "v1" and holder.version == "v1"
+    assert "v2 no existe" in caplog.text
+
+
+def test_explains_flat_forest_loaded_from_registry(tmp_path, monkeypatch, trained):
+    monkeypatch.setenv("MODEL_REGISTRY_DIR", str(tmp_path))
+    preprocessor, model, df = trained
+    _publish(str(tmp_path), str(tmp_path / "manifest.json"), trained, 100)
+    forest = load_model_bundle(backend="flat")["model"]
+    assert forest.estimator is None
+    X = df[preprocessor.feature_names_].head(50)
+    np.testing.assert_allclose(get_shap_values(forest, X)[1], get_shap_values(model, X)[1])
+
+    forest.version = None
+    with pytest.raises(ValueError, match="modelo original"):
+        get_shap_values(forest, X)
+
+
+def test_versions_published_in_the_same_second_get_distinct_ids(tmp_path, trained):
+    manifest_path = str(tmp_path / "manifest.json")
+    versions = [_publish(str(tmp_path), manifest_path, trained, step) for step in (100, 200, 300)]
+    assert len(set(versions)) == 3 and sorted(versions) == versions
+
+
+def test_incremental_parent_follows_a_rollback(tmp_path, monkeypatch, trained):
+    monkeypatch.setenv("MODEL_REGISTRY_DIR", str(tmp_path))
+    manifest_path = str(tmp_path / "manifest.json")
+    first = _publish(str(tmp_path), manifest_path, trained, 100)
+    _publish(str(tmp_path), manifest_path, trained, 200)
+    set_current_version(first, str(tmp_path))
+
+    parent = _incremental_parent(manifest_path, str(tmp_path / "model.pkl"))
+    assert parent["version"] == first and parent["trained_through_step"] == 100
+    assert parent["model_path"].startswith(str(tmp_path / first))
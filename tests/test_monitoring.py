@@ -0,0 +1,55 @@
+# tests/test_monitoring.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import wasserstein_distance
+from src.monitoring import DriftAccumulator, build_reference_sketch, check_drift_sketch
+
+
+def _case(seed):
+    # Referencia y datos nuevos de distintas formas: continuas, colas pesadas, masas puntuales y discretas
+    rng = np.random.default_rng(seed)
+    kind = seed % 5
+    n_ref, n_new = rng.integers(500, 20_000, 2)
+    shift, scale = rng.normal(0, 0.5), rng.uniform(0.5, 2.0)
+    if kind == 0:
+        ref, new = rng.normal(0, 1, n_ref), rng.normal(shift, scale, n_new)
+    elif kind == 1:
+        ref, new = rng.lognormal(10, 2, n_ref), rng.lognormal(10 + shift, 2 * scale, n_new)
+    elif kind == 2:
+        ref = np.where(rng.random(n_ref) < 0.4, 0.0, rng.lognormal(8, 1.5, n_ref))
+        new = np.where(rng.random(n_new) < rng.uniform(0.2, 0.6), 0.0, rng.lognormal(8 + shift, 1.5, n_new))
+    elif kind == 3:
+        ref, new = rng.integers(0, 10, n_ref).astype(float), rng.integers(0, 12, n_new).astype(float)
+    else:
+        # Datos nuevos fuera del rango de referencia, con una parte mezclada
+        ref = rng.uniform(0, 1, n_ref)
+        new = np.concatenate([rng.uniform(-1, 2, n_new // 2), rng.uniform(0, 1, n_new - n_new // 2)])
+    return ref, new
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_wasserstein_error_bound_holds_against_exact_distance(seed):
+    ref, new = _case(seed)
+    result = DriftAccumulator(build_reference_sketch(ref)).update(new).result()
+    exact = wasserstein_distance(new, ref)
+    tolerance = 1e-9 * max(np.abs(ref).max(), np.abs(new).max())
+    assert abs(result["wasserstein"] - exact) <= result["wasserstein_error_bound"] + tolerance
+
+
+def test_chunked_updates_match_single_pass():
+    ref, new = _case(2)
+    sketch = build_reference_sketch(ref)
+    single = DriftAccumulator(sketch).update(new).result()
+    merged = DriftAccumulator(sketch).update(new[:1000]).merge(DriftAccumulator(sketch).update(new[1000:])).result()
+    for key in ("wasserstein", "ks", "psi", "n"):
+        assert np.isclose(merged[key], single[key], rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize("values", [np.array([]), np.full(100, np.nan)])
+def test_empty_reference_gives_nan_drift(values):
+    sketch = build_reference_sketch(values)
+    assert sketch["n"] == 0
+    report = check_drift_sketch(pd.DataFrame({"x": np.arange(10.0)}), {"x": sketch}, ["x"])
+    assert np.isnan(report["x"]["drift_score"]) and not report["x"]["drifted"]
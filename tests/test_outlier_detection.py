@@ -0,0 +1,21 @@
+# tests/test_outlier_detection.py
+
+import pandas as pd
+import pytest
+from benchmarks.outliers import OUTLIER_COLS, remove_outliers_iqr_reference
+from src.outlier_detection import remove_outliers_iqr
+
+
+@pytest.mark.parametrize("cols", [OUTLIER_COLS, OUTLIER_COLS[::-1], ["amount"]], ids=["columnas", "invertidas", "una"])
+def test_sequential_matches_previous_per_column_filter(transactions, cols):
+    # Los saldos nulos (1%) se descartan igual que con el filtro anterior
+    result = remove_outliers_iqr(transactions, cols, sequential=True)
+    pd.testing.assert_frame_equal(result, remove_outliers_iqr_reference(transactions, cols))
+
+
+def test_single_pass_keeps_all_fraud_and_matches_sequential_on_one_column(transactions):
+    result = remove_outliers_iqr(transactions, OUTLIER_COLS)
+    assert result["isFraud"].sum() == transactions["isFraud"].sum()
+    # Con una sola columna no hay orden entre filtros: ambos modos coinciden
+    pd.testing.assert_frame_equal(remove_outliers_iqr(transactions, ["amount"]),
+                                  remove_outliers_iqr(transactions, ["amount"], sequential=True))
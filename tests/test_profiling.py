@@ -0,0 +1,20 @@
+# tests/test_profiling.py
+
+from src import profiling
+from src.profiling import profile_run, stage
+
+
+def test_stage_is_not_measured_when_profiling_is_off(monkeypatch):
+    monkeypatch.setenv("PROFILE_MODE", "off")
+    monkeypatch.setattr(profiling, "_reset_peak_rss", lambda: 1 / 0)
+    with profile_run("tarea") as run, stage("etapa", rows=3) as record:
+        pass
+    assert run is None
+    assert record.rows == 3 and record.wall_s is None and record.peak_rss_mib is None
+
+
+def test_forced_stage_is_measured_when_profiling_is_off(monkeypatch):
+    monkeypatch.setenv("PROFILE_MODE", "off")
+    with stage("etapa", force=True) as record:
+        sum(range(1000))
+    assert record.wall_s is not None and record.cpu_s is not None
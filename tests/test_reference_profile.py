@@ -0,0 +1,36 @@
+# tests/test_reference_profile.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.data_preprocessing import FraudPreprocessor, NUM_COLS
+from src.reference_profile import build_reference_profile, reference_sketches
+
+
+def test_profile_counts_missing_values_before_imputation(transactions):
+    preprocessor = FraudPreprocessor()
+    df = preprocessor.fit_transform(transactions)
+    assert not df[NUM_COLS].isna().any().any()
+
+    profile = build_reference_profile(df, NUM_COLS, missing=preprocessor.missing_counts_)
+    missing = {col: stats["missing"] for col, stats in profile["columns"].items()}
+    assert missing["oldbalanceOrg"] == transactions["oldbalanceOrg"].isna().sum() > 0
+    # Las variables derivadas quedan nulas cuando falta alguno de sus saldos
+    assert missing["balance_diff_orig"] == (transactions["oldbalanceOrg"].isna() | transactions["newbalanceOrig"].isna()).sum()
+    assert missing["amount"] == 0
+
+
+def test_transform_returns_missing_values_before_imputation(transactions):
+    preprocessor = FraudPreprocessor().fit(transactions)
+    df, missing = preprocessor.transform(transactions, return_missing=True)
+    assert not df[NUM_COLS].isna().any().any()
+    assert missing == preprocessor.missing_counts_
+
+
+@pytest.mark.parametrize("values", [[np.nan] * 20, []], ids=["toda_nula", "vacia"])
+def test_profile_of_column_without_values(values):
+    df = pd.DataFrame({"x": pd.Series(values, dtype="float64"), "isFraud": [0] * len(values)})
+    stats = build_reference_profile(df, ["x"])["columns"]["x"]
+    assert stats["n"] == 0 and stats["missing"] == len(values)
+    assert np.isnan(stats["mean"]) and np.isnan(stats["quantiles"]["0.5"])
+    assert stats["histogram"]["counts"] == [] and reference_sketches({"columns": {"x": stats}})["x"]["n"] == 0
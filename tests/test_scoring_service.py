@@ -0,0 +1,104 @@
+# tests/test_scoring_service.py
+
+import json
+import asyncio
+import joblib
+import numpy as np
+import pytest
+from src.data_preprocessing import FraudPreprocessor
+from src.model_training import train_model
+from src.scoring_service import FraudScorer, ScoringServer
+
+
+@pytest.fixture(scope="module", params=[None, 24], ids=["sin_velocidad", "velocidad_24"])
+def trained(request, transactions, tmp_path_factory):
+    """Preprocesamiento y modelo (negativos submuestreados) entrenados y guardados en una carpeta temporal."""
+    path = tmp_path_factory.mktemp("model")
+    preprocessor = FraudPreprocessor(velocity_window=request.param)
+    df = preprocessor.fit_transform(transactions)
+    model = train_model(df[preprocessor.feature_names_], df["isFraud"], n_jobs=1, negative_rate=0.2)[0]
+    joblib.dump(preprocessor, path / "preprocessor.pkl")
+    joblib.dump(model, path / "model.pkl")
+    return preprocessor, model, path
+
+
+def _scorer(path):
+    return FraudScorer(str(path / "model.pkl"), str(path / "preprocessor.pkl"),
+                       velocity_store_path=str(path / "velocity_store.npz"))
+
+
+def test_score_records_matches_batch_pipeline(trained, transactions):
+    preprocessor, model, path = trained
+    expected = model.predict_proba(preprocessor.transform(transactions)[preprocessor.feature_names_])[:, 1]
+
+    records = transactions.to_dict("records")
+    scorer = _scorer(path)
+    proba = np.concatenate([scorer.score_records(records[start:start + 500])
+                            for start in range(0, len(records), 500)])
+    assert np.array_equal(proba, expected)
+
+
+
+@pytest.mark.parametrize("bad", [{"amount": "x"}, {"step": None}, {"step": 0}], ids=["monto", "sin_step", "step_anterior"])
+def test_invalid_request_leaves_account_state_unchanged(trained, transactions, bad):
+    _, _, path = trained
+    if "step" in bad and _scorer(path).velocity is None:
+        pytest.skip("sin variables por cuenta el step no se valida")
+    records = transactions.sort_values("step", kind="stable").to_dict("records")
+    first, second = records[:300], records[300:600]
+    expected = _scorer(path)
+    expected.score_records(first)
+
+    scorer = _scorer(path)
+    scorer.score_records(first)
+    with pytest.raises(ValueError):
+        # Transacciones válidas de otras cuentas antes de la inválida
+        scorer.score_records(second[:50] + [{**second[50], **bad}])
+    assert np.array_equal(scorer.score_records(second), expected.score_records(second))
+
+
+async def _request(port, body):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"POST /score HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = (await reader.readline()).decode().split(" ", 2)[1]
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        key, _, value = line.decode().partition(":")
+        if key.lower() == "content-length":
+            length = int(value)
+    payload = json.loads(await reader.readexactly(length))
+    writer.close()
+    return int(status), payload
+
+
+@pytest.mark.parametrize("body, status", [
+    (b"[1, 2]", 400),
+    (b'[{"amount": 10}, "x"]', 400),
+    (b"3", 400),
+    (b"{", 400),
+])
+def test_server_rejects_invalid_payloads(trained, body, status):
+    async def run():
+        server = ScoringServer(_scorer(trained[2]), max_body_bytes=64)
+        listener = await server.start(port=0)
+        async with listener:
+            return await _request(listener.sockets[0].getsockname()[1], body)
+
+    assert asyncio.run(run())[0] == status
+
+
+def test_server_rejects_oversized_body_without_reading_it(trained):
+    async def run():
+        server = ScoringServer(_scorer(trained[2]), max_body_bytes=64)
+        listener = await server.start(port=0)
+        async with listener:
+            port = listener.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"POST /score HTTP/1.1\r\nContent-Length: 1000000000\r\n\r\n")
+            await writer.drain()
+            status = await reader.readline()
+            writer.close()
+            return status
+
+    assert asyncio.run(run()).split(b" ")[1] == b"413"